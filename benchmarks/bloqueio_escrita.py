@@ -0,0 +1,82 @@
+"""
+Verificação do escritor único com o banco bloqueado por outro processo (CLI de importação,
+API em processo separado, migração): uma segunda conexão segura o BEGIN IMMEDIATE além do
+busy_timeout enquanto gravações são enviadas. Todas as gravações do grupo devem terminar
+com erro (e não ficar pendentes para sempre) e, liberado o bloqueio, as seguintes gravam.
+
+Uso: python -m benchmarks.bloqueio_escrita [--gravacoes 5] [--espera 1] [--bloqueio 3]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+
+def verificar(gravacoes, espera, bloqueio):
+    """Retorna a lista de problemas encontrados (vazia se o escritor se comportou como esperado)"""
+    from database import db_utils
+
+    problemas = []
+    bloqueador = sqlite3.connect(db_utils.DB_PATH, isolation_level=None)
+    bloqueador.execute('BEGIN IMMEDIATE')
+    inicio = time.perf_counter()
+    futuros = [db_utils.submit_write(db_utils.add_user, f'bloqueio_{i}', 'senha') for i in range(gravacoes)]
+
+    # O busy_timeout do escritor é menor que o bloqueio: o BEGIN do grupo falha
+    for i, futuro in enumerate(futuros):
+        try:
+            futuro.result(timeout=bloqueio + espera + 5)
+            problemas.append(f"gravação {i}: concluída com o banco bloqueado")
+        except TimeoutError:
+            problemas.append(f"gravação {i}: continua pendente ({futuro._state}) após {bloqueio + espera + 5:.0f} s")
+        except sqlite3.OperationalError:
+            pass
+    print(f"{gravacoes} gravação(ões) com o banco bloqueado: respondidas em {time.perf_counter() - inicio:.1f} s")
+
+    restante = bloqueio - (time.perf_counter() - inicio)
+    if restante > 0:
+        time.sleep(restante)
+    bloqueador.rollback()
+    bloqueador.close()
+
+    try:
+        db_utils.submit_write(db_utils.add_user, 'bloqueio_liberado', 'senha').result(timeout=espera + 5)
+    except Exception as e:
+        problemas.append(f"gravação após liberar o bloqueio falhou: {e!r}")
+
+    stats = db_utils.get_writer_stats()
+    print(f"Escritor único: {stats['completed']} concluída(s), {stats['failed']} com erro")
+    if stats['failed'] != gravacoes:
+        problemas.append(f"esperadas {gravacoes} gravações com erro, registradas {stats['failed']}")
+    return problemas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escritor único com o banco bloqueado por outro processo")
+    parser.add_argument('--gravacoes', type=int, default=5, help="Gravações enviadas durante o bloqueio")
+    parser.add_argument('--espera', type=float, default=1.0, help="busy_timeout do escritor (segundos)")
+    parser.add_argument('--bloqueio', type=float, default=3.0, help="Tempo com o banco bloqueado (segundos)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='obras_bloqueio_') as tmp:
+        # Configurados antes do primeiro import de database.db_utils
+        os.environ['OBRAS_DB_PATH'] = os.path.join(tmp, 'obras.db')
+        os.environ['OBRAS_DB_POOL_TIMEOUT'] = str(args.espera)
+        os.environ['OBRAS_DB_WRITE_QUEUE'] = '1'
+        from database import db_utils
+
+        db_utils.create_tables()
+        problemas = verificar(args.gravacoes, args.espera, args.bloqueio)
+        db_utils._get_writer().stop()
+        db_utils._get_pool().close_all()
+
+    for problema in problemas:
+        print(f"ERRO: {problema}")
+    print("OK" if not problemas else f"{len(problemas)} problema(s)")
+    return 1 if problemas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
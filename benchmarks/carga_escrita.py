@@ -0,0 +1,228 @@
+"""
+Teste de carga das gravações concorrentes: N sessões simuladas (threads, como as
+sessões do Streamlit) salvam medições, editam obras e cadastram obras ao mesmo tempo,
+enquanto consultam os indicadores entre uma gravação e outra.
+
+Compara o escritor único (fila com group commit) com a gravação direta de cada sessão
+(OBRAS_DB_WRITE_QUEUE=0) e mede a vazão de gravações, as latências (p50, p95, p99)
+de gravações e leituras e os erros (ex.: "database is locked").
+
+Uso: python -m benchmarks.carga_escrita [--sessoes 50] [--operacoes 40] [--modo fila|direto|ambos]
+                                        [--pausa-ms 20] [--sem-leituras] [--saida carga.json]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Proporção de cada tipo de gravação no roteiro das sessões
+MIX_GRAVACOES = (
+    ('registrar_medicao', 0.7),
+    ('editar_obra', 0.2),
+    ('cadastrar_obra', 0.1),
+)
+
+
+def percentil(valores, p):
+    """Percentil (0-100) de uma lista de valores, pelo vizinho mais próximo"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def _resumo_latencias(tempos):
+    return {
+        'quantidade': len(tempos),
+        'p50_ms': percentil(tempos, 50),
+        'p95_ms': percentil(tempos, 95),
+        'p99_ms': percentil(tempos, 99),
+        'max_ms': max(tempos) if tempos else 0.0,
+    }
+
+
+def _carregar_obras():
+    """(obra_id, user_id, valor_total, num_medicoes, item_ids) de todas as obras do banco"""
+    from database.db_utils import get_db_connection
+
+    conn = get_db_connection()
+    try:
+        itens = {}
+        for obra_id, item_id in conn.execute('SELECT obra_id, id FROM itens_obra ORDER BY obra_id, id'):
+            itens.setdefault(obra_id, []).append(item_id)
+        return [
+            (obra_id, user_id, valor_total, num_medicoes, itens[obra_id])
+            for obra_id, user_id, valor_total, num_medicoes in conn.execute(
+                'SELECT id, user_id, valor_total, num_medicoes FROM obras'
+            )
+            if obra_id in itens
+        ]
+    finally:
+        conn.close()
+
+
+def _sessao(indice, obras, args, resultados, barreira):
+    """Roteiro de uma sessão: gravação, leitura dos indicadores e pausa, repetidos"""
+    import numpy as np
+
+    from database.db_utils import add_obra, update_obra, update_realizados
+    from database.dados_sinteticos import gerar_obra
+    from utils.indicadores import calcular_indicadores
+
+    rng = random.Random(args.semente + indice)
+    rng_np = np.random.default_rng(args.semente + indice)
+    tipos = [tipo for tipo, _ in MIX_GRAVACOES]
+    pesos = [peso for _, peso in MIX_GRAVACOES]
+    gravacoes, leituras, erros = [], [], []
+
+    barreira.wait()
+    for _ in range(args.operacoes):
+        obra_id, user_id, valor_total, num_medicoes, item_ids = rng.choice(obras)
+        tipo = rng.choices(tipos, pesos)[0]
+        inicio = time.perf_counter()
+        try:
+            if tipo == 'registrar_medicao':
+                update_realizados(
+                    obra_id, item_ids, rng.randint(1, num_medicoes),
+                    np.round(rng_np.uniform(0, valor_total / len(item_ids) / num_medicoes, len(item_ids)), 2),
+                    valor_total
+                )
+            elif tipo == 'editar_obra':
+                update_obra(obra_id, {
+                    'nome': f'Obra {obra_id} (sessão {indice})',
+                    'valor_total': valor_total,
+                    'num_medicoes': num_medicoes,
+                })
+            else:
+                add_obra(user_id, *gerar_obra(rng_np, 90000 + indice, 5, 12))
+            gravacoes.append((time.perf_counter() - inicio) * 1000)
+        except Exception as e:
+            erros.append(f"{tipo}: {type(e).__name__}: {e}")
+
+        if args.sem_leituras:
+            continue
+        inicio = time.perf_counter()
+        try:
+            calcular_indicadores(obra_ids=[obra_id])
+            leituras.append((time.perf_counter() - inicio) * 1000)
+        except Exception as e:
+            erros.append(f"leitura: {type(e).__name__}: {e}")
+
+        if args.pausa_ms:
+            time.sleep(rng.uniform(0, 2 * args.pausa_ms) / 1000)
+
+    resultados[indice] = (gravacoes, leituras, erros)
+
+
+def executar_carga(args, modo):
+    """Executa as sessões simuladas no modo informado ('fila' ou 'direto') e retorna as estatísticas"""
+    from database import db_utils
+
+    db_utils.WRITE_QUEUE = modo == 'fila'
+    obras = _carregar_obras()
+
+    resultados = {}
+    barreira = threading.Barrier(args.sessoes + 1)
+    threads = [
+        threading.Thread(target=_sessao, args=(i, obras, args, resultados, barreira), name=f'sessao-{i}')
+        for i in range(args.sessoes)
+    ]
+    for thread in threads:
+        thread.start()
+    barreira.wait()
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    segundos = time.perf_counter() - inicio
+
+    gravacoes = [t for g, _, _ in resultados.values() for t in g]
+    leituras = [t for _, l, _ in resultados.values() for t in l]
+    erros = [e for _, _, es in resultados.values() for e in es]
+    stats = {
+        'modo': modo,
+        'sessoes': args.sessoes,
+        'segundos': segundos,
+        'gravacoes_por_segundo': len(gravacoes) / segundos if segundos else 0.0,
+        'gravacoes': _resumo_latencias(gravacoes),
+        'leituras': _resumo_latencias(leituras),
+        'erros': len(erros),
+        'exemplos_erros': sorted(set(erros))[:5],
+        'pool': db_utils.get_pool_stats(),
+    }
+    if modo == 'fila':
+        stats['escritor'] = db_utils.get_writer_stats()
+    return stats
+
+
+def imprimir(stats):
+    g, l = stats['gravacoes'], stats['leituras']
+    print(f"\n[{stats['modo']}] {stats['sessoes']} sessões, {g['quantidade']} gravações em {stats['segundos']:.2f} s "
+          f"({stats['gravacoes_por_segundo']:.1f} gravações/s), {stats['erros']} erro(s)")
+    print(f"  gravações: p50 {g['p50_ms']:.1f} ms, p95 {g['p95_ms']:.1f} ms, p99 {g['p99_ms']:.1f} ms, "
+          f"máx {g['max_ms']:.1f} ms")
+    print(f"  leituras:  p50 {l['p50_ms']:.1f} ms, p95 {l['p95_ms']:.1f} ms, p99 {l['p99_ms']:.1f} ms, "
+          f"máx {l['max_ms']:.1f} ms")
+    if 'escritor' in stats:
+        e = stats['escritor']
+        print(f"  escritor:  {e['commits']} commits, {e['avg_batch']:.1f} gravações por commit "
+              f"(máx {e['max_batch_seen']})")
+    for erro in stats['exemplos_erros']:
+        print(f"  ERRO: {erro}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga das gravações concorrentes no SQLite")
+    parser.add_argument('--sessoes', type=int, default=50)
+    parser.add_argument('--operacoes', type=int, default=40, help="Gravações por sessão")
+    parser.add_argument('--pausa-ms', type=float, default=20, help="Pausa média entre operações de uma sessão")
+    parser.add_argument('--sem-leituras', action='store_true', help="Somente gravações, sem pausas nem leituras")
+    parser.add_argument('--modo', choices=['fila', 'direto', 'ambos'], default='ambos')
+    parser.add_argument('--usuarios', type=int, default=5)
+    parser.add_argument('--obras', type=int, default=10, help="Obras por usuário")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--banco', help="Usa uma cópia deste banco em vez de gerar dados sintéticos")
+    parser.add_argument('--saida', help="Arquivo JSON onde gravar os resultados")
+    args = parser.parse_args()
+
+    modos = ['direto', 'fila'] if args.modo == 'ambos' else [args.modo]
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # O caminho do banco precisa estar definido antes de importar o pacote database
+        base = os.path.join(tmp, 'base.db')
+        os.environ['OBRAS_DB_PATH'] = base
+        if RAIZ not in sys.path:
+            sys.path.insert(0, RAIZ)
+        from database import db_utils
+
+        if args.banco:
+            shutil.copyfile(args.banco, base)
+        else:
+            from database.dados_sinteticos import gerar_dados_sinteticos
+            gerar_dados_sinteticos(args.usuarios, args.obras, 20, 24, args.semente)
+
+        for modo in modos:
+            # Cada modo parte de uma cópia idêntica do banco (fechar as conexões grava o WAL na base)
+            caminho = os.path.join(tmp, f'{modo}.db')
+            db_utils.configure_database(caminho)
+            shutil.copyfile(base, caminho)
+            stats = executar_carga(args, modo)
+            imprimir(stats)
+            resultados.append(stats)
+        db_utils.configure_database(base)
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados gravados em {args.saida}")
+    return 1 if any(stats['erros'] for stats in resultados if stats['modo'] == 'fila') else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
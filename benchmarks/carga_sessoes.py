@@ -0,0 +1,434 @@
+"""
+Teste de carga das páginas: N sessões simuladas (streamlit.testing AppTest, sem navegador
+nem rede) entram pelo formulário de login de modules.auth com os usuários sintéticos e
+percorrem os fluxos reais, ao mesmo tempo e no mesmo processo:
+
+    Login -> Início -> Cadastro de Obra (salvar) -> Medições (salvar e gerar PDF) -> Relatórios
+
+Mede, por página/ação, a latência de cada execução (rerun) em percentis, a quantidade
+e o tempo de comandos SQL por execução e o crescimento da memória do processo.
+
+Uso: python -m benchmarks.carga_sessoes [--sessoes 10] [--iteracoes 3] [--usuarios 5] [--obras 10]
+                                        [--sem-pdf] [--banco obras.db] [--saida carga_sessoes.json]
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executa main.py como o servidor do Streamlit (bytecode compilado uma vez e compartilhado
+# entre as sessões) e acumula na sessão os comandos SQL de cada execução (a instrumentação
+# conta por thread e cada execução roda na thread do script)
+SCRIPT_SESSAO = '''
+import streamlit as st
+from database import instrumentacao
+from streamlit.testing.v1 import app_test
+
+_antes = instrumentacao.contadores_thread()
+try:
+    exec(app_test.ScriptCache().get_bytecode({main!r}), {{"__name__": "__main__", "__file__": {main!r}}})
+finally:
+    _depois = instrumentacao.contadores_thread()
+    _sql = st.session_state.get("_carga_sql", (0, 0.0))
+    st.session_state["_carga_sql"] = (_sql[0] + _depois[0] - _antes[0], _sql[1] + _depois[1] - _antes[1])
+'''
+
+# Intervalo entre as amostras de memória do processo (s)
+INTERVALO_MEMORIA = 0.5
+
+
+def percentil(valores, p):
+    """Percentil (0-100) de uma lista de valores, pelo vizinho mais próximo"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def memoria_mb():
+    """Memória residente (RSS) do processo em MB, lida de /proc"""
+    with open('/proc/self/status') as f:
+        for linha in f:
+            if linha.startswith('VmRSS:'):
+                return int(linha.split()[1]) / 1024
+    return 0.0
+
+
+def runtime_compartilhado():
+    """
+    O AppTest cria um Runtime simulado e um cache de bytecode novos a cada execução e
+    descarta o Runtime ao final, o que quebra as execuções simultâneas de outras sessões;
+    como no servidor, todas as sessões passam a usar um único Runtime (com os caches
+    st.cache_data/st.cache_resource compartilhados) e um único cache de bytecode
+    """
+    import contextlib
+    from unittest.mock import MagicMock
+
+    from streamlit import config
+    from streamlit.components.v2.component_manager import BidiComponentManager
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test
+    from streamlit.testing.v1.util import build_mock_config_get_option
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.dataframe_source_mgr = DataframeSourceManager()
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    componentes = BidiComponentManager()
+    componentes.discover_and_register_components(start_file_watching=False)
+    runtime.bidi_component_registry = componentes
+    Runtime._instance = runtime
+
+    # As atribuições de Runtime._instance feitas pelo AppTest vão para uma classe avulsa
+    app_test.Runtime = type('RuntimeAppTest', (), {'_instance': None})
+    script_cache = ScriptCache()
+    app_test.ScriptCache = lambda: script_cache
+    # A opção global.appTest fica ligada durante todo o teste, em vez de ligada e
+    # desligada a cada execução (o que se embaralha com várias threads)
+    config.get_option = build_mock_config_get_option({'global.appTest': True})
+    app_test.patch_config_options = lambda opcoes: contextlib.nullcontext()
+
+
+class Medicoes:
+    """Execuções registradas pelas sessões: (página, ms, comandos SQL, ms de SQL, erros)"""
+
+    def __init__(self):
+        self.execucoes = []
+        self.memoria = []  # (iterações concluídas, RSS em MB)
+        self.falhas = []
+        self._lock = threading.Lock()
+        self._iteracoes = 0
+
+    def registrar(self, pagina, ms, sql, sql_ms, erros):
+        with self._lock:
+            self.execucoes.append((pagina, ms, sql, sql_ms, erros))
+
+    def iteracao_concluida(self):
+        with self._lock:
+            self._iteracoes += 1
+            self.memoria.append((self._iteracoes, memoria_mb()))
+
+    def falha(self, sessao, etapa, erro):
+        with self._lock:
+            self.falhas.append((sessao, etapa, erro))
+
+
+class Sessao:
+    """Uma sessão do navegador simulada com AppTest; cada passo é uma execução medida"""
+
+    def __init__(self, indice, username, senha, medicoes, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.indice = indice
+        self.username = username
+        self.senha = senha
+        self.medicoes = medicoes
+        self.rng = random.Random(indice)
+        self.obras = 0
+        self.at = AppTest.from_string(
+            SCRIPT_SESSAO.format(main=os.path.join(RAIZ, 'main.py')), default_timeout=timeout
+        )
+
+    def _executar(self, pagina, acao=None):
+        """Executa (acao() prepara os widgets, ex.: clicar um botão) e registra a execução"""
+        at = self.at
+        sql_antes = at.session_state['_carga_sql'] if '_carga_sql' in at.session_state else (0, 0.0)
+        inicio = time.perf_counter()
+        if acao is not None:
+            acao(at)
+        at.run()
+        ms = (time.perf_counter() - inicio) * 1000
+        sql = at.session_state['_carga_sql'] if '_carga_sql' in at.session_state else (0, 0.0)
+        erros = [str(e.value) for e in at.exception] + [str(e.value) for e in at.error]
+        self.medicoes.registrar(pagina, ms, sql[0] - sql_antes[0], sql[1] - sql_antes[1], erros)
+        return at
+
+    def _obras_cadastradas(self):
+        from database.db_utils import get_db_connection
+
+        conn = get_db_connection()
+        try:
+            return conn.execute('SELECT COUNT(*) FROM obras WHERE nome = ?',
+                                (f'Obra de carga {self.indice}',)).fetchone()[0] > self.obras
+        finally:
+            conn.close()
+
+    def _widget(self, colecao, label):
+        return next(w for w in colecao if w.label == label)
+
+    def login(self):
+        self._executar('Login (formulário)')
+
+        def entrar(at):
+            self._widget(at.text_input, 'Usuário').set_value(self.username)
+            self._widget(at.text_input, 'Senha').set_value(self.senha)
+            return self._widget(at.button, 'Entrar').click()
+
+        self._executar('Login', entrar)
+        if 'user_id' not in self.at.session_state or not self.at.session_state['user_id']:
+            raise RuntimeError(f"Login de {self.username} falhou")
+
+    def abrir(self, pagina):
+        return self._executar(pagina, lambda at: at.sidebar.selectbox[0].select(pagina))
+
+    def cadastrar_obra(self):
+        self.abrir('Cadastro de Obra')
+        num_medicoes = 3
+
+        def preencher(at):
+            self._widget(at.text_input, 'Nome da Obra').set_value(f'Obra de carga {self.indice}')
+            self._widget(at.text_input, 'Número do Contrato').set_value(f'CARGA/{self.indice:04d}')
+            self._widget(at.number_input, 'Valor Total da Obra (R$)').set_value(300.0)
+            self._widget(at.number_input, 'Quantidade de Itens').set_value(1)
+            return self._widget(at.number_input, 'Quantidade de Medições').set_value(num_medicoes)
+
+        self._executar('Cadastro de Obra: preencher', preencher)
+
+        # A grade (data_editor) não é interativa no AppTest; o plano entra pela colagem do Excel
+        def colar(at):
+            at.text_area(key='plano_colagem').set_value('\t'.join(['Item de carga'] + ['100,00'] * num_medicoes))
+            return at.button(key='btn_colar_plano').click()
+
+        self._executar('Cadastro de Obra: colar plano', colar)
+
+        def salvar(at):
+            return at.button(key='btn_salvar_obra').click()
+
+        at = self._executar('Cadastro de Obra: salvar', salvar)
+        # A mensagem de sucesso some com o st.rerun() da página; confere no banco
+        if at.warning or not self._obras_cadastradas():
+            raise RuntimeError("A obra não foi cadastrada")
+        self.obras += 1
+
+    def registrar_medicao(self, gerar_pdf=True):
+        at = self.abrir('Medições')
+        if not any(b.key == 'btn_salvar_medicao' for b in at.button):
+            return
+
+        def salvar(at):
+            for campo in at.text_input:
+                if campo.label == 'Valor realizado':
+                    campo.set_value(f"{self.rng.uniform(0, 100000):.2f}".replace('.', ','))
+            return at.button(key='btn_salvar_medicao').click()
+
+        self._executar('Medições: salvar', salvar)
+        if gerar_pdf:
+            self._executar('Medições: gerar PDF', lambda at: at.button(key='btn_gerar_pdf').click())
+
+    def executar(self, iteracoes, gerar_pdf=True):
+        etapa = 'login'
+        try:
+            self.login()
+            for _ in range(iteracoes):
+                etapa = 'Início'
+                self.abrir('Início')
+                etapa = 'Cadastro de Obra'
+                self.cadastrar_obra()
+                etapa = 'Medições'
+                self.registrar_medicao(gerar_pdf)
+                etapa = 'Relatórios'
+                self.abrir('Relatórios')
+                self.medicoes.iteracao_concluida()
+        except Exception as e:
+            self.medicoes.falha(self.indice, etapa, f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=3)}")
+
+
+def _amostrar_memoria(parar, amostras):
+    while not parar.wait(INTERVALO_MEMORIA):
+        amostras.append(memoria_mb())
+
+
+def tarefas_em_andamento():
+    """Quantidade de tarefas em segundo plano (PDFs) pendentes ou em execução"""
+    from database.db_utils import get_db_connection
+    from utils import jobs
+
+    conn = get_db_connection()
+    try:
+        return conn.execute('SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)',
+                            (jobs.PENDENTE, jobs.EXECUTANDO)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def resumir(medicoes, segundos):
+    """Estatísticas por página e da memória"""
+    import numpy as np
+
+    paginas = {}
+    for pagina, ms, sql, sql_ms, erros in medicoes.execucoes:
+        paginas.setdefault(pagina, []).append((ms, sql, sql_ms, erros))
+
+    resumo = {}
+    for pagina, execucoes in paginas.items():
+        tempos = [e[0] for e in execucoes]
+        sql = [e[1] for e in execucoes]
+        resumo[pagina] = {
+            'execucoes': len(execucoes),
+            'p50_ms': percentil(tempos, 50),
+            'p95_ms': percentil(tempos, 95),
+            'p99_ms': percentil(tempos, 99),
+            'max_ms': max(tempos),
+            'sql_por_execucao': sum(sql) / len(sql),
+            'sql_max': max(sql),
+            'sql_ms_por_execucao': sum(e[2] for e in execucoes) / len(execucoes),
+            'erros': sum(1 for e in execucoes if e[3]),
+            'exemplos_erros': sorted({erro for e in execucoes for erro in e[3]})[:3],
+        }
+
+    # Crescimento da memória: inclinação da RSS pelas iterações concluídas, descartando
+    # a primeira metade (importações e caches ainda sendo preenchidos)
+    crescimento_kb = 0.0
+    pontos = medicoes.memoria[len(medicoes.memoria) // 2:]
+    if len(pontos) >= 2 and pontos[-1][0] > pontos[0][0]:
+        x, y = np.array(pontos, dtype=float).T
+        crescimento_kb = float(np.polyfit(x, y, 1)[0]) * 1024
+
+    return {
+        'segundos': segundos,
+        'execucoes': len(medicoes.execucoes),
+        'execucoes_por_segundo': len(medicoes.execucoes) / segundos if segundos else 0.0,
+        'paginas': resumo,
+        'crescimento_kb_por_iteracao': crescimento_kb,
+        'falhas': medicoes.falhas,
+    }
+
+
+def executar(args, tmp):
+    """Gera (ou copia) o banco, executa as sessões em threads e retorna o resumo"""
+    from database.db_utils import get_pool_stats, get_writer_stats
+    from database.dados_sinteticos import gerar_dados_sinteticos
+    from database.migrate import apply_migrations
+
+    if args.banco:
+        apply_migrations()
+    else:
+        gerar_dados_sinteticos(args.usuarios, args.obras, args.max_itens, args.max_medicoes, args.semente)
+
+    runtime_compartilhado()
+    medicoes = Medicoes()
+    sessoes = [
+        Sessao(i, f"usuario{i % args.usuarios + 1:03d}", args.senha, medicoes, args.timeout)
+        for i in range(args.sessoes)
+    ]
+
+    gc.collect()
+    memoria = {'inicial_mb': memoria_mb()}
+    amostras = []
+    parar = threading.Event()
+    amostrador = threading.Thread(target=_amostrar_memoria, args=(parar, amostras), daemon=True)
+    amostrador.start()
+
+    threads = []
+    inicio = time.perf_counter()
+    for sessao in sessoes:
+        thread = threading.Thread(target=sessao.executar, args=(args.iteracoes, not args.sem_pdf),
+                                  name=f'sessao-{sessao.indice}')
+        thread.start()
+        threads.append(thread)
+        # Entrada escalonada das sessões, como usuários chegando ao longo do tempo
+        time.sleep(args.rampa / max(args.sessoes, 1))
+    for thread in threads:
+        thread.join()
+    segundos = time.perf_counter() - inicio
+    parar.set()
+
+    # Tarefas de PDF ainda em execução terminam antes da medição final
+    limite = time.monotonic() + args.timeout
+    while tarefas_em_andamento() and time.monotonic() < limite:
+        time.sleep(0.2)
+
+    resumo = resumir(medicoes, segundos)
+    gc.collect()
+    memoria.update({
+        'pico_mb': max(amostras + [memoria_mb()]),
+        'final_mb': memoria_mb(),
+    })
+    memoria['crescimento_mb'] = memoria['final_mb'] - memoria['inicial_mb']
+    resumo['memoria'] = memoria
+    resumo['pool'] = get_pool_stats()
+    resumo['escritor'] = get_writer_stats()
+    return resumo
+
+
+def imprimir(resumo, args):
+    print(f"\n{args.sessoes} sessões x {args.iteracoes} iterações: {resumo['execucoes']} execuções em "
+          f"{resumo['segundos']:.1f} s ({resumo['execucoes_por_segundo']:.1f} execuções/s)\n")
+    print(f"{'Página / ação':30s} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'máx ms':>9} "
+          f"{'SQL/exec':>9} {'SQL ms':>8} {'erros':>6}")
+    for pagina, p in resumo['paginas'].items():
+        print(f"{pagina:30s} {p['execucoes']:5d} {p['p50_ms']:9.1f} {p['p95_ms']:9.1f} {p['p99_ms']:9.1f} "
+              f"{p['max_ms']:9.1f} {p['sql_por_execucao']:9.1f} {p['sql_ms_por_execucao']:8.1f} {p['erros']:6d}")
+        for erro in p['exemplos_erros']:
+            print(f"    ERRO: {erro[:200]}")
+
+    m = resumo['memoria']
+    print(f"\nMemória (RSS): inicial {m['inicial_mb']:.0f} MB, pico {m['pico_mb']:.0f} MB, final {m['final_mb']:.0f} MB "
+          f"(+{m['crescimento_mb']:.0f} MB); crescimento após o aquecimento: "
+          f"{resumo['crescimento_kb_por_iteracao']:.0f} KB por iteração de sessão")
+    e = resumo['escritor']
+    print(f"Escritor único: {e['completed']} gravações em {e['commits']} commits; "
+          f"pool: {resumo['pool']['waits']} espera(s) por conexão")
+    for sessao, etapa, erro in resumo['falhas']:
+        print(f"FALHA na sessão {sessao} ({etapa}): {erro}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga das páginas com sessões simuladas (AppTest)")
+    parser.add_argument('--sessoes', type=int, default=10)
+    parser.add_argument('--iteracoes', type=int, default=3, help="Vezes que cada sessão percorre o fluxo")
+    parser.add_argument('--rampa', type=float, default=2.0, help="Segundos para todas as sessões entrarem")
+    parser.add_argument('--sem-pdf', action='store_true', help="Não gera relatórios PDF nas medições")
+    parser.add_argument('--usuarios', type=int, default=5)
+    parser.add_argument('--obras', type=int, default=10, help="Obras por usuário")
+    parser.add_argument('--max-itens', type=int, default=10)
+    parser.add_argument('--max-medicoes', type=int, default=24)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--senha', default='senha123', help="Senha dos usuários sintéticos")
+    parser.add_argument('--timeout', type=float, default=120, help="Tempo máximo de uma execução (s)")
+    parser.add_argument('--banco', help="Usa uma cópia deste banco (usuários usuario001...) em vez de gerar dados")
+    parser.add_argument('--saida', help="Arquivo JSON onde gravar os resultados")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Banco, logs e artefatos das tarefas ficam no diretório temporário; definidos antes
+        # de importar o pacote database. A instrumentação de SQL conta os comandos por execução
+        caminho_banco = os.path.join(tmp, 'obras.db')
+        if args.banco:
+            shutil.copyfile(args.banco, caminho_banco)
+        os.environ.update({
+            'OBRAS_DB_PATH': caminho_banco,
+            'OBRAS_LOG_DIR': os.path.join(tmp, 'logs'),
+            'OBRAS_JOBS_DIR': os.path.join(tmp, 'jobs'),
+            'OBRAS_SQL_INSTRUMENTACAO': '1',
+        })
+        if RAIZ not in sys.path:
+            sys.path.insert(0, RAIZ)
+
+        resumo = executar(args, tmp)
+        imprimir(resumo, args)
+
+    if args.saida:
+        resumo['parametros'] = {k: v for k, v in vars(args).items() if k != 'saida'}
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(resumo, f, indent=2, ensure_ascii=False)
+        print(f"Resultados gravados em {args.saida}")
+    return 1 if resumo['falhas'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
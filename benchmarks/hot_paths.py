@@ -0,0 +1,296 @@
+"""
+Benchmark dos caminhos críticos do sistema sobre uma carteira sintética
+(database.dados_sinteticos): consultas e indicadores dos relatórios, cálculo de glosa,
+cadastro de obras, gravação de medições, geração de PDF e leitura de planilhas.
+
+Os resultados são gravados em JSON para comparação entre execuções.
+
+Uso: python -m benchmarks.hot_paths [--usuarios 5] [--obras 20] [--repeticoes 5]
+                                    [--saida resultados.json] [--comparar anterior.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Aumento máximo aceito na mediana de um benchmark em relação à execução anterior
+TOLERANCIA = 0.20
+
+
+def medir(func, repeticoes=5, aquecimento=1, preparar=None):
+    """Executa func repetidas vezes e retorna as estatísticas de tempo em ms"""
+    for _ in range(aquecimento):
+        func(preparar() if preparar else None)
+
+    tempos = []
+    for _ in range(repeticoes):
+        arg = preparar() if preparar else None
+        inicio = time.perf_counter()
+        func(arg)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+    tempos.sort()
+    return {
+        'repeticoes': repeticoes,
+        'min_ms': tempos[0],
+        'mediana_ms': statistics.median(tempos),
+        'media_ms': statistics.fmean(tempos),
+        'p95_ms': tempos[min(len(tempos) - 1, int(round(0.95 * (len(tempos) - 1))))],
+        'max_ms': tempos[-1],
+        'desvio_ms': statistics.stdev(tempos) if len(tempos) > 1 else 0.0,
+    }
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _planilha_exemplo(num_medicoes=12, linhas_extras=200):
+    """Monta um DataFrame no formato esperado pela tela de importação"""
+    import numpy as np
+    import pandas as pd
+    from utils.formatters import format_currency_br
+
+    rng = np.random.default_rng(0)
+    colunas = ['Descrição'] + [f"Medição {i}" for i in range(1, num_medicoes + 1)]
+    previsto = np.linspace(100 / num_medicoes, 100, num_medicoes).round(2)
+    linhas = [[f"Item {i}"] + list(np.round(rng.random(num_medicoes) * 1000, 2))
+              for i in range(linhas_extras)]
+    linhas.append(['Previsto acumulado (%)'] + list(previsto))
+    linhas.append(['Realizado acumulado (%)'] + list((previsto * 0.9).round(2)))
+    linhas.append(['Valores previstos'] + [format_currency_br(v * 10000) for v in previsto])
+    linhas.append(['Valores realizados'] + [format_currency_br(v * 9000) for v in previsto])
+    return pd.DataFrame(linhas, columns=colunas)
+
+
+def executar(args, tmp):
+    """Gera (ou reaproveita) a base de dados e executa todos os benchmarks"""
+    import numpy as np
+    import pandas as pd
+
+    from database.db_utils import get_db_connection, add_obra, update_realizados
+    from database.cache import query_cache
+    from database.consultas import pesquisar_obras, buscar_obra, indicadores_obra
+    from database.dados_sinteticos import gerar_dados_sinteticos, gerar_obra
+    from utils.calculadora import calcular_glosa, calcular_glosa_lote, carregar_fatores_imr
+    from utils.indicadores import calcular_indicadores, resumo_portfolio
+    from modules.importar import extrair_dados_planilha
+    from utils.planilhas import extrair_obras
+    from modules.pdf_generator import generate_pdf_report, gerar_pdf_bytes, pdf_cache
+    from modules.graficos_pdf import desenhos_obra
+    from modules.exportacao import exportar
+
+    if not args.banco:
+        inicio = time.perf_counter()
+        volume = gerar_dados_sinteticos(args.usuarios, args.obras, args.max_itens, args.max_medicoes, args.semente)
+        volume['tempo_geracao_s'] = time.perf_counter() - inicio
+    else:
+        volume = {}
+
+    conn = get_db_connection()
+    try:
+        # Usuário e obra com mais medições, para exercitar o pior caso das telas
+        user_id, obra_id = conn.execute('''
+        SELECT o.user_id, o.id FROM obras o
+        JOIN medicoes m ON m.obra_id = o.id
+        GROUP BY o.id
+        ORDER BY COUNT(*) DESC
+        LIMIT 1
+        ''').fetchone()
+        item_ids = [r[0] for r in conn.execute(
+            'SELECT id FROM itens_obra WHERE obra_id = ? ORDER BY id', (obra_id,)
+        )]
+        valor_total = conn.execute('SELECT valor_total FROM obras WHERE id = ?', (obra_id,)).fetchone()[0]
+        linhas_usuario = conn.execute('''
+        SELECT r.obra_id, r.numero_medicao, r.total_previsto, r.total_realizado
+        FROM medicoes_resumo r JOIN obras o ON o.id = r.obra_id
+        WHERE o.user_id = ? AND r.itens_realizados > 0
+        ''', (user_id,)).fetchall()
+        if not volume:
+            volume = {
+                'obras': conn.execute('SELECT COUNT(*) FROM obras').fetchone()[0],
+                'medicoes': conn.execute('SELECT COUNT(*) FROM medicoes').fetchone()[0],
+            }
+    finally:
+        conn.close()
+
+    obras_glosa = np.array([l[0] for l in linhas_usuario])
+    medicoes_glosa = np.array([l[1] for l in linhas_usuario])
+    idps_glosa = np.array([l[3] / l[2] if l[2] else 1.0 for l in linhas_usuario])
+
+    rng = np.random.default_rng(args.semente)
+    planilha = _planilha_exemplo()
+    caminho_xlsx = os.path.join(tmp, 'planilha.xlsx')
+    planilha.to_excel(caminho_xlsx, index=False)
+
+    def sem_cache(func):
+        def executar_sem_cache(_):
+            query_cache.clear()
+            return func()
+        return executar_sem_cache
+
+    def relatorio_obra():
+        pesquisar_obras(user_id)
+        obra = buscar_obra(obra_id)
+        indicadores = indicadores_obra(obra_id)
+        return obra, indicadores
+
+    dados_obra_pdf = {
+        'nome': 'Obra', 'contrato': '2024/00001', 'ordem_servico': 'OS-1',
+        'contratante': 'Contratante', 'contratada': 'Contratada', 'valor_total': valor_total
+    }
+    dados_medicao_pdf = {
+        'valor_previsto': 1000.0, 'valor_realizado': 900.0, 'percentual_previsto': 10.0,
+        'percentual_realizado': 9.0, 'idp': 0.9, 'desvio': -1.0
+    }
+
+    def gerar_pdf(_):
+        atual = os.getcwd()
+        os.chdir(tmp)
+        try:
+            generate_pdf_report(obra_id, 1, dados_obra_pdf, dados_medicao_pdf, None)
+        finally:
+            os.chdir(atual)
+
+    def gerar_pdf_memoria(_):
+        pdf_cache.clear()
+        return gerar_pdf_bytes(obra_id, 1, dados_obra_pdf, dados_medicao_pdf)
+
+    def gerar_pdf_com_graficos(_):
+        pdf_cache.clear()
+        return gerar_pdf_bytes(obra_id, 1, dados_obra_pdf, dados_medicao_pdf, desenhos_obra(obra_id))
+
+    benchmarks = {
+        'relatorios_consultas_frio': (sem_cache(relatorio_obra), None),
+        'relatorios_consultas_cache': (lambda _: relatorio_obra(), None),
+        'relatorios_indicadores_obra': (lambda _: calcular_indicadores(obra_ids=[obra_id]), None),
+        'relatorios_carteira_usuario': (
+            lambda _: resumo_portfolio(calcular_indicadores(user_id=user_id)), None
+        ),
+        'glosa_escalar_loop': (
+            lambda _: [calcular_glosa(int(o), i, int(n))
+                       for o, i, n in zip(obras_glosa, idps_glosa, medicoes_glosa)], None
+        ),
+        'glosa_lote': (
+            lambda _: calcular_glosa_lote(obras_glosa, idps_glosa, medicoes_glosa), None
+        ),
+        'glosa_lote_fatores_carregados': (
+            lambda fatores: calcular_glosa_lote(obras_glosa, idps_glosa, medicoes_glosa, fatores),
+            lambda: carregar_fatores_imr(obras_glosa)
+        ),
+        'cadastro_add_obra': (
+            lambda obra: add_obra(user_id, *obra),
+            lambda: gerar_obra(rng, 99999, args.max_itens, args.max_medicoes)
+        ),
+        'medicao_update_realizados': (
+            lambda valores: update_realizados(obra_id, item_ids, 1, valores, valor_total),
+            lambda: np.round(rng.uniform(0, 10000, len(item_ids)), 2)
+        ),
+        'pdf_generate_report': (gerar_pdf, None),
+        'pdf_bytes_memoria': (gerar_pdf_memoria, None),
+        'pdf_bytes_cache': (lambda _: gerar_pdf_bytes(obra_id, 1, dados_obra_pdf, dados_medicao_pdf), None),
+        'pdf_desenhos_graficos': (lambda _: desenhos_obra(obra_id), None),
+        'pdf_bytes_com_graficos': (gerar_pdf_com_graficos, None),
+        'importar_extrair_dados': (lambda _: extrair_dados_planilha(planilha), None),
+        'importar_read_excel': (lambda _: extrair_dados_planilha(pd.read_excel(caminho_xlsx)), None),
+        'importar_streaming': (lambda _: extrair_obras(caminho_xlsx), None),
+        'exportar_csv_usuario': (
+            lambda _: exportar(os.path.join(tmp, 'medicoes.csv'), user_id=user_id, indicadores=True), None
+        ),
+        'exportar_xlsx_usuario': (
+            lambda _: exportar(os.path.join(tmp, 'medicoes.xlsx'), user_id=user_id, indicadores=True), None
+        ),
+    }
+
+    selecionados = args.apenas or list(benchmarks)
+    resultados = {}
+    for nome in selecionados:
+        func, preparar = benchmarks[nome]
+        resultados[nome] = medir(func, args.repeticoes, preparar=preparar)
+        print(f"{nome:32s} mediana {resultados[nome]['mediana_ms']:10.2f} ms  "
+              f"(min {resultados[nome]['min_ms']:.2f}, p95 {resultados[nome]['p95_ms']:.2f})")
+    return volume, resultados
+
+
+def comparar(resultados, anterior, tolerancia=TOLERANCIA):
+    """Retorna a lista de (nome, mediana anterior, mediana atual) que pioraram além da tolerância"""
+    regressoes = []
+    for nome, atual in resultados.items():
+        antes = anterior.get('resultados', {}).get(nome)
+        if antes and atual['mediana_ms'] > antes['mediana_ms'] * (1 + tolerancia):
+            regressoes.append((nome, antes['mediana_ms'], atual['mediana_ms']))
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos caminhos críticos sobre dados sintéticos")
+    parser.add_argument('--usuarios', type=int, default=5)
+    parser.add_argument('--obras', type=int, default=20, help="Obras por usuário")
+    parser.add_argument('--max-itens', type=int, default=20)
+    parser.add_argument('--max-medicoes', type=int, default=60)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--banco', help="Usa uma cópia deste banco em vez de gerar dados sintéticos")
+    parser.add_argument('--apenas', nargs='*', help="Executa somente os benchmarks informados")
+    parser.add_argument('--saida', help="Arquivo JSON onde gravar os resultados")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior para detectar regressões")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho_banco = os.path.join(tmp, 'obras.db')
+        if args.banco:
+            import shutil
+            shutil.copyfile(args.banco, caminho_banco)
+        # O caminho do banco precisa estar definido antes de importar o pacote database
+        os.environ['OBRAS_DB_PATH'] = caminho_banco
+        if RAIZ not in sys.path:
+            sys.path.insert(0, RAIZ)
+
+        volume, resultados = executar(args, tmp)
+
+        from database.db_utils import get_pool_stats
+        from database.cache import get_cache_stats
+        saida = {
+            'metadados': {
+                'data': datetime.now().isoformat(timespec='seconds'),
+                'commit': _commit_atual(),
+                'python': platform.python_version(),
+                'plataforma': platform.platform(),
+                'parametros': {k: v for k, v in vars(args).items() if k not in ('saida', 'comparar')},
+                'volume': volume,
+                'pool': get_pool_stats(),
+                'cache': get_cache_stats(),
+            },
+            'resultados': resultados,
+        }
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(saida, f, indent=2, ensure_ascii=False)
+        print(f"Resultados gravados em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            regressoes = comparar(resultados, json.load(f), args.tolerancia)
+        for nome, antes, depois in regressoes:
+            print(f"REGRESSÃO: {nome}: {antes:.2f} ms -> {depois:.2f} ms")
+        return 1 if regressoes else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Benchmark de inicialização a frio: mede, com python -X importtime, o custo de
+importar main.py e falha quando o orçamento é excedido ou quando módulos pesados
+(pandas, plotly, reportlab...) voltam a ser importados antes de alguma página abrir.
+
+Uso: python -m benchmarks.importtime [--budget-ms 150] [--repeticoes 5] [--json saida.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Orçamento, em ms, do tempo de importação do próprio projeto (sem o Streamlit)
+BUDGET_MS = float(os.environ.get('OBRAS_IMPORT_BUDGET_MS', '150'))
+
+# Frameworks cujo custo de importação não é controlado pelo projeto
+FRAMEWORKS = ('streamlit',)
+
+# Módulos que só devem ser carregados quando uma página for aberta
+PROIBIDOS = ('pandas', 'numpy', 'plotly', 'reportlab', 'openpyxl', 'pyarrow', 'kaleido')
+
+
+def _medir(alvo):
+    """Executa um processo novo com -X importtime e retorna as linhas (self_us, cumul_us, nome, nível)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, OBRAS_DB_PATH=os.path.join(tmp, 'obras.db'))
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {alvo}'],
+            cwd=RAIZ, env=env, capture_output=True, text=True
+        )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {alvo}:\n{proc.stderr[-2000:]}")
+
+    linhas = []
+    for linha in proc.stderr.splitlines():
+        if not linha.startswith('import time:') or 'self [us]' in linha:
+            continue
+        self_us, cumul_us, nome = linha[len('import time:'):].split('|')
+        nivel = (len(nome) - len(nome.lstrip(' '))) // 2
+        linhas.append((int(self_us), int(cumul_us), nome.strip(), nivel))
+    return linhas
+
+
+def _ancestrais(linhas):
+    """Para cada linha, a cadeia de módulos que a importou (a saída vem em pós-ordem)"""
+    cadeias = [None] * len(linhas)
+    pilha = []
+    for i in range(len(linhas) - 1, -1, -1):
+        _, _, nome, nivel = linhas[i]
+        del pilha[nivel:]
+        cadeias[i] = list(pilha)
+        pilha.append(nome)
+    return cadeias
+
+
+def analisar(linhas, alvo):
+    cadeias = _ancestrais(linhas)
+    total = next((c for _, c, nome, nivel in linhas if nome == alvo and nivel <= 1), 0)
+    frameworks = sum(
+        c for (_, c, nome, _), cadeia in zip(linhas, cadeias)
+        if nome.split('.')[0] in FRAMEWORKS
+        and not any(a.split('.')[0] in FRAMEWORKS for a in cadeia)
+    )
+    # Módulos pesados importados fora do Streamlit (que faz suas próprias importações tardias)
+    pesados = sorted({
+        nome.split('.')[0] for (_, _, nome, _), cadeia in zip(linhas, cadeias)
+        if nome.split('.')[0] in PROIBIDOS
+        and not any(a.split('.')[0] in FRAMEWORKS for a in cadeia)
+    })
+    maiores = sorted(
+        ((c, nome) for (_, c, nome, nivel), cadeia in zip(linhas, cadeias)
+         if cadeia[-1:] == [alvo] and nome.split('.')[0] not in FRAMEWORKS),
+        reverse=True
+    )[:10]
+    return {
+        'total_ms': total / 1000,
+        'frameworks_ms': frameworks / 1000,
+        'projeto_ms': (total - frameworks) / 1000,
+        'pesados': pesados,
+        'maiores': [(nome, c / 1000) for c, nome in maiores],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de importação a frio do main.py")
+    parser.add_argument('--alvo', default='main', help="Módulo a importar (padrão: main)")
+    parser.add_argument('--budget-ms', type=float, default=BUDGET_MS)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--json', help="Arquivo onde gravar o resultado")
+    args = parser.parse_args()
+
+    resultados = [analisar(_medir(args.alvo), args.alvo) for _ in range(args.repeticoes)]
+    projeto_ms = statistics.median(r['projeto_ms'] for r in resultados)
+    total_ms = statistics.median(r['total_ms'] for r in resultados)
+    pesados = sorted(set().union(*(r['pesados'] for r in resultados)))
+
+    print(f"Importação de {args.alvo}: {total_ms:.1f} ms no total, "
+          f"{projeto_ms:.1f} ms do projeto (orçamento: {args.budget_ms:.0f} ms)")
+    for nome, ms in resultados[-1]['maiores']:
+        print(f"  {ms:8.1f} ms  {nome}")
+
+    falhas = []
+    if projeto_ms > args.budget_ms:
+        falhas.append(f"tempo de importação do projeto acima do orçamento ({projeto_ms:.1f} ms)")
+    if pesados:
+        falhas.append(f"módulos pesados importados na inicialização: {', '.join(pesados)}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'alvo': args.alvo,
+                'total_ms': total_ms,
+                'projeto_ms': projeto_ms,
+                'budget_ms': args.budget_ms,
+                'pesados': pesados,
+                'falhas': falhas,
+            }, f, indent=2, ensure_ascii=False)
+
+    for falha in falhas:
+        print(f"FALHA: {falha}")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1 @@
-from .db_utils import get_db_connection, create_tables
+from .db_utils import get_db_connection, create_tables, configure_database, get_pool_stats
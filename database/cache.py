@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Limites do cache de consultas (entradas e tempo máximo de vida em segundos)
+CACHE_MAX_ENTRIES = int(os.environ.get('OBRAS_CACHE_MAX_ENTRIES', '512'))
+CACHE_TTL = float(os.environ.get('OBRAS_CACHE_TTL', '300'))
+
+# Contadores de versão dos dados, incrementados a cada escrita
+_versoes = {}
+_versoes_lock = threading.Lock()
+
+
+def versao_obra(obra_id):
+    """Versão atual dos dados de uma obra"""
+    return _versoes.get(('obra', obra_id), 0)
+
+
+def versao_usuario(user_id):
+    """Versão atual da lista de obras (e da carteira) de um usuário"""
+    return _versoes.get(('usuario', user_id), 0)
+
+
+def invalidar_obra(obra_id, user_id=None):
+    """Marca os dados da obra (e, se informado, da carteira do usuário) como alterados"""
+    with _versoes_lock:
+        _versoes[('obra', obra_id)] = versao_obra(obra_id) + 1
+        if user_id is not None:
+            _versoes[('usuario', user_id)] = versao_usuario(user_id) + 1
+
+
+def invalidar_usuario(user_id):
+    """Marca a lista de obras de um usuário como alterada"""
+    with _versoes_lock:
+        _versoes[('usuario', user_id)] = versao_usuario(user_id) + 1
+
+
+class QueryCache:
+    """Cache LRU de resultados de consultas, com limite de entradas e TTL"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    def get_or_compute(self, chave, func):
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._entries.get(chave)
+            if entrada is not None:
+                valor, criado_em = entrada
+                if agora - criado_em <= self.ttl:
+                    self._entries.move_to_end(chave)
+                    self._stats['hits'] += 1
+                    return valor
+                del self._entries[chave]
+                self._stats['expirations'] += 1
+            self._stats['misses'] += 1
+
+        valor = func()
+
+        with self._lock:
+            self._entries[chave] = (valor, agora)
+            self._entries.move_to_end(chave)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+        return valor
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['max_entries'] = self.max_entries
+        total = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / total if total else 0.0
+        return stats
+
+
+query_cache = QueryCache()
+
+
+def get_cache_stats():
+    """Retorna acertos, falhas, taxa de acerto e remoções do cache de consultas"""
+    return query_cache.stats()
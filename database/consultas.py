@@ -0,0 +1,164 @@
+import re
+
+from database.db_utils import get_db_connection
+from database.cache import query_cache, versao_obra, versao_usuario
+
+# Consultas de leitura usadas pelas páginas, memorizadas pela versão dos dados.
+# Os resultados são compartilhados entre execuções: não devem ser alterados pelo chamador.
+
+CAMPOS_OBRA = [
+    'id', 'user_id', 'nome', 'contrato', 'ordem_servico', 'contratante', 'contratada',
+    'valor_total', 'data_inicio', 'data_fim', 'duracao_prevista', 'num_medicoes'
+]
+
+
+def _fetchall(sql, params=()):
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def listar_obras(user_id):
+    """Lista (id, nome, contrato) das obras do usuário, ordenadas por nome"""
+    return query_cache.get_or_compute(
+        ('listar_obras', user_id, versao_usuario(user_id)),
+        lambda: tuple(_fetchall('''
+        SELECT id, nome, contrato
+        FROM obras
+        WHERE user_id = ?
+        ORDER BY nome
+        ''', (user_id,)))
+    )
+
+
+def nomes_obras(user_id, obra_ids):
+    """Retorna {id: nome} somente das obras informadas que pertencem ao usuário"""
+    obra_ids = tuple(sorted({int(obra_id) for obra_id in obra_ids}))
+    if not obra_ids:
+        return {}
+    return dict(query_cache.get_or_compute(
+        ('nomes_obras', user_id, obra_ids, versao_usuario(user_id)),
+        lambda: tuple(_fetchall(f'''
+        SELECT id, nome
+        FROM obras
+        WHERE user_id = ? AND id IN ({', '.join('?' * len(obra_ids))})
+        ''', (user_id, *obra_ids)))
+    ))
+
+
+def termo_busca_fts(texto):
+    """
+    Converte o texto digitado em uma consulta FTS5: cada palavra vira um prefixo entre aspas
+    ("ponte" "2024"*), todas obrigatórias; a sintaxe do FTS5 no texto não tem efeito
+    """
+    palavras = re.findall(r'\w+', texto or '')
+    return ' '.join(f'"{palavra}"*' for palavra in palavras)
+
+
+def pesquisar_obras(user_id, texto='', limite=50, deslocamento=0):
+    """
+    Busca (por prefixo, pelo índice obras_busca) nas obras do usuário por nome, contrato,
+    ordem de serviço, contratante ou contratada; sem texto, lista todas
+    Retorna (total de obras encontradas, página de (id, nome, contrato) ordenada por nome)
+    """
+    consulta = termo_busca_fts(texto)
+
+    def consultar():
+        if consulta:
+            origem = 'obras_busca b JOIN obras o ON o.id = b.rowid'
+            filtro = 'obras_busca MATCH ? AND o.user_id = ?'
+            params = (consulta, user_id)
+        else:
+            origem, filtro, params = 'obras o', 'o.user_id = ?', (user_id,)
+        total = _fetchall(f'SELECT COUNT(*) FROM {origem} WHERE {filtro}', params)[0][0]
+        pagina = tuple(_fetchall(f'''
+        SELECT o.id, o.nome, o.contrato
+        FROM {origem}
+        WHERE {filtro}
+        ORDER BY o.nome, o.contrato, o.id
+        LIMIT ? OFFSET ?
+        ''', (*params, limite, deslocamento)))
+        return total, pagina
+
+    return query_cache.get_or_compute(
+        ('pesquisar_obras', user_id, consulta, limite, deslocamento, versao_usuario(user_id)), consultar
+    )
+
+
+def buscar_obra(obra_id):
+    """Retorna os dados cadastrais da obra como dicionário (ou None)"""
+    def consultar():
+        linhas = _fetchall(f"SELECT {', '.join(CAMPOS_OBRA)} FROM obras WHERE id = ?", (obra_id,))
+        return dict(zip(CAMPOS_OBRA, linhas[0])) if linhas else None
+
+    obra = query_cache.get_or_compute(('buscar_obra', obra_id, versao_obra(obra_id)), consultar)
+    return dict(obra) if obra else None
+
+
+def status_medicoes(obra_id):
+    """Retorna {numero_medicao: 1 se a medição já tem valor realizado, senão 0}"""
+    return query_cache.get_or_compute(
+        ('status_medicoes', obra_id, versao_obra(obra_id)),
+        lambda: {m[0]: m[1] for m in _fetchall('''
+        SELECT numero_medicao,
+               CASE WHEN itens_realizados > 0 THEN 1 ELSE 0 END as realizada
+        FROM medicoes_resumo
+        WHERE obra_id = ?
+        ''', (obra_id,))}
+    )
+
+
+def itens_medicao(obra_id, numero_medicao):
+    """Lista (item_id, descricao, valor_total_item, valor_previsto, valor_realizado) de uma medição"""
+    return query_cache.get_or_compute(
+        ('itens_medicao', obra_id, numero_medicao, versao_obra(obra_id)),
+        lambda: tuple(_fetchall('''
+        SELECT
+            i.id,
+            i.descricao,
+            i.valor_previsto as valor_total_item,
+            m.valor_previsto,
+            m.valor_realizado
+        FROM itens_obra i
+        LEFT JOIN medicoes m ON i.id = m.item_id AND m.numero_medicao = ?
+        WHERE i.obra_id = ?
+        ORDER BY i.id
+        ''', (numero_medicao, obra_id)))
+    )
+
+
+def fatores_imr(obra_id):
+    """Retorna {numero_medicao: fator_ponderacao} da obra"""
+    return query_cache.get_or_compute(
+        ('fatores_imr', obra_id, versao_obra(obra_id)),
+        lambda: dict(_fetchall('''
+        SELECT numero_medicao, fator_ponderacao
+        FROM imr_fatores
+        WHERE obra_id = ?
+        ORDER BY numero_medicao
+        ''', (obra_id,)))
+    )
+
+
+def indicadores_obra(obra_id):
+    """Indicadores (IDP, curvas acumuladas, glosa) de uma obra"""
+    from utils.indicadores import calcular_indicadores
+
+    return query_cache.get_or_compute(
+        ('indicadores_obra', obra_id, versao_obra(obra_id)),
+        lambda: calcular_indicadores(obra_ids=[obra_id])
+    ).copy()
+
+
+def indicadores_usuario(user_id):
+    """Indicadores de todas as obras do usuário"""
+    from utils.indicadores import calcular_indicadores
+
+    return query_cache.get_or_compute(
+        ('indicadores_usuario', user_id, versao_usuario(user_id)),
+        lambda: calcular_indicadores(user_id=user_id)
+    ).copy()
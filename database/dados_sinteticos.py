@@ -0,0 +1,158 @@
+import argparse
+from datetime import date, timedelta
+
+import numpy as np
+
+from database.db_utils import (
+    DB_PATH, get_db_connection, create_tables, add_user, add_obras, update_realizados, submit_write
+)
+from database.init_db import init_database
+
+DESCRICOES_ITENS = [
+    'Serviços Preliminares', 'Canteiro de Obras', 'Movimento de Terra', 'Fundação',
+    'Estrutura', 'Alvenaria', 'Cobertura', 'Impermeabilização', 'Esquadrias',
+    'Revestimentos', 'Pisos', 'Pintura', 'Instalações Elétricas', 'Instalações Hidrossanitárias',
+    'Instalações de Incêndio', 'Climatização', 'Elevadores', 'Paisagismo', 'Pavimentação',
+    'Limpeza Final'
+]
+
+TIPOS_OBRA = [
+    'Construção', 'Reforma', 'Ampliação', 'Recuperação', 'Urbanização'
+]
+
+OBJETOS_OBRA = [
+    'Escola Municipal', 'Unidade Básica de Saúde', 'Edifício Sede', 'Ginásio Poliesportivo',
+    'Centro Administrativo', 'Creche', 'Hospital Regional', 'Praça Pública', 'Terminal Rodoviário'
+]
+
+
+def _curva_prevista(rng, valor_item, num_medicoes):
+    """Distribui o valor do item em uma curva S dentro de uma janela aleatória da obra"""
+    inicio = rng.uniform(0, 0.6) * num_medicoes
+    duracao = max(rng.uniform(0.2, 1.0) * (num_medicoes - inicio), 1.0)
+    limites = np.arange(num_medicoes + 1)
+    progresso = np.clip((limites - inicio) / duracao, 0, 1)
+    curva = progresso * progresso * (3 - 2 * progresso)
+    parcelas = np.diff(curva) * valor_item
+    return np.round(parcelas, 2)
+
+
+def gerar_obra(rng, indice, max_itens, max_medicoes):
+    """Gera (dados_obra, descricoes, matriz de previstos) de uma obra sintética"""
+    num_itens = int(rng.integers(3, max_itens + 1))
+    num_medicoes = int(rng.integers(min(6, max_medicoes), max_medicoes + 1))
+
+    descricoes = list(rng.choice(DESCRICOES_ITENS, size=num_itens, replace=num_itens > len(DESCRICOES_ITENS)))
+    pesos = rng.dirichlet(np.ones(num_itens) * 2)
+    valor_contrato = float(rng.uniform(0.5, 50.0)) * 1_000_000
+    matriz = np.vstack([_curva_prevista(rng, valor_contrato * p, num_medicoes) for p in pesos])
+
+    data_inicio = date.today() - timedelta(days=int(rng.integers(0, 30 * num_medicoes)))
+    dados_obra = {
+        'nome': f"{rng.choice(TIPOS_OBRA)} {rng.choice(OBJETOS_OBRA)} {indice:05d}",
+        'contrato': f"{data_inicio.year}/{indice:05d}",
+        'ordem_servico': f"OS-{indice:05d}/{data_inicio.year}",
+        'contratante': 'Prefeitura Municipal',
+        'contratada': f"Construtora {indice % 97:02d} LTDA",
+        'valor_total': round(float(matriz.sum()), 2),
+        'data_inicio': data_inicio,
+        'data_fim': data_inicio + timedelta(days=30 * num_medicoes),
+        'duracao_prevista': num_medicoes,
+        'num_medicoes': num_medicoes,
+    }
+    return dados_obra, descricoes, matriz
+
+
+def _gerar_realizados(rng, matriz):
+    """
+    Simula os valores realizados até a medição atual da obra, com um desempenho
+    médio por obra e ruído por item; as medições futuras ficam NaN
+    """
+    num_itens, num_medicoes = matriz.shape
+    medicao_atual = int(rng.integers(0, num_medicoes + 1))
+    desempenho = rng.uniform(0.55, 1.15)
+    ruido = rng.lognormal(mean=0.0, sigma=0.15, size=matriz.shape)
+    realizados = np.round(matriz * desempenho * ruido, 2)
+    realizados[:, medicao_atual:] = np.nan
+    return realizados
+
+
+def gerar_dados_sinteticos(num_usuarios=10, obras_por_usuario=20, max_itens=20, max_medicoes=60,
+                           semente=42, senha='senha123'):
+    """
+    Popula o banco com uma carteira sintética: num_usuarios x obras_por_usuario obras,
+    cada uma com até max_itens itens e max_medicoes medições, valores realizados e fatores IMR
+    Retorna a contagem de registros criados
+    """
+    rng = np.random.default_rng(semente)
+
+    create_tables()
+    init_database()
+
+    totais = {'usuarios': 0, 'obras': 0, 'itens': 0, 'medicoes': 0, 'fatores_imr': 0}
+    indice = 0
+    for u in range(num_usuarios):
+        username = f"usuario{u + 1:03d}"
+        add_user(username, senha)
+        conn = get_db_connection()
+        try:
+            user_id = conn.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone()[0]
+        finally:
+            conn.close()
+        totais['usuarios'] += 1
+
+        obras = []
+        for _ in range(obras_por_usuario):
+            indice += 1
+            obras.append(gerar_obra(rng, indice, max_itens, max_medicoes))
+        obra_ids = add_obras(user_id, obras)
+
+        fatores = []
+        for obra_id, (dados_obra, _, matriz) in zip(obra_ids, obras):
+            conn = get_db_connection()
+            try:
+                item_ids = [row[0] for row in conn.execute(
+                    'SELECT id FROM itens_obra WHERE obra_id = ? ORDER BY id', (obra_id,)
+                )]
+            finally:
+                conn.close()
+
+            realizados = _gerar_realizados(rng, matriz)
+            num_medicoes = matriz.shape[1]
+            update_realizados(
+                obra_id,
+                np.repeat(item_ids, num_medicoes).reshape(matriz.shape),
+                np.arange(1, num_medicoes + 1),
+                realizados,
+                dados_obra['valor_total'],
+                data_medicao=dados_obra['data_inicio']
+            )
+
+            fps = np.round(rng.choice([0.8, 0.9, 1.0, 1.0, 1.0, 1.1, 1.2], size=num_medicoes), 2)
+            fatores.extend(zip([obra_id] * num_medicoes, range(1, num_medicoes + 1), fps.tolist()))
+
+            totais['obras'] += 1
+            totais['itens'] += matriz.shape[0]
+            totais['medicoes'] += matriz.size
+
+        submit_write(lambda fatores, conn=None: conn.executemany('''
+        INSERT OR REPLACE INTO imr_fatores (obra_id, numero_medicao, fator_ponderacao)
+        VALUES (?, ?, ?)
+        ''', fatores), fatores).result()
+        totais['fatores_imr'] += len(fatores)
+
+    return totais
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera uma carteira sintética de obras para testes de desempenho")
+    parser.add_argument('--usuarios', type=int, default=10)
+    parser.add_argument('--obras', type=int, default=20, help="Obras por usuário")
+    parser.add_argument('--max-itens', type=int, default=20)
+    parser.add_argument('--max-medicoes', type=int, default=60)
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"Gerando dados em {DB_PATH}...")
+    totais = gerar_dados_sinteticos(args.usuarios, args.obras, args.max_itens, args.max_medicoes, args.semente)
+    print(", ".join(f"{valor} {nome}" for nome, valor in totais.items()))
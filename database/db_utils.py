@@ -1,9 +1,538 @@
+import atexit
 import sqlite3
 import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# Caminho absoluto do banco; pode ser sobrescrito pela variável OBRAS_DB_PATH
+DB_PATH = os.path.abspath(os.environ.get(
+    'OBRAS_DB_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'obras.db')
+))
+
+# Tamanho máximo do pool e tempo máximo de espera por uma conexão livre (s)
+POOL_SIZE = int(os.environ.get('OBRAS_DB_POOL_SIZE', '8'))
+POOL_TIMEOUT = float(os.environ.get('OBRAS_DB_POOL_TIMEOUT', '30'))
+
+# Escritor único: todas as gravações das páginas passam por uma thread dedicada, que
+# agrupa as transações pendentes (até WRITE_BATCH) em um único commit.
+# OBRAS_DB_WRITE_QUEUE=0 volta a gravar diretamente na thread de quem chama
+WRITE_QUEUE = os.environ.get('OBRAS_DB_WRITE_QUEUE', '1') != '0'
+WRITE_BATCH = int(os.environ.get('OBRAS_DB_WRITE_BATCH', '64'))
+
+# Pragmas aplicados uma única vez na criação de cada conexão
+PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('mmap_size', 268435456),  # 256 MB
+    ('cache_size', -65536),  # 64 MB
+    ('busy_timeout', 5000),
+    ('temp_store', 'MEMORY'),
+)
+
+
+class InstrumentedCursor:
+    """
+    Cursor que mede cada comando (execução e leitura das linhas) e o registra
+    em database.instrumentacao; a medição termina quando o resultado se esgota
+    """
+
+    def __init__(self, cursor, conn):
+        self._cursor = cursor
+        self._conn = conn
+        self._medicao = None  # [sql, params, duração (s), linhas, página]
+
+    def _finalizar(self):
+        from database import instrumentacao
+
+        medicao, self._medicao = self._medicao, None
+        if medicao is not None:
+            sql, params, duracao, linhas, pagina = medicao
+            instrumentacao.coletor.registrar(sql, duracao * 1000, linhas, pagina, self._conn, params)
+
+    def _medir(self, metodo, sql, params, lote=False):
+        from database import instrumentacao
+
+        self._finalizar()
+        pagina = instrumentacao.pagina_chamadora()
+        inicio = time.perf_counter()
+        metodo(sql, params)
+        duracao = time.perf_counter() - inicio
+        self._medicao = [sql, None if lote else params, duracao, 0, pagina]
+        if self._cursor.description is None:
+            self._medicao[3] = self._cursor.rowcount
+            self._finalizar()
+        return self
+
+    def _ler(self, metodo, *args):
+        inicio = time.perf_counter()
+        resultado = metodo(*args)
+        if self._medicao is not None:
+            self._medicao[2] += time.perf_counter() - inicio
+        return resultado
+
+    def execute(self, sql, params=()):
+        return self._medir(self._cursor.execute, sql, params)
+
+    def executemany(self, sql, seq_params):
+        return self._medir(self._cursor.executemany, sql, seq_params, lote=True)
+
+    def fetchone(self):
+        linha = self._ler(self._cursor.fetchone)
+        if self._medicao is not None:
+            if linha is None:
+                self._finalizar()
+            else:
+                self._medicao[3] += 1
+        return linha
+
+    def fetchmany(self, size=None):
+        linhas = self._ler(self._cursor.fetchmany, size or self._cursor.arraysize)
+        if self._medicao is not None:
+            self._medicao[3] += len(linhas)
+            if len(linhas) < (size or self._cursor.arraysize):
+                self._finalizar()
+        return linhas
+
+    def fetchall(self):
+        linhas = self._ler(self._cursor.fetchall)
+        if self._medicao is not None:
+            self._medicao[3] += len(linhas)
+            self._finalizar()
+        return linhas
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        linha = self.fetchone()
+        if linha is None:
+            raise StopIteration
+        return linha
+
+    def close(self):
+        self._finalizar()
+        self._cursor.close()
+
+    def __del__(self):
+        try:
+            self._finalizar()
+        except Exception:
+            pass
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class PooledConnection:
+    """Conexão emprestada do pool; close() devolve a conexão em vez de fechá-la"""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+        self._closed = False
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._pool.release(self._conn)
+
+    def cursor(self):
+        from database import instrumentacao
+
+        if instrumentacao.ativo():
+            return InstrumentedCursor(self._conn.cursor(), self._conn)
+        return self._conn.cursor()
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_params):
+        return self.cursor().executemany(sql, seq_params)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._conn.__exit__(exc_type, exc, tb)
+
+
+class ConnectionPool:
+    """Pool limitado de conexões SQLite de longa duração, uma por thread"""
+
+    def __init__(self, path, max_size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.path = path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = []
+        self._lent = {}  # thread -> [conexão, profundidade]
+        self._total = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'max_wait_time': 0.0,
+            'reclaimed': 0,
+        }
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=self.timeout)
+        for pragma, valor in PRAGMAS:
+            conn.execute(f'PRAGMA {pragma} = {valor}')
+        return conn
+
+    def _reclaim(self):
+        """Recupera conexões de threads que terminaram sem devolvê-las"""
+        for thread in [t for t in self._lent if not t.is_alive()]:
+            conn, _ = self._lent.pop(thread)
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.append(conn)
+            self._stats['reclaimed'] += 1
+
+    def acquire(self):
+        thread = threading.current_thread()
+        with self._cond:
+            # Chamadas aninhadas na mesma thread reutilizam a mesma conexão
+            emprestada = self._lent.get(thread)
+            if emprestada:
+                emprestada[1] += 1
+                self._stats['hits'] += 1
+                return PooledConnection(self, emprestada[0])
+
+            inicio = time.perf_counter()
+            esperou = False
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    self._stats['hits'] += 1
+                    break
+                if self._total < self.max_size:
+                    self._total += 1
+                    conn = None
+                    self._stats['misses'] += 1
+                    break
+                self._reclaim()
+                if self._idle:
+                    continue
+                restante = self.timeout - (time.perf_counter() - inicio)
+                if restante <= 0:
+                    raise sqlite3.OperationalError(
+                        f'Tempo esgotado aguardando conexão do pool ({self.max_size} em uso)'
+                    )
+                esperou = True
+                self._cond.wait(restante)
+
+            if esperou:
+                espera = time.perf_counter() - inicio
+                self._stats['waits'] += 1
+                self._stats['wait_time'] += espera
+                self._stats['max_wait_time'] = max(self._stats['max_wait_time'], espera)
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._total -= 1
+                    self._cond.notify()
+                raise
+
+        with self._cond:
+            self._lent[thread] = [conn, 1]
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        thread = threading.current_thread()
+        with self._cond:
+            emprestada = self._lent.get(thread)
+            if emprestada and emprestada[0] is conn:
+                emprestada[1] -= 1
+                if emprestada[1] > 0:
+                    return
+                del self._lent[thread]
+            else:
+                # Devolvida por outra thread: localizar o empréstimo original
+                for dono, (c, _) in list(self._lent.items()):
+                    if c is conn:
+                        del self._lent[dono]
+                        break
+            # Transações não confirmadas não podem vazar para o próximo usuário
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            for conn in self._idle:
+                conn.close()
+            self._total -= len(self._idle)
+            self._idle = []
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'path': self.path,
+                'max_size': self.max_size,
+                'open': self._total,
+                'idle': len(self._idle),
+                'in_use': len(self._lent),
+            })
+        total = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / total if total else 0.0
+        stats['avg_wait_time'] = stats['wait_time'] / stats['waits'] if stats['waits'] else 0.0
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_PATH)
+    return _pool
+
+
+def configure_database(path=None, pool_size=None):
+    """Redefine o caminho do banco e/ou o tamanho do pool, descartando o pool atual"""
+    global DB_PATH, POOL_SIZE, _pool, _writer
+    with _pool_lock:
+        if _writer is not None:
+            _writer.stop()
+            _writer = None
+        if _pool is not None:
+            _pool.close_all()
+            _pool = None
+        if path is not None:
+            DB_PATH = os.path.abspath(path)
+        if pool_size is not None:
+            POOL_SIZE = pool_size
+        _pool = ConnectionPool(DB_PATH, max_size=POOL_SIZE)
 
 
 def get_db_connection():
-    return sqlite3.connect('obras.db')
+    """Retorna uma conexão do pool; chamar close() a devolve ao pool"""
+    return _get_pool().acquire()
+
+
+def get_pool_stats():
+    """Retorna os contadores do pool (acertos, criações e tempo de espera)"""
+    return _get_pool().stats()
+
+
+class WriterConnection(PooledConnection):
+    """
+    Conexão do escritor único, entregue às funções de gravação; o commit
+    (em grupo) é responsabilidade do escritor, não da função
+    """
+
+    def __init__(self, conn):
+        super().__init__(None, conn)
+
+    def close(self):
+        pass
+
+    def commit(self):
+        raise sqlite3.ProgrammingError('O commit é feito pelo escritor único (submit_write)')
+
+    def rollback(self):
+        raise sqlite3.ProgrammingError('O rollback é feito pelo escritor único (submit_write)')
+
+
+class SingleWriter:
+    """
+    Thread única que executa as gravações enfileiradas por submit()
+    Cada gravação roda em um SAVEPOINT próprio (uma falha desfaz só a dela) e as
+    gravações acumuladas na fila são confirmadas juntas, em um único commit (group commit);
+    os futures só são resolvidos depois do commit
+    """
+
+    def __init__(self, path, max_batch=WRITE_BATCH):
+        self.path = path
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._conn = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'commits': 0,
+            'max_batch_seen': 0,
+            'busy_time': 0.0,
+        }
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='obras-db-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Enfileira func(*args, conn=conexão, **kwargs) e retorna um Future com o resultado
+        Chamadas feitas de dentro de uma gravação executam na mesma transação
+        """
+        if threading.current_thread() is self._thread:
+            future = Future()
+            try:
+                future.set_result(func(*args, conn=self._conn, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        future = Future()
+        with self._lock:
+            self._stats['submitted'] += 1
+        self._queue.put((func, args, kwargs, future))
+        if self._thread is None or not self._thread.is_alive():
+            self._start()
+        return future
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=POOL_TIMEOUT)
+        for pragma, valor in PRAGMAS:
+            conn.execute(f'PRAGMA {pragma} = {valor}')
+        return WriterConnection(conn)
+
+    def _run(self):
+        self._conn = self._connect()
+        while True:
+            tarefa = self._queue.get()
+            if tarefa is None:
+                break
+            lote = [tarefa]
+            # Tudo o que chegou enquanto o commit anterior era gravado entra no mesmo grupo
+            while len(lote) < self.max_batch:
+                try:
+                    tarefa = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if tarefa is None:
+                    self._queue.put(None)
+                    break
+                lote.append(tarefa)
+            self._commit_group(lote)
+        self._conn._conn.close()
+        self._conn = None
+
+    def _commit_group(self, lote):
+        conn = self._conn._conn
+        inicio = time.perf_counter()
+        resultados = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for func, args, kwargs, future in lote:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute('SAVEPOINT gravacao')
+                try:
+                    resultados.append((future, func(*args, conn=self._conn, **kwargs), None))
+                    conn.execute('RELEASE gravacao')
+                except Exception as e:
+                    conn.execute('ROLLBACK TO gravacao')
+                    conn.execute('RELEASE gravacao')
+                    resultados.append((future, None, e))
+            conn.commit()
+        except Exception as e:
+            # Falha no BEGIN, no ROLLBACK TO ou no commit: nenhuma gravação do grupo foi
+            # confirmada e todas recebem o erro, inclusive as que nem chegaram a executar
+            # (quem espera em .result() não pode ficar bloqueado para sempre)
+            if conn.in_transaction:
+                try:
+                    conn.rollback()
+                except sqlite3.Error:
+                    pass
+            resultados = [
+                (f, None, e) for _, _, _, f in lote
+                if f.running() or (not f.done() and f.set_running_or_notify_cancel())
+            ]
+
+        with self._lock:
+            self._stats['commits'] += 1
+            self._stats['max_batch_seen'] = max(self._stats['max_batch_seen'], len(lote))
+            self._stats['busy_time'] += time.perf_counter() - inicio
+        for future, resultado, erro in resultados:
+            with self._lock:
+                self._stats['failed' if erro else 'completed'] += 1
+            if erro is None:
+                future.set_result(resultado)
+            else:
+                future.set_exception(erro)
+
+    def stop(self, timeout=None):
+        """Grava o que está na fila e encerra a thread"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['path'] = self.path
+        stats['queued'] = self._queue.qsize()
+        stats['avg_batch'] = stats['completed'] / stats['commits'] if stats['commits'] else 0.0
+        return stats
+
+
+_writer = None
+
+
+def _get_writer():
+    global _writer
+    if _writer is None:
+        with _pool_lock:
+            if _writer is None:
+                _writer = SingleWriter(DB_PATH)
+                # Gravações enviadas sem aguardar o resultado não se perdem no encerramento
+                atexit.register(_writer.stop)
+    return _writer
+
+
+def _write_direct(func, args, kwargs):
+    """Gravação sem fila: transação própria na conexão do pool da thread que chama"""
+    future = Future()
+    conn = get_db_connection()
+    try:
+        resultado = func(*args, conn=conn, **kwargs)
+        conn.commit()
+        future.set_result(resultado)
+    except Exception as e:
+        conn.rollback()
+        future.set_exception(e)
+    finally:
+        conn.close()
+    return future
+
+
+def submit_write(func, *args, **kwargs):
+    """
+    Envia uma gravação ao escritor único e retorna um Future
+    func recebe a conexão em conn= e não deve fazer commit nem rollback
+    """
+    if not WRITE_QUEUE:
+        return _write_direct(func, args, kwargs)
+    return _get_writer().submit(func, *args, **kwargs)
+
+
+def get_writer_stats():
+    """Retorna os contadores do escritor único (gravações, commits e tamanho dos grupos)"""
+    return _get_writer().stats()
 
 
 def create_tables():
@@ -77,20 +606,21 @@ def create_tables():
     conn.commit()
     conn.close()
 
+    # Índices e demais alterações versionadas do esquema
+    from database.migrate import apply_migrations
+    apply_migrations()
+
 
-def add_user(username, password):
+def add_user(username, password, conn=None):
     """Adiciona um novo usuário"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    if conn is None:
+        return submit_write(add_user, username, password).result()
     try:
-        cursor.execute('INSERT INTO users (username, password) VALUES (?, ?)',
-                       (username, password))
-        conn.commit()
+        conn.execute('INSERT INTO users (username, password) VALUES (?, ?)',
+                     (username, password))
         return True
     except sqlite3.IntegrityError:
         return False
-    finally:
-        conn.close()
 
 
 def verify_user(username, password):
@@ -102,3 +632,202 @@ def verify_user(username, password):
     user = cursor.fetchone()
     conn.close()
     return user[0] if user else None
+
+
+def add_obra(user_id, dados_obra, descricoes, valores_previstos, valores_realizados=None, conn=None):
+    """
+    Cadastra a obra, seus itens e toda a matriz de valores previstos
+    (itens x medições) em uma única transação, com executemany
+    valores_realizados (opcional, mesma forma; NaN = não realizado) grava também os realizados
+    Sem conn, a gravação passa pelo escritor único; com conn, a transação fica a cargo do chamador
+    """
+    import numpy as np
+    from datetime import date
+
+    if conn is None:
+        return submit_write(
+            add_obra, user_id, dados_obra, descricoes, valores_previstos, valores_realizados
+        ).result()
+
+    matriz = np.atleast_2d(np.asarray(valores_previstos, dtype=float))
+    num_itens, num_medicoes = matriz.shape
+    if len(descricoes) != num_itens:
+        raise ValueError("O número de descrições difere do número de linhas da matriz")
+
+    valor_total = dados_obra.get('valor_total') or 0
+    if valor_total > 0:
+        percentuais = matriz / valor_total * 100
+    else:
+        percentuais = np.zeros_like(matriz)
+
+    if valores_realizados is None:
+        realizados = np.full(matriz.shape, np.nan)
+    else:
+        realizados = np.atleast_2d(np.asarray(valores_realizados, dtype=float))
+        if realizados.shape != matriz.shape:
+            raise ValueError("A matriz de realizados difere da matriz de previstos")
+    nulos = np.isnan(realizados)
+    realizados_sql = np.where(nulos, None, realizados).ravel().tolist()
+    percentuais_realizados_sql = np.where(
+        nulos, None, realizados / valor_total * 100 if valor_total > 0 else 0.0
+    ).ravel().tolist()
+    # Data de medição só nas células com realizado, como em update_realizados
+    datas_sql = np.where(nulos, None, date.today()).ravel().tolist()
+
+    cursor = conn.cursor()
+    cursor.execute('''
+    INSERT INTO obras (
+        user_id, nome, contrato, ordem_servico, contratante, contratada,
+        valor_total, data_inicio, data_fim, duracao_prevista, num_medicoes
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (
+        user_id, dados_obra['nome'], dados_obra.get('contrato'), dados_obra.get('ordem_servico'),
+        dados_obra.get('contratante'), dados_obra.get('contratada'), valor_total,
+        dados_obra.get('data_inicio'), dados_obra.get('data_fim'),
+        dados_obra.get('duracao_prevista'), dados_obra.get('num_medicoes', num_medicoes)
+    ))
+    obra_id = cursor.lastrowid
+
+    cursor.executemany('''
+    INSERT INTO itens_obra (obra_id, descricao, valor_previsto)
+    VALUES (?, ?, ?)
+    ''', zip([obra_id] * num_itens, descricoes, matriz.sum(axis=1).tolist()))
+
+    cursor.execute('SELECT id FROM itens_obra WHERE obra_id = ? ORDER BY id', (obra_id,))
+    item_ids = [row[0] for row in cursor.fetchall()]
+
+    cursor.executemany('''
+    INSERT INTO medicoes (
+        obra_id, item_id, numero_medicao, valor_previsto,
+        percentual_previsto, valor_realizado, percentual_realizado, data_medicao
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', zip(
+        [obra_id] * matriz.size,
+        np.repeat(item_ids, num_medicoes).tolist(),
+        np.tile(np.arange(1, num_medicoes + 1), num_itens).tolist(),
+        matriz.ravel().tolist(),
+        percentuais.ravel().tolist(),
+        realizados_sql,
+        percentuais_realizados_sql,
+        datas_sql
+    ))
+
+    return obra_id
+
+
+def add_obras(user_id, obras, conn=None):
+    """
+    Cadastra várias obras em uma única transação
+    obras é uma sequência de (dados_obra, descricoes, valores_previstos[, valores_realizados]);
+    retorna os ids
+    """
+    if conn is None:
+        return submit_write(add_obras, user_id, list(obras)).result()
+    return [add_obra(user_id, *obra, conn=conn) for obra in obras]
+
+
+def update_realizados(obra_id, item_ids, numeros_medicao, valores, valor_total, data_medicao=None, conn=None):
+    """
+    Grava em lote os valores realizados de uma obra
+    numeros_medicao pode ser um único número ou um array alinhado com item_ids;
+    valores NaN são gravados como NULL (medição não realizada)
+    """
+    import numpy as np
+    from datetime import datetime
+
+    if conn is None:
+        return submit_write(
+            update_realizados, obra_id, item_ids, numeros_medicao, valores, valor_total, data_medicao
+        ).result()
+
+    valores = np.asarray(valores, dtype=float)
+    item_ids = np.broadcast_to(np.asarray(item_ids), valores.shape)
+    numeros_medicao = np.broadcast_to(np.asarray(numeros_medicao), valores.shape)
+    if valor_total and valor_total > 0:
+        percentuais = valores / valor_total * 100
+    else:
+        percentuais = np.zeros_like(valores)
+    data_medicao = data_medicao or datetime.now().date()
+
+    nulos = np.isnan(valores)
+    valores_sql = np.where(nulos, None, valores).ravel().tolist()
+    percentuais_sql = np.where(nulos, None, percentuais).ravel().tolist()
+
+    conn.executemany('''
+    UPDATE medicoes
+    SET valor_realizado = ?,
+        percentual_realizado = ?,
+        data_medicao = ?
+    WHERE obra_id = ? AND item_id = ? AND numero_medicao = ?
+    ''', zip(
+        valores_sql,
+        percentuais_sql,
+        [data_medicao] * valores.size,
+        [obra_id] * valores.size,
+        item_ids.ravel().tolist(),
+        numeros_medicao.ravel().tolist()
+    ))
+
+
+def update_previstos(obra_id, item_ids, valores_previstos, conn=None):
+    """
+    Regrava a matriz de valores previstos (itens x medições) dos itens informados
+    e atualiza o valor total de cada item, em uma única transação
+    """
+    import numpy as np
+
+    if conn is None:
+        return submit_write(update_previstos, obra_id, item_ids, valores_previstos).result()
+
+    matriz = np.atleast_2d(np.asarray(valores_previstos, dtype=float))
+    num_itens, num_medicoes = matriz.shape
+    totais = matriz.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentuais = np.where(totais[:, None] > 0, matriz / totais[:, None] * 100, 0.0)
+
+    conn.executemany('''
+    UPDATE itens_obra
+    SET valor_previsto = ?
+    WHERE id = ? AND obra_id = ?
+    ''', zip(totais.tolist(), list(item_ids), [obra_id] * num_itens))
+
+    conn.executemany('''
+    UPDATE medicoes
+    SET valor_previsto = ?,
+        percentual_previsto = ?
+    WHERE obra_id = ? AND item_id = ? AND numero_medicao = ?
+    ''', zip(
+        matriz.ravel().tolist(),
+        percentuais.ravel().tolist(),
+        [obra_id] * matriz.size,
+        np.repeat(list(item_ids), num_medicoes).tolist(),
+        np.tile(np.arange(1, num_medicoes + 1), num_itens).tolist()
+    ))
+
+
+def update_obra(obra_id, dados_obra, valores_itens=None, conn=None):
+    """
+    Atualiza os dados cadastrais da obra e, opcionalmente, o valor previsto
+    de cada item ({item_id: valor}), em uma única transação
+    """
+    if conn is None:
+        return submit_write(update_obra, obra_id, dados_obra, valores_itens).result()
+
+    conn.execute('''
+    UPDATE obras
+    SET nome = ?, contrato = ?, ordem_servico = ?, contratante = ?,
+        contratada = ?, valor_total = ?, num_medicoes = ?,
+        data_inicio = ?, data_fim = ?
+    WHERE id = ?
+    ''', (
+        dados_obra['nome'], dados_obra.get('contrato'), dados_obra.get('ordem_servico'),
+        dados_obra.get('contratante'), dados_obra.get('contratada'), dados_obra.get('valor_total'),
+        dados_obra.get('num_medicoes'), dados_obra.get('data_inicio'), dados_obra.get('data_fim'),
+        obra_id
+    ))
+    if valores_itens:
+        conn.executemany('''
+        UPDATE itens_obra
+        SET valor_previsto = ?
+        WHERE id = ? AND obra_id = ?
+        ''', [(valor, item_id, obra_id) for item_id, valor in valores_itens.items()])
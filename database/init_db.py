@@ -1,10 +1,10 @@
-import sqlite3
 from datetime import datetime, timedelta
+from database.db_utils import get_db_connection
 
 
 def init_database():
     """Inicializa o banco de dados com dados de exemplo"""
-    conn = sqlite3.connect('obras.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
 
     # Inserir usuário de exemplo
@@ -0,0 +1,331 @@
+import argparse
+import atexit
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Instrumentação dos comandos SQL, desligada por padrão (OBRAS_SQL_INSTRUMENTACAO=1 liga)
+SQL_INSTRUMENTACAO = os.environ.get('OBRAS_SQL_INSTRUMENTACAO', '0').lower() in ('1', 'true', 'sim')
+
+# Comandos mais demorados que este limite (ms) vão para o log de consultas lentas
+SQL_LENTA_MS = float(os.environ.get('OBRAS_SQL_LENTA_MS', '100'))
+
+# Quantidade de amostras mantidas por comando para o cálculo dos percentis
+JANELA_AMOSTRAS = int(os.environ.get('OBRAS_SQL_JANELA', '1000'))
+
+# Intervalo mínimo (s) entre gravações do arquivo de estatísticas
+INTERVALO_GRAVACAO = float(os.environ.get('OBRAS_SQL_INTERVALO_GRAVACAO', '60'))
+
+LOG_DIR = os.path.abspath(os.environ.get('OBRAS_LOG_DIR', os.path.join(RAIZ, 'logs')))
+ARQUIVO_LENTAS = os.path.join(LOG_DIR, 'sql_lentas.log')
+ARQUIVO_ESTATISTICAS = os.path.join(LOG_DIR, 'sql_estatisticas.json')
+
+_COMENTARIOS_RE = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_TEXTO_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMERO_RE = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])')
+_LISTA_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_ESPACOS_RE = re.compile(r'\s+')
+
+# Comandos para os quais EXPLAIN QUERY PLAN faz sentido
+_COMANDOS_PLANO = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT', 'REPLACE')
+
+_logger_lentas = logging.getLogger('obras.sql_lentas')
+_logger_lentas.propagate = False
+
+# Execuções e tempo acumulados pela thread atual (cada sessão do Streamlit roda em sua thread)
+_por_thread = threading.local()
+
+
+@lru_cache(maxsize=4096)
+def normalizar_sql(sql):
+    """
+    Normaliza o comando para agrupar execuções equivalentes: remove comentários,
+    troca literais por ? e listas IN (?, ?, ...) por (...), e compacta os espaços
+    """
+    sql = _COMENTARIOS_RE.sub(' ', sql)
+    sql = _TEXTO_RE.sub('?', sql)
+    sql = _NUMERO_RE.sub('?', sql)
+    sql = _LISTA_RE.sub('(...)', sql)
+    return _ESPACOS_RE.sub(' ', sql).strip()
+
+
+def pagina_chamadora():
+    """Identifica a página (módulo.função em modules/ ou main) que originou o comando"""
+    frame = sys._getframe(1)
+    fora_do_banco = None
+    while frame is not None:
+        modulo = frame.f_globals.get('__name__', '')
+        if modulo.startswith('modules.') or modulo in ('__main__', 'main'):
+            return f"{modulo}.{frame.f_code.co_name}"
+        if fora_do_banco is None and not modulo.startswith('database'):
+            fora_do_banco = f"{modulo}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return fora_do_banco or '-'
+
+
+def _percentil(ordenadas, p):
+    if not ordenadas:
+        return 0.0
+    return ordenadas[min(len(ordenadas) - 1, int(round(p / 100 * (len(ordenadas) - 1))))]
+
+
+class EstatisticaComando:
+    """Contadores acumulados e janela de amostras de um comando normalizado"""
+
+    __slots__ = ('sql', 'execucoes', 'total_ms', 'max_ms', 'linhas', 'lentas', 'amostras', 'paginas')
+
+    def __init__(self, sql, janela):
+        self.sql = sql
+        self.execucoes = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.linhas = 0
+        self.lentas = 0
+        self.amostras = deque(maxlen=janela)
+        self.paginas = Counter()
+
+    def resumo(self):
+        ordenadas = sorted(self.amostras)
+        return {
+            'sql': self.sql,
+            'execucoes': self.execucoes,
+            'total_ms': self.total_ms,
+            'media_ms': self.total_ms / self.execucoes if self.execucoes else 0.0,
+            'p50_ms': _percentil(ordenadas, 50),
+            'p95_ms': _percentil(ordenadas, 95),
+            'p99_ms': _percentil(ordenadas, 99),
+            'max_ms': self.max_ms,
+            'linhas': self.linhas,
+            'linhas_por_execucao': self.linhas / self.execucoes if self.execucoes else 0.0,
+            'lentas': self.lentas,
+            'paginas': dict(self.paginas.most_common()),
+        }
+
+
+class ColetorSQL:
+    """Agrega as medições dos comandos SQL e registra as consultas lentas com seu plano"""
+
+    def __init__(self, limite_lenta_ms=SQL_LENTA_MS, janela=JANELA_AMOSTRAS):
+        self.limite_lenta_ms = limite_lenta_ms
+        self.janela = janela
+        self._comandos = {}
+        self._planos = {}
+        self._lock = threading.Lock()
+        self._ultima_gravacao = time.monotonic()
+        self._inicio = datetime.now().isoformat(timespec='seconds')
+
+    def registrar(self, sql, duracao_ms, linhas, pagina='-', conn=None, params=None):
+        normalizado = normalizar_sql(sql)
+        lenta = duracao_ms >= self.limite_lenta_ms
+        _por_thread.execucoes = getattr(_por_thread, 'execucoes', 0) + 1
+        _por_thread.total_ms = getattr(_por_thread, 'total_ms', 0.0) + duracao_ms
+        with self._lock:
+            estatistica = self._comandos.get(normalizado)
+            if estatistica is None:
+                estatistica = self._comandos[normalizado] = EstatisticaComando(normalizado, self.janela)
+            estatistica.execucoes += 1
+            estatistica.total_ms += duracao_ms
+            estatistica.max_ms = max(estatistica.max_ms, duracao_ms)
+            estatistica.linhas += max(linhas, 0)
+            estatistica.amostras.append(duracao_ms)
+            estatistica.paginas[pagina] += 1
+            if lenta:
+                estatistica.lentas += 1
+            gravar = time.monotonic() - self._ultima_gravacao >= INTERVALO_GRAVACAO
+            if gravar:
+                self._ultima_gravacao = time.monotonic()
+
+        if lenta:
+            self._registrar_lenta(normalizado, sql, duracao_ms, linhas, pagina, conn, params)
+        if gravar:
+            salvar_estatisticas()
+
+    def plano(self, normalizado, sql, conn, params):
+        """EXPLAIN QUERY PLAN do comando, memorizado pelo texto normalizado"""
+        with self._lock:
+            if normalizado in self._planos:
+                return self._planos[normalizado]
+        plano = None
+        if conn is not None and sql.lstrip().upper().startswith(_COMANDOS_PLANO):
+            # Comandos em lote não guardam os parâmetros: o plano não depende dos valores
+            if params is None:
+                params = (None,) * sql.count('?')
+            try:
+                plano = [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()]
+            except Exception as e:
+                plano = [f'erro ao obter o plano: {e}']
+        with self._lock:
+            self._planos[normalizado] = plano
+        return plano
+
+    def _registrar_lenta(self, normalizado, sql, duracao_ms, linhas, pagina, conn, params):
+        registro = {
+            'data': datetime.now().isoformat(timespec='milliseconds'),
+            'duracao_ms': round(duracao_ms, 3),
+            'linhas': linhas,
+            'pagina': pagina,
+            'sql': normalizado,
+            'plano': self.plano(normalizado, sql, conn, params),
+        }
+        _configurar_log_lentas()
+        _logger_lentas.warning(json.dumps(registro, ensure_ascii=False))
+
+    def estatisticas(self, ordenar_por='total_ms', limite=None):
+        """Resumo por comando normalizado, do mais custoso para o menos custoso"""
+        with self._lock:
+            resumos = [e.resumo() for e in self._comandos.values()]
+            planos = dict(self._planos)
+        for resumo in resumos:
+            resumo['plano'] = planos.get(resumo['sql'])
+        resumos.sort(key=lambda r: r[ordenar_por], reverse=True)
+        return resumos[:limite] if limite else resumos
+
+    def totais(self):
+        with self._lock:
+            comandos = list(self._comandos.values())
+        return {
+            'inicio': self._inicio,
+            'comandos': len(comandos),
+            'execucoes': sum(e.execucoes for e in comandos),
+            'total_ms': sum(e.total_ms for e in comandos),
+            'lentas': sum(e.lentas for e in comandos),
+            'limite_lenta_ms': self.limite_lenta_ms,
+        }
+
+    def limpar(self):
+        with self._lock:
+            self._comandos.clear()
+            self._planos.clear()
+            self._inicio = datetime.now().isoformat(timespec='seconds')
+
+
+coletor = ColetorSQL()
+_ativo = SQL_INSTRUMENTACAO
+_log_configurado = False
+_log_lock = threading.Lock()
+
+
+def ativo():
+    """Indica se os comandos SQL estão sendo medidos"""
+    return _ativo
+
+
+def ativar(ligado=True):
+    """Liga ou desliga a instrumentação em tempo de execução (afeta novos cursores)"""
+    global _ativo
+    _ativo = bool(ligado)
+
+
+def _configurar_log_lentas():
+    global _log_configurado
+    if _log_configurado:
+        return
+    with _log_lock:
+        if not _log_configurado:
+            os.makedirs(LOG_DIR, exist_ok=True)
+            handler = RotatingFileHandler(ARQUIVO_LENTAS, maxBytes=5 * 1024 * 1024, backupCount=3, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            _logger_lentas.addHandler(handler)
+            _logger_lentas.setLevel(logging.WARNING)
+            _log_configurado = True
+
+
+def salvar_estatisticas(caminho=None):
+    """Grava o resumo atual em JSON, para consulta pela linha de comando"""
+    if not coletor.totais()['execucoes']:
+        return None
+    caminho = caminho or ARQUIVO_ESTATISTICAS
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f'{caminho}.{os.getpid()}.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump({
+            'gravado_em': datetime.now().isoformat(timespec='seconds'),
+            'pid': os.getpid(),
+            'totais': coletor.totais(),
+            'comandos': coletor.estatisticas(),
+        }, f, indent=2, ensure_ascii=False)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def contadores_thread():
+    """Retorna (execuções, tempo total em ms) dos comandos medidos na thread atual"""
+    return getattr(_por_thread, 'execucoes', 0), getattr(_por_thread, 'total_ms', 0.0)
+
+
+def get_sql_stats(ordenar_por='total_ms', limite=None):
+    """Retorna o resumo por comando SQL do processo atual"""
+    return coletor.estatisticas(ordenar_por, limite)
+
+
+def ler_consultas_lentas(limite=50, caminho=None):
+    """Lê as últimas consultas lentas registradas no log"""
+    caminho = caminho or ARQUIVO_LENTAS
+    if not os.path.exists(caminho):
+        return []
+    with open(caminho, encoding='utf-8') as f:
+        linhas = deque(f, maxlen=limite)
+    registros = []
+    for linha in linhas:
+        try:
+            registros.append(json.loads(linha))
+        except ValueError:
+            continue
+    return registros[::-1]
+
+
+@atexit.register
+def _gravar_ao_sair():
+    if _ativo:
+        try:
+            salvar_estatisticas()
+        except OSError:
+            pass
+
+
+def _imprimir(comandos, limite):
+    print(f"{'execuções':>10} {'total ms':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'linhas/ex':>9}  comando")
+    for c in comandos[:limite]:
+        print(f"{c['execucoes']:>10} {c['total_ms']:>10.1f} {c['p50_ms']:>8.2f} {c['p95_ms']:>8.2f} "
+              f"{c['p99_ms']:>8.2f} {c['linhas_por_execucao']:>9.1f}  {c['sql'][:120]}")
+        for detalhe in c.get('plano') or []:
+            print(f"{'':>59}  > {detalhe}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mostra as estatísticas dos comandos SQL gravadas pela aplicação")
+    parser.add_argument('--arquivo', default=ARQUIVO_ESTATISTICAS)
+    parser.add_argument('--ordenar', default='total_ms',
+                        choices=['total_ms', 'p95_ms', 'p99_ms', 'max_ms', 'execucoes', 'linhas', 'lentas'])
+    parser.add_argument('--limite', type=int, default=20)
+    parser.add_argument('--lentas', type=int, default=10, help="Quantidade de consultas lentas a listar")
+    args = parser.parse_args()
+
+    if os.path.exists(args.arquivo):
+        with open(args.arquivo, encoding='utf-8') as f:
+            dados = json.load(f)
+        totais = dados['totais']
+        print(f"Estatísticas gravadas em {dados['gravado_em']} (pid {dados['pid']}, desde {totais['inicio']}): "
+              f"{totais['execucoes']} execuções de {totais['comandos']} comandos, "
+              f"{totais['total_ms']:.1f} ms, {totais['lentas']} lenta(s)\n")
+        _imprimir(sorted(dados['comandos'], key=lambda c: c[args.ordenar], reverse=True), args.limite)
+    else:
+        print(f"Nenhuma estatística gravada em {args.arquivo} (a aplicação roda com OBRAS_SQL_INSTRUMENTACAO=1?)")
+
+    lentas = ler_consultas_lentas(args.lentas)
+    print(f"\n{len(lentas)} consulta(s) lenta(s) mais recente(s):")
+    for registro in lentas:
+        print(f"- {registro['data']} {registro['duracao_ms']:.1f} ms, {registro['linhas']} linha(s), "
+              f"{registro['pagina']}: {registro['sql'][:120]}")
+        for detalhe in registro.get('plano') or []:
+            print(f"    > {detalhe}")
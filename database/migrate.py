@@ -0,0 +1,224 @@
+import logging
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+from database.db_utils import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+_MIGRATION_RE = re.compile(r'^(\d+)_([\w-]+)\.sql$')
+
+# Consultas mais frequentes das páginas, verificadas com EXPLAIN QUERY PLAN
+HOT_QUERIES = [
+    ('fator_imr', '''
+    SELECT fator_ponderacao FROM imr_fatores WHERE obra_id = ? AND numero_medicao = ?
+    ''', (1, 1)),
+    ('realizados_medicao', '''
+    SELECT numero_medicao, valor_realizado FROM medicoes
+    WHERE obra_id = ? AND numero_medicao = ?
+    ''', (1, 1)),
+    ('resumo_medicoes', '''
+    SELECT r.obra_id, r.numero_medicao, o.valor_total, r.total_previsto, r.total_realizado,
+           f.fator_ponderacao
+    FROM obras o
+    JOIN medicoes_resumo r ON r.obra_id = o.id
+    LEFT JOIN imr_fatores f ON f.obra_id = r.obra_id AND f.numero_medicao = r.numero_medicao
+    WHERE o.id IN (?)
+    ORDER BY r.obra_id, r.numero_medicao
+    ''', (1,)),
+    ('exportacao_usuario', '''
+    SELECT m.obra_id, o.nome, m.numero_medicao, m.item_id, i.descricao, m.valor_previsto, m.valor_realizado,
+           r.total_previsto, r.total_realizado, f.fator_ponderacao
+    FROM medicoes m
+    JOIN obras o ON o.id = m.obra_id
+    JOIN itens_obra i ON i.id = m.item_id
+    LEFT JOIN medicoes_resumo r ON r.obra_id = m.obra_id AND r.numero_medicao = m.numero_medicao
+    LEFT JOIN imr_fatores f ON f.obra_id = m.obra_id AND f.numero_medicao = m.numero_medicao
+    WHERE m.obra_id IN (SELECT id FROM obras WHERE user_id = ?)
+    ORDER BY m.obra_id, m.numero_medicao, m.item_id
+    ''', (1,)),
+    ('medicoes_pendentes', '''
+    SELECT o.nome, r.numero_medicao
+    FROM obras o
+    JOIN medicoes_resumo r ON o.id = r.obra_id
+    WHERE o.user_id = ?
+    AND r.itens_realizados < r.itens_total
+    ORDER BY r.numero_medicao
+    LIMIT 5
+    ''', (1,)),
+    ('itens_medicao', '''
+    SELECT i.id, i.descricao, i.valor_previsto, m.valor_previsto, m.valor_realizado
+    FROM itens_obra i
+    LEFT JOIN medicoes m ON i.id = m.item_id AND m.numero_medicao = ?
+    WHERE i.obra_id = ?
+    ORDER BY i.id
+    ''', (1, 1)),
+    ('obras_recentes', '''
+    SELECT nome, contrato, data_inicio FROM obras
+    WHERE user_id = ?
+    ORDER BY data_inicio DESC
+    LIMIT 5
+    ''', (1,)),
+    ('obras_por_nome', '''
+    SELECT id, nome, contrato FROM obras WHERE user_id = ? ORDER BY nome
+    ''', (1,)),
+    ('jobs_usuario', '''
+    SELECT id, status, progresso FROM jobs
+    WHERE user_id = ? AND arquivado = 0
+    ORDER BY id DESC
+    LIMIT 5
+    ''', (1,)),
+    ('api_obras', '''
+    SELECT id, nome, contrato, valor_total, num_medicoes FROM obras
+    WHERE user_id = ? AND id > ?
+    ORDER BY id
+    LIMIT ?
+    ''', (1, 0, 101)),
+    ('busca_obras', '''
+    SELECT o.id, o.nome, o.contrato
+    FROM obras_busca b JOIN obras o ON o.id = b.rowid
+    WHERE obras_busca MATCH ? AND o.user_id = ?
+    ORDER BY o.nome, o.contrato, o.id
+    LIMIT ? OFFSET ?
+    ''', ('"obra"*', 1, 50, 0)),
+    ('lista_obras_paginada', '''
+    SELECT o.id, o.nome, o.contrato
+    FROM obras o
+    WHERE o.user_id = ?
+    ORDER BY o.nome, o.contrato, o.id
+    LIMIT ? OFFSET ?
+    ''', (1, 50, 0)),
+]
+
+
+def list_migrations():
+    """Lista as migrações disponíveis como (versão, nome, caminho), em ordem"""
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = _MIGRATION_RE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2),
+                               os.path.join(MIGRATIONS_DIR, filename)))
+    migrations.sort()
+    versions = [m[0] for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError('Existem migrações com o mesmo número de versão')
+    return migrations
+
+
+def _ensure_version_table(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMP NOT NULL
+    )''')
+    conn.commit()
+
+
+def get_schema_version(conn=None):
+    """Retorna a versão atual do esquema (0 se nenhuma migração foi aplicada)"""
+    own = conn is None
+    if own:
+        conn = get_db_connection()
+    try:
+        _ensure_version_table(conn)
+        row = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+        return row[0] or 0
+    finally:
+        if own:
+            conn.close()
+
+
+def apply_migrations(conn=None):
+    """Aplica, em ordem, as migrações ainda não registradas em schema_version"""
+    own = conn is None
+    if own:
+        conn = get_db_connection()
+    applied = []
+    try:
+        _ensure_version_table(conn)
+        for version, name, path in list_migrations():
+            with open(path, encoding='utf-8') as f:
+                sql = f.read()
+
+            # BEGIN IMMEDIATE impede que dois processos apliquem a mesma migração
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute('SELECT 1 FROM schema_version WHERE version = ?',
+                                   (version,)).fetchone()
+                if row:
+                    conn.rollback()
+                    continue
+                for statement in _split_statements(sql):
+                    conn.execute(statement)
+                conn.execute('INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)',
+                             (version, name, datetime.now()))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            applied.append(version)
+            logger.info('Migração %04d_%s aplicada', version, name)
+        return applied
+    finally:
+        if own:
+            conn.close()
+
+
+def _split_statements(sql):
+    """Divide um script SQL em comandos completos (respeita corpos de triggers)"""
+    statements = []
+    current = ''
+    for line in sql.splitlines(keepends=True):
+        if not current and line.strip().startswith('--'):
+            continue
+        current += line
+        if sqlite3.complete_statement(current):
+            if current.strip():
+                statements.append(current.strip())
+            current = ''
+    if current.strip():
+        statements.append(current.strip())
+    return statements
+
+
+def explain_query_plan(sql, params=(), conn=None):
+    """Retorna as linhas de detalhe do EXPLAIN QUERY PLAN de uma consulta"""
+    own = conn is None
+    if own:
+        conn = get_db_connection()
+    try:
+        return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()]
+    finally:
+        if own:
+            conn.close()
+
+
+def check_query_plans(conn=None):
+    """Verifica se as consultas frequentes usam índices; retorna os problemas encontrados"""
+    problems = []
+    for name, sql, params in HOT_QUERIES:
+        for detail in explain_query_plan(sql, params, conn):
+            # Ordenar um resultado já filtrado por índice é aceitável; agrupar não
+            full_scan = detail.startswith('SCAN') and 'INDEX' not in detail
+            if full_scan or 'TEMP B-TREE FOR GROUP BY' in detail:
+                problems.append((name, detail))
+    for name, detail in problems:
+        logger.warning('Consulta %s sem índice adequado: %s', name, detail)
+    return problems
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    applied = apply_migrations()
+    print(f"Versão do esquema: {get_schema_version()} ({len(applied)} migração(ões) aplicada(s))")
+    for name, sql, params in HOT_QUERIES:
+        print(f"\n{name}:")
+        for detail in explain_query_plan(sql, params):
+            print(f"  {detail}")
+    problems = check_query_plans()
+    print(f"\n{len(problems)} problema(s) de plano de consulta encontrado(s)")
@@ -0,0 +1,9 @@
+-- Índices de cobertura para as consultas de medições por obra
+-- registrar_medicao / calcular_glosa: WHERE obra_id = ? AND numero_medicao = ?
+-- gerar_relatorios: WHERE obra_id = ? GROUP BY numero_medicao (SUM previsto/realizado)
+CREATE INDEX IF NOT EXISTS idx_medicoes_obra_medicao
+    ON medicoes (obra_id, numero_medicao, item_id, valor_previsto, valor_realizado);
+
+-- Junção itens_obra -> medicoes por item (registrar_medicao, editar_previsoes)
+CREATE INDEX IF NOT EXISTS idx_medicoes_item_medicao
+    ON medicoes (item_id, numero_medicao, valor_previsto, valor_realizado);
@@ -0,0 +1,10 @@
+-- Listagem de obras do usuário: WHERE user_id = ? ORDER BY data_inicio / nome
+CREATE INDEX IF NOT EXISTS idx_obras_user_data_inicio
+    ON obras (user_id, data_inicio, nome, contrato);
+
+CREATE INDEX IF NOT EXISTS idx_obras_user_nome
+    ON obras (user_id, nome, contrato);
+
+-- Itens de uma obra
+CREATE INDEX IF NOT EXISTS idx_itens_obra_obra
+    ON itens_obra (obra_id, id, descricao, valor_previsto);
@@ -0,0 +1,76 @@
+-- Totais por medição de cada obra, mantidos pelos triggers de medicoes
+CREATE TABLE IF NOT EXISTS medicoes_resumo (
+    obra_id INTEGER NOT NULL,
+    numero_medicao INTEGER NOT NULL,
+    total_previsto REAL NOT NULL DEFAULT 0,
+    total_realizado REAL NOT NULL DEFAULT 0,
+    itens_realizados INTEGER NOT NULL DEFAULT 0,
+    itens_total INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (obra_id, numero_medicao)
+) WITHOUT ROWID;
+
+INSERT OR REPLACE INTO medicoes_resumo (
+    obra_id, numero_medicao, total_previsto, total_realizado, itens_realizados, itens_total
+)
+SELECT obra_id, numero_medicao, TOTAL(valor_previsto), TOTAL(valor_realizado),
+       COUNT(valor_realizado), COUNT(*)
+FROM medicoes
+GROUP BY obra_id, numero_medicao;
+
+CREATE TRIGGER IF NOT EXISTS trg_medicoes_resumo_insert
+AFTER INSERT ON medicoes
+BEGIN
+    INSERT OR IGNORE INTO medicoes_resumo (obra_id, numero_medicao)
+    VALUES (NEW.obra_id, NEW.numero_medicao);
+
+    UPDATE medicoes_resumo
+    SET total_previsto = total_previsto + COALESCE(NEW.valor_previsto, 0),
+        total_realizado = total_realizado + COALESCE(NEW.valor_realizado, 0),
+        itens_realizados = itens_realizados + (NEW.valor_realizado IS NOT NULL),
+        itens_total = itens_total + 1
+    WHERE obra_id = NEW.obra_id AND numero_medicao = NEW.numero_medicao;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_medicoes_resumo_update
+AFTER UPDATE OF obra_id, numero_medicao, valor_previsto, valor_realizado ON medicoes
+BEGIN
+    -- Retira a contribuição antiga; zera os totais quando não resta nenhum item,
+    -- evitando resíduos de arredondamento
+    UPDATE medicoes_resumo
+    SET total_previsto = CASE WHEN itens_total = 1 THEN 0
+                              ELSE total_previsto - COALESCE(OLD.valor_previsto, 0) END,
+        total_realizado = CASE WHEN itens_realizados - (OLD.valor_realizado IS NOT NULL) = 0 THEN 0
+                               ELSE total_realizado - COALESCE(OLD.valor_realizado, 0) END,
+        itens_realizados = itens_realizados - (OLD.valor_realizado IS NOT NULL),
+        itens_total = itens_total - 1
+    WHERE obra_id = OLD.obra_id AND numero_medicao = OLD.numero_medicao;
+
+    INSERT OR IGNORE INTO medicoes_resumo (obra_id, numero_medicao)
+    VALUES (NEW.obra_id, NEW.numero_medicao);
+
+    UPDATE medicoes_resumo
+    SET total_previsto = total_previsto + COALESCE(NEW.valor_previsto, 0),
+        total_realizado = total_realizado + COALESCE(NEW.valor_realizado, 0),
+        itens_realizados = itens_realizados + (NEW.valor_realizado IS NOT NULL),
+        itens_total = itens_total + 1
+    WHERE obra_id = NEW.obra_id AND numero_medicao = NEW.numero_medicao;
+
+    DELETE FROM medicoes_resumo
+    WHERE obra_id = OLD.obra_id AND numero_medicao = OLD.numero_medicao AND itens_total = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_medicoes_resumo_delete
+AFTER DELETE ON medicoes
+BEGIN
+    UPDATE medicoes_resumo
+    SET total_previsto = CASE WHEN itens_total = 1 THEN 0
+                              ELSE total_previsto - COALESCE(OLD.valor_previsto, 0) END,
+        total_realizado = CASE WHEN itens_realizados - (OLD.valor_realizado IS NOT NULL) = 0 THEN 0
+                               ELSE total_realizado - COALESCE(OLD.valor_realizado, 0) END,
+        itens_realizados = itens_realizados - (OLD.valor_realizado IS NOT NULL),
+        itens_total = itens_total - 1
+    WHERE obra_id = OLD.obra_id AND numero_medicao = OLD.numero_medicao;
+
+    DELETE FROM medicoes_resumo
+    WHERE obra_id = OLD.obra_id AND numero_medicao = OLD.numero_medicao AND itens_total = 0;
+END;
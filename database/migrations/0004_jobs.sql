@@ -0,0 +1,23 @@
+-- Tarefas executadas em segundo plano (relatórios PDF, importações), com progresso e artefato
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER,
+    tipo TEXT NOT NULL,
+    descricao TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pendente',
+    progresso REAL NOT NULL DEFAULT 0,
+    mensagem TEXT,
+    resultado TEXT,
+    artefato TEXT,
+    nome_artefato TEXT,
+    erro TEXT,
+    arquivado INTEGER NOT NULL DEFAULT 0,
+    criado_em TIMESTAMP NOT NULL,
+    iniciado_em TIMESTAMP,
+    concluido_em TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs(user_id, arquivado, id);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
@@ -0,0 +1,4 @@
+-- Paginação da API por cursor: WHERE user_id = ? AND id > ? ORDER BY id
+-- (o índice guarda o rowid em ordem dentro de cada usuário, sem ordenação temporária)
+CREATE INDEX IF NOT EXISTS idx_obras_user_id
+    ON obras (user_id, id);
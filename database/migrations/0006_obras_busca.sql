@@ -0,0 +1,35 @@
+-- Busca textual das obras (seletor de obras das páginas): índice FTS5 sobre os campos
+-- cadastrais, sem cópia dos textos (content='obras'), mantido pelos triggers de obras.
+-- remove_diacritics: "construcao" encontra "Construção"; prefix: índices para buscas por prefixo
+CREATE VIRTUAL TABLE IF NOT EXISTS obras_busca USING fts5(
+    nome, contrato, ordem_servico, contratante, contratada,
+    content='obras',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+INSERT INTO obras_busca (obras_busca) VALUES ('rebuild');
+
+CREATE TRIGGER IF NOT EXISTS trg_obras_busca_insert
+AFTER INSERT ON obras
+BEGIN
+    INSERT INTO obras_busca (rowid, nome, contrato, ordem_servico, contratante, contratada)
+    VALUES (NEW.id, NEW.nome, NEW.contrato, NEW.ordem_servico, NEW.contratante, NEW.contratada);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_obras_busca_delete
+AFTER DELETE ON obras
+BEGIN
+    INSERT INTO obras_busca (obras_busca, rowid, nome, contrato, ordem_servico, contratante, contratada)
+    VALUES ('delete', OLD.id, OLD.nome, OLD.contrato, OLD.ordem_servico, OLD.contratante, OLD.contratada);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_obras_busca_update
+AFTER UPDATE OF nome, contrato, ordem_servico, contratante, contratada ON obras
+BEGIN
+    INSERT INTO obras_busca (obras_busca, rowid, nome, contrato, ordem_servico, contratante, contratada)
+    VALUES ('delete', OLD.id, OLD.nome, OLD.contrato, OLD.ordem_servico, OLD.contratante, OLD.contratada);
+    INSERT INTO obras_busca (rowid, nome, contrato, ordem_servico, contratante, contratada)
+    VALUES (NEW.id, NEW.nome, NEW.contrato, NEW.ordem_servico, NEW.contratante, NEW.contratada);
+END;
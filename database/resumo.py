@@ -0,0 +1,102 @@
+import argparse
+
+from database.cache import invalidar_obra
+from database.db_utils import get_db_connection, submit_write
+
+# Tolerância para divergências de arredondamento entre o resumo e as medições
+TOLERANCIA = 0.005
+
+
+def _agregar(cursor, obra_ids=None):
+    filtro, params = '', []
+    if obra_ids:
+        filtro = f"WHERE obra_id IN ({', '.join('?' * len(obra_ids))})"
+        params = list(obra_ids)
+    cursor.execute(f'''
+    SELECT obra_id, numero_medicao, TOTAL(valor_previsto), TOTAL(valor_realizado),
+           COUNT(valor_realizado), COUNT(*)
+    FROM medicoes
+    {filtro}
+    GROUP BY obra_id, numero_medicao
+    ''', params)
+    esperado = {(r[0], r[1]): r[2:] for r in cursor.fetchall()}
+
+    cursor.execute(f'''
+    SELECT obra_id, numero_medicao, total_previsto, total_realizado, itens_realizados, itens_total
+    FROM medicoes_resumo
+    {filtro}
+    ''', params)
+    atual = {(r[0], r[1]): r[2:] for r in cursor.fetchall()}
+    return esperado, atual
+
+
+def _diverge(a, b):
+    if a is None or b is None:
+        return True
+    return (abs(a[0] - b[0]) > TOLERANCIA or abs(a[1] - b[1]) > TOLERANCIA
+            or a[2] != b[2] or a[3] != b[3])
+
+
+def _divergentes(esperado, atual):
+    return sorted(
+        chave for chave in set(esperado) | set(atual)
+        if _diverge(esperado.get(chave), atual.get(chave))
+    )
+
+
+def _corrigir(obra_ids=None, conn=None):
+    """Gravação do escritor único: corrige as divergências; retorna (divergentes, {obra_id: user_id})"""
+    cursor = conn.cursor()
+    esperado, atual = _agregar(cursor, obra_ids)
+    divergentes = _divergentes(esperado, atual)
+    if not divergentes:
+        return divergentes, {}
+
+    cursor.executemany(
+        'DELETE FROM medicoes_resumo WHERE obra_id = ? AND numero_medicao = ?',
+        [chave for chave in divergentes if chave not in esperado]
+    )
+    cursor.executemany('''
+    INSERT OR REPLACE INTO medicoes_resumo (
+        obra_id, numero_medicao, total_previsto, total_realizado, itens_realizados, itens_total
+    ) VALUES (?, ?, ?, ?, ?, ?)
+    ''', [chave + tuple(esperado[chave]) for chave in divergentes if chave in esperado])
+
+    # Donos das obras corrigidas, para invalidar também a carteira de cada usuário
+    obras = sorted({obra_id for obra_id, _ in divergentes})
+    donos = dict(cursor.execute(
+        f"SELECT id, user_id FROM obras WHERE id IN ({', '.join('?' * len(obras))})", obras
+    ).fetchall())
+    return divergentes, donos
+
+
+def reconstruir_resumo(obra_ids=None, apenas_verificar=False):
+    """
+    Confere medicoes_resumo com as linhas de medicoes e corrige as divergências
+    (pelo escritor único, invalidando o cache das obras corrigidas)
+    Retorna a lista de chaves (obra_id, numero_medicao) divergentes
+    """
+    if apenas_verificar:
+        conn = get_db_connection()
+        try:
+            return _divergentes(*_agregar(conn.cursor(), obra_ids))
+        finally:
+            conn.close()
+
+    divergentes, donos = submit_write(_corrigir, obra_ids).result()
+    for obra_id in sorted({obra_id for obra_id, _ in divergentes}):
+        invalidar_obra(obra_id, donos.get(obra_id))
+    return divergentes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstrói a tabela medicoes_resumo a partir de medicoes")
+    parser.add_argument('obra_ids', nargs='*', type=int, help="Obras a reconciliar (padrão: todas)")
+    parser.add_argument('--verificar', action='store_true', help="Apenas lista as divergências")
+    args = parser.parse_args()
+
+    divergentes = reconstruir_resumo(args.obra_ids or None, apenas_verificar=args.verificar)
+    acao = "encontrada(s)" if args.verificar else "corrigida(s)"
+    print(f"{len(divergentes)} divergência(s) {acao}")
+    for obra_id, numero_medicao in divergentes:
+        print(f"- Obra {obra_id}, Medição {numero_medicao}")
@@ -1,12 +1,26 @@
 import streamlit as st
 import os
+import importlib
+from database import db_utils
 from database.db_utils import create_tables
 from database.init_db import init_database
+from database.migrate import apply_migrations, check_query_plans
 from modules.auth import login, logout, check_authentication
-from modules.cadastro import cadastrar_obra
-from modules.medicoes import registrar_medicao
-from modules.relatorios import gerar_relatorios
-from modules.edicao import editar_obra
+from utils.profiling import perfil_pagina, secao
+
+# Páginas do menu: (módulo, função). Os módulos (e pandas, plotly e reportlab)
+# só são importados quando a página é aberta pela primeira vez
+PAGINAS = {
+    "Cadastro de Obra": ("modules.cadastro", "cadastrar_obra"),
+    "Editar Obra": ("modules.edicao", "editar_obra"),
+    "Medições": ("modules.medicoes", "registrar_medicao"),
+    "Importar Dados": ("modules.importar", "importar_dados"),
+    "Relatórios": ("modules.relatorios", "gerar_relatorios"),
+    "Administração": ("modules.admin", "painel_admin"),
+}
+
+# Usuários que enxergam a página de administração (lista separada por vírgulas)
+ADMINS = {u.strip() for u in os.environ.get('OBRAS_ADMINS', '').split(',') if u.strip()}
 
 
 # Configuração da página Streamlit
@@ -24,42 +38,50 @@ if 'username' not in st.session_state:
     st.session_state.username = None
 
 
-def main():
-    # Inicializar banco de dados se não existir
-    if not os.path.exists('obras.db'):
+@st.cache_resource
+def inicializar_sistema():
+    """Prepara o banco de dados uma única vez por processo"""
+    from utils.localizacao import configurar_locale
+
+    configurar_locale()
+    # Caminho lido na hora: configure_database pode tê-lo trocado depois do import
+    if not os.path.exists(db_utils.DB_PATH):
         create_tables()
         init_database()
+    else:
+        apply_migrations()
 
-    # Verificar autenticação
-    if not check_authentication():
-        login()
-        return
+    # Tarefas em segundo plano que não terminaram antes do último reinício
+    from utils.jobs import recuperar_interrompidos
+    recuperar_interrompidos()
 
-    # Sidebar com informações do usuário e menu
-    with st.sidebar:
-        st.write(f"👤 Usuário: {st.session_state.username}")
+    # API JSON no próprio processo do Streamlit (compartilha o cache de consultas e o escritor único)
+    if os.environ.get('OBRAS_API_STREAMLIT', '0').lower() in ('1', 'true', 'sim'):
+        from modules.api import iniciar_em_segundo_plano
+        iniciar_em_segundo_plano()
+    return check_query_plans()
 
-        menu = ["Início", "Cadastro de Obra", "Editar Obra", "Medições", "Relatórios"]
-        choice = st.selectbox("Menu", menu)
 
-        if st.button("Sair"):
-            st.session_state.user_id = None
-            st.session_state.username = None
-            st.rerun()
+def carregar_pagina(choice):
+    """Importa sob demanda o módulo da página escolhida e retorna sua função"""
+    modulo, funcao = PAGINAS[choice]
+    return getattr(importlib.import_module(modulo), funcao)
 
-    # Conteúdo principal baseado na escolha do menu
-    if choice == "Início":
-        st.title("Sistema de Gestão de Obras")
-
-        # Dashboard inicial
-        col1, col2 = st.columns(2)
-        with col1:
-            st.write("### Suas Obras Recentes")
-            from database.db_utils import get_db_connection
-            conn = get_db_connection()
-            cursor = conn.cursor()
-
-            try:
+
+def pagina_inicial():
+    """Painel inicial com as obras recentes e as medições pendentes do usuário"""
+    st.title("Sistema de Gestão de Obras")
+
+    # Dashboard inicial
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write("### Suas Obras Recentes")
+        from database.db_utils import get_db_connection
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        try:
+            with secao("consultas"):
                 cursor.execute('''
                 SELECT nome, contrato, data_inicio 
                 FROM obras 
@@ -69,53 +91,101 @@ def main():
                 ''', (st.session_state.user_id,))
 
                 obras = cursor.fetchall()
-                if obras:
-                    for obra in obras:
-                        st.write(f"- {obra[0]} (Contrato: {obra[1]})")
-                else:
-                    st.info("Nenhuma obra cadastrada ainda.")
-            except Exception as e:
-                st.error(f"Erro ao carregar obras: {str(e)}")
-            finally:
-                conn.close()
-
-        with col2:
-            st.write("### Medições Pendentes")
-            try:
+            if obras:
+                for obra in obras:
+                    st.write(f"- {obra[0]} (Contrato: {obra[1]})")
+            else:
+                st.info("Nenhuma obra cadastrada ainda.")
+        except Exception as e:
+            st.error(f"Erro ao carregar obras: {str(e)}")
+        finally:
+            conn.close()
+
+    with col2:
+        st.write("### Medições Pendentes")
+        try:
+            with secao("consultas"):
                 conn = get_db_connection()
                 cursor = conn.cursor()
                 cursor.execute('''
-                SELECT o.nome, m.numero_medicao
+                SELECT o.nome, r.numero_medicao
                 FROM obras o
-                JOIN medicoes m ON o.id = m.obra_id
+                JOIN medicoes_resumo r ON o.id = r.obra_id
                 WHERE o.user_id = ? 
-                AND m.valor_realizado IS NULL
-                GROUP BY o.id, m.numero_medicao
-                ORDER BY m.numero_medicao
+                AND r.itens_realizados < r.itens_total
+                ORDER BY r.numero_medicao
                 LIMIT 5
                 ''', (st.session_state.user_id,))
 
                 medicoes = cursor.fetchall()
-                if medicoes:
-                    for med in medicoes:
-                        st.write(f"- {med[0]} (Medição {med[1]})")
-                else:
-                    st.info("Nenhuma medição pendente.")
-                conn.close()
-            except Exception as e:
-                st.error(f"Erro ao carregar medições: {str(e)}")
-
-    elif choice == "Cadastro de Obra":
-        cadastrar_obra()
-
-    elif choice == "Editar Obra":
-        editar_obra()
-
-    elif choice == "Medições":
-        registrar_medicao()
-
-    elif choice == "Relatórios":
-        gerar_relatorios()
+            if medicoes:
+                for med in medicoes:
+                    st.write(f"- {med[0]} (Medição {med[1]})")
+            else:
+                st.info("Nenhuma medição pendente.")
+            conn.close()
+        except Exception as e:
+            st.error(f"Erro ao carregar medições: {str(e)}")
+
+
+def painel_tarefas():
+    """Tarefas em segundo plano do usuário na barra lateral: progresso e downloads"""
+    from utils import jobs
+    from modules.download_tarefas import botao_download_tarefa
+
+    tarefas = jobs.listar_jobs(st.session_state.user_id, 5)
+    if not tarefas:
+        return
+
+    st.write("### Tarefas")
+    em_andamento = False
+    for job in tarefas:
+        if job['status'] in (jobs.PENDENTE, jobs.EXECUTANDO):
+            em_andamento = True
+            st.progress(job['progresso'], text=f"{job['descricao']}: {job['mensagem'] or 'aguardando'}")
+        elif job['status'] == jobs.ERRO:
+            st.error(f"{job['descricao']}: {job['erro']}")
+        elif not botao_download_tarefa(job, f"⬇️ {job['descricao']}", f"job_{job['id']}"):
+            st.success(job['descricao'])
+
+    # Os resultados das tarefas aparecem na próxima execução da página
+    if em_andamento:
+        st.button("Atualizar tarefas")
+    elif st.button("Limpar tarefas"):
+        jobs.arquivar_concluidos(st.session_state.user_id)
+        st.rerun()
+
+
+def main():
+    inicializar_sistema()
+
+    # Verificar autenticação
+    if not check_authentication():
+        login()
+        return
+
+    # Sidebar com informações do usuário e menu
+    with st.sidebar:
+        st.write(f"👤 Usuário: {st.session_state.username}")
+
+        menu = ["Início", "Cadastro de Obra", "Editar Obra", "Medições", "Importar Dados", "Relatórios"]
+        if st.session_state.username in ADMINS:
+            menu.append("Administração")
+        choice = st.selectbox("Menu", menu)
+
+        painel_tarefas()
+
+        if st.button("Sair"):
+            st.session_state.user_id = None
+            st.session_state.username = None
+            st.rerun()
+
+    # Conteúdo principal baseado na escolha do menu
+    with perfil_pagina(choice):
+        if choice == "Início":
+            pagina_inicial()
+        else:
+            carregar_pagina(choice)()
 
 
 if __name__ == "__main__":
@@ -1,4 +1,20 @@
-from .auth import login, logout, check_authentication
-from .medicoes import registrar_medicao
-from .relatorios import gerar_relatorios
-from .pdf_generator import generate_pdf_report
+import importlib
+
+# Importação sob demanda: carregar modules.auth (tela de login) não deve
+# importar pandas, plotly e reportlab das demais páginas
+_EXPORTS = {
+    'login': 'auth',
+    'logout': 'auth',
+    'check_authentication': 'auth',
+    'registrar_medicao': 'medicoes',
+    'gerar_relatorios': 'relatorios',
+    'generate_pdf_report': 'pdf_generator',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
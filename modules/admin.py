@@ -0,0 +1,168 @@
+import streamlit as st
+import pandas as pd
+from database import instrumentacao
+from database.db_utils import get_pool_stats
+from database.cache import get_cache_stats
+from utils import jobs, profiling
+from modules import relatorios_lote
+from modules.download_tarefas import botao_download_tarefa
+
+ORDENACOES = {
+    'Tempo total': 'total_ms',
+    'p95': 'p95_ms',
+    'p99': 'p99_ms',
+    'Máximo': 'max_ms',
+    'Execuções': 'execucoes',
+    'Linhas': 'linhas',
+    'Lentas': 'lentas',
+}
+
+
+def painel_admin():
+    st.header("Administração")
+
+    # Instrumentação dos comandos SQL
+    st.subheader("Comandos SQL")
+    ligado = st.checkbox(
+        "Medir comandos SQL",
+        value=instrumentacao.ativo(),
+        help="Também pode ser ligado ao iniciar a aplicação com OBRAS_SQL_INSTRUMENTACAO=1"
+    )
+    if ligado != instrumentacao.ativo():
+        instrumentacao.ativar(ligado)
+
+    totais = instrumentacao.coletor.totais()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Comandos distintos", totais['comandos'])
+    col2.metric("Execuções", totais['execucoes'])
+    col3.metric("Tempo total", f"{totais['total_ms']:.1f} ms")
+    col4.metric(f"Lentas (≥ {totais['limite_lenta_ms']:.0f} ms)", totais['lentas'])
+    st.caption(f"Coletando desde {totais['inicio']}")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        ordenacao = st.selectbox("Ordenar por", list(ORDENACOES))
+    with col2:
+        limite = st.number_input("Comandos exibidos", min_value=5, max_value=500, value=20, step=5)
+
+    comandos = instrumentacao.get_sql_stats(ORDENACOES[ordenacao], int(limite))
+    if not comandos:
+        st.info("Nenhum comando medido ainda.")
+    else:
+        st.dataframe(pd.DataFrame({
+            'Comando': [c['sql'] for c in comandos],
+            'Execuções': [c['execucoes'] for c in comandos],
+            'Total (ms)': [round(c['total_ms'], 2) for c in comandos],
+            'p50 (ms)': [round(c['p50_ms'], 3) for c in comandos],
+            'p95 (ms)': [round(c['p95_ms'], 3) for c in comandos],
+            'p99 (ms)': [round(c['p99_ms'], 3) for c in comandos],
+            'Máx. (ms)': [round(c['max_ms'], 3) for c in comandos],
+            'Linhas/exec.': [round(c['linhas_por_execucao'], 1) for c in comandos],
+            'Lentas': [c['lentas'] for c in comandos],
+            'Páginas': [', '.join(c['paginas']) for c in comandos],
+        }), use_container_width=True)
+
+        for c in comandos:
+            if c['plano']:
+                with st.expander(f"Plano: {c['sql'][:100]}"):
+                    st.code('\n'.join(c['plano']))
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Gravar estatísticas em arquivo"):
+            caminho = instrumentacao.salvar_estatisticas()
+            if caminho:
+                st.success(f"Estatísticas gravadas em {caminho}")
+            else:
+                st.info("Nenhum comando medido ainda.")
+    with col2:
+        if st.button("Zerar estatísticas"):
+            instrumentacao.coletor.limpar()
+            st.rerun()
+
+    # Consultas lentas registradas no log
+    st.subheader("Consultas Lentas Recentes")
+    lentas = instrumentacao.ler_consultas_lentas(50)
+    if not lentas:
+        st.info(f"Nenhuma consulta lenta registrada em {instrumentacao.ARQUIVO_LENTAS}.")
+    else:
+        st.dataframe(pd.DataFrame({
+            'Data': [r['data'] for r in lentas],
+            'Duração (ms)': [r['duracao_ms'] for r in lentas],
+            'Linhas': [r['linhas'] for r in lentas],
+            'Página': [r['pagina'] for r in lentas],
+            'Comando': [r['sql'] for r in lentas],
+            'Plano': [' | '.join(r['plano'] or []) for r in lentas],
+        }), use_container_width=True)
+
+    # Perfil das execuções das páginas
+    st.subheader("Perfil das Páginas")
+    perfis = profiling.ultimos_perfis(50)
+    if not profiling.ativo():
+        st.info("Inicie a aplicação com OBRAS_PROFILING=1 para medir as execuções das páginas.")
+    elif not perfis:
+        st.info("Nenhuma execução medida ainda.")
+    else:
+        st.dataframe(pd.DataFrame({
+            'Data': [p['data'] for p in perfis],
+            'Página': [p['pagina'] for p in perfis],
+            'Tempo (ms)': [p['ms'] for p in perfis],
+            'SQL (ms)': [p['sql_ms'] for p in perfis],
+            'Comandos SQL': [p['sql_execucoes'] for p in perfis],
+            'Pico de memória (KB)': [p['pico_kb'] for p in perfis],
+            # Medido com outras páginas em execução: inclui a memória delas
+            'Pico aproximado': [p.get('pico_aproximado', False) for p in perfis],
+            'Seções': [', '.join(f"{s['secao']} {s['ms']:.1f} ms" for s in p.get('secoes', [])) for p in perfis],
+            'cProfile': [p.get('cprofile', '') for p in perfis],
+        }), use_container_width=True)
+
+    # Geração dos relatórios PDF de toda a carteira
+    st.subheader("Relatórios em Lote")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        user_id = st.number_input("Usuário (user_id, 0 = todos)", min_value=0, value=0, step=1)
+    with col2:
+        workers = st.number_input("Processos", min_value=1, max_value=64, value=relatorios_lote.PDF_WORKERS, step=1)
+    with col3:
+        compactar = st.checkbox("Compactar em .zip", value=True)
+        com_graficos = st.checkbox("Incluir gráficos", value=True)
+
+    if st.button("Gerar relatórios"):
+        # Executado em segundo plano: a navegação continua livre durante a geração
+        st.session_state.relatorios_lote_job = relatorios_lote.enviar_relatorios_lote(
+            int(user_id) or None,
+            graficos=com_graficos,
+            workers=int(workers),
+            compactar=compactar,
+            solicitante=st.session_state.user_id,
+            descricao="Relatórios PDF em lote" + (f" (usuário {int(user_id)})" if user_id else "")
+        )
+
+    job = jobs.buscar_job(st.session_state.relatorios_lote_job) if st.session_state.get('relatorios_lote_job') else None
+    if job and job['status'] in (jobs.PENDENTE, jobs.EXECUTANDO):
+        st.progress(job['progresso'], text=job['mensagem'] or "Aguardando início")
+        st.button("Atualizar progresso")
+    elif job and job['status'] == jobs.ERRO:
+        st.error(f"Erro ao gerar os relatórios: {job['erro']}")
+    elif job:
+        stats = job['resultado']
+        if not stats['relatorios']:
+            st.info("Nenhuma medição realizada encontrada.")
+        else:
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Relatórios gerados", f"{stats['gerados']}/{stats['relatorios']}")
+            col2.metric("Tempo", f"{stats['segundos']:.1f} s")
+            col3.metric("Vazão", f"{stats['relatorios_por_segundo']:.1f}/s")
+            col4.metric("Tamanho", f"{stats['megabytes']:.1f} MB")
+            st.caption(f"{stats['workers']} processo(s) -> {stats['destino']}")
+            for obra_id, numero_medicao, erro in stats['erros']:
+                st.error(f"Obra {obra_id}, medição {numero_medicao}: {erro}")
+            botao_download_tarefa(job, "Baixar relatórios (.zip)", "btn_baixar_lote", mime="application/zip")
+
+    # Pool de conexões e cache de consultas
+    st.subheader("Pool de Conexões e Cache")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.json(get_pool_stats())
+    with col2:
+        st.json(get_cache_stats())
@@ -0,0 +1,579 @@
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import math
+import mimetypes
+import os
+import re
+import sys
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from database.db_utils import get_db_connection, submit_write, update_realizados, verify_user
+
+# Endereço do servidor da API
+API_HOST = os.environ.get('OBRAS_API_HOST', '127.0.0.1')
+API_PORTA = int(os.environ.get('OBRAS_API_PORTA', '8502'))
+
+# Obras por página nas listagens (padrão e máximo)
+POR_PAGINA = 100
+POR_PAGINA_MAX = 1000
+
+# Tamanho máximo do corpo das requisições (bytes)
+MAX_CORPO = 16 * 1024 * 1024
+
+CAMPOS_OBRA = ['id', 'nome', 'contrato', 'ordem_servico', 'contratante', 'contratada',
+               'valor_total', 'data_inicio', 'data_fim', 'num_medicoes']
+
+# Campos das tarefas em segundo plano devolvidos pela API
+CAMPOS_TAREFA = ['id', 'tipo', 'descricao', 'status', 'progresso', 'mensagem', 'erro',
+                 'criado_em', 'iniciado_em', 'concluido_em']
+
+logger = logging.getLogger(__name__)
+
+
+class ErroAPI(Exception):
+    """Erro devolvido ao cliente com o status HTTP e a mensagem (e detalhes) em JSON"""
+
+    def __init__(self, status, mensagem, detalhes=None):
+        super().__init__(mensagem)
+        self.status = status
+        self.mensagem = mensagem
+        self.detalhes = detalhes
+
+
+# As consultas da API vão direto ao banco, sem o cache de consultas das páginas: a API
+# costuma rodar em outro processo, que não enxerga as invalidações feitas pelo Streamlit
+# (nem o Streamlit enxerga as da API: nesse modo, as páginas só mostram as gravações da
+# API quando as consultas em cache expiram, em até OBRAS_CACHE_TTL segundos)
+
+def _obras_do_usuario(user_id, obra_ids, conn):
+    """{obra_id: (valor_total, num_medicoes)} das obras informadas que pertencem ao usuário"""
+    linhas = conn.execute(f'''
+    SELECT id, valor_total, num_medicoes FROM obras
+    WHERE user_id = ? AND id IN ({', '.join('?' * len(obra_ids))})
+    ''', (user_id, *obra_ids)).fetchall()
+    return {obra_id: (valor_total, num_medicoes) for obra_id, valor_total, num_medicoes in linhas}
+
+
+def buscar_obra(user_id, obra_id, conn=None):
+    """Dados cadastrais da obra do usuário; ErroAPI 404 se não existir ou for de outro usuário"""
+    fechar = conn is None
+    conn = conn or get_db_connection()
+    try:
+        linha = conn.execute(f"SELECT {', '.join(CAMPOS_OBRA)} FROM obras WHERE id = ? AND user_id = ?",
+                             (obra_id, user_id)).fetchone()
+    finally:
+        if fechar:
+            conn.close()
+    if linha is None:
+        raise ErroAPI(404, f"Obra {obra_id} não encontrada")
+    return dict(zip(CAMPOS_OBRA, linha))
+
+
+def listar_obras(user_id, apos=0, limite=POR_PAGINA, contrato=None):
+    """
+    Página de obras do usuário em ordem de id (paginação por cursor: apos = último id recebido)
+    Retorna {'obras': [...], 'proximo': cursor da próxima página ou None}
+    """
+    filtros, params = ['user_id = ?', 'id > ?'], [user_id, apos]
+    if contrato is not None:
+        filtros.append('contrato = ?')
+        params.append(contrato)
+    conn = get_db_connection()
+    try:
+        linhas = conn.execute(f'''
+        SELECT {', '.join(CAMPOS_OBRA)} FROM obras
+        WHERE {' AND '.join(filtros)}
+        ORDER BY id
+        LIMIT ?
+        ''', (*params, limite + 1)).fetchall()
+    finally:
+        conn.close()
+    obras = [dict(zip(CAMPOS_OBRA, linha)) for linha in linhas[:limite]]
+    return {'obras': obras, 'proximo': obras[-1]['id'] if len(linhas) > limite else None}
+
+
+def detalhar_obra(user_id, obra_id):
+    """Dados cadastrais da obra com seus itens (ids usados na gravação das medições)"""
+    conn = get_db_connection()
+    try:
+        obra = buscar_obra(user_id, obra_id, conn)
+        obra['itens'] = [
+            {'id': item_id, 'descricao': descricao, 'valor_previsto': valor_previsto}
+            for item_id, descricao, valor_previsto in conn.execute('''
+            SELECT id, descricao, valor_previsto FROM itens_obra
+            WHERE obra_id = ?
+            ORDER BY id
+            ''', (obra_id,))
+        ]
+    finally:
+        conn.close()
+    return obra
+
+
+def buscar_medicao(user_id, obra_id, numero_medicao):
+    """Valores previstos e realizados de cada item em uma medição da obra"""
+    conn = get_db_connection()
+    try:
+        buscar_obra(user_id, obra_id, conn)
+        linhas = conn.execute('''
+        SELECT item_id, valor_previsto, valor_realizado, data_medicao
+        FROM medicoes
+        WHERE obra_id = ? AND numero_medicao = ?
+        ORDER BY item_id
+        ''', (obra_id, numero_medicao)).fetchall()
+    finally:
+        conn.close()
+    if not linhas:
+        raise ErroAPI(404, f"Medição {numero_medicao} não encontrada na obra {obra_id}")
+    return {
+        'obra_id': obra_id,
+        'numero_medicao': numero_medicao,
+        'itens': [
+            {'item_id': item_id, 'valor_previsto': previsto, 'valor_realizado': realizado, 'data_medicao': data}
+            for item_id, previsto, realizado, data in linhas
+        ],
+    }
+
+
+def _numero(valor):
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool) and math.isfinite(valor)
+
+
+def _identificador(valor):
+    """Ids e números de medição do JSON: só inteiros (true/false e listas não valem)"""
+    return isinstance(valor, int) and not isinstance(valor, bool)
+
+
+def _validar_medicoes(user_id, medicoes):
+    """
+    Confere o lote recebido (obras do usuário, itens da obra, número da medição e valores)
+    e retorna [(obra_id, item_ids, numero_medicao, valores, valor_total, data_medicao)]
+    Todos os problemas encontrados são devolvidos juntos (ErroAPI 400)
+    """
+    if not isinstance(medicoes, list) or not medicoes:
+        raise ErroAPI(400, "Informe a lista 'medicoes'")
+
+    erros = []
+    obra_ids = sorted({m.get('obra_id') for m in medicoes if isinstance(m, dict) and _identificador(m.get('obra_id'))})
+    conn = get_db_connection()
+    try:
+        obras = _obras_do_usuario(user_id, obra_ids, conn) if obra_ids else {}
+        itens_por_obra = {}
+        if obras:
+            for obra_id, item_id in conn.execute(f'''
+            SELECT obra_id, id FROM itens_obra
+            WHERE obra_id IN ({', '.join('?' * len(obras))})
+            ''', list(obras)):
+                itens_por_obra.setdefault(obra_id, set()).add(item_id)
+    finally:
+        conn.close()
+
+    lote = []
+    for i, medicao in enumerate(medicoes):
+        prefixo = f"medicoes[{i}]"
+        if not isinstance(medicao, dict):
+            erros.append(f"{prefixo}: esperado um objeto")
+            continue
+        obra_id, numero_medicao, itens = medicao.get('obra_id'), medicao.get('numero_medicao'), medicao.get('itens')
+        if not _identificador(obra_id):
+            erros.append(f"{prefixo}: obra_id deve ser um número inteiro")
+            continue
+        if obra_id not in obras:
+            erros.append(f"{prefixo}: obra {obra_id} não encontrada")
+            continue
+        valor_total, num_medicoes = obras[obra_id]
+        if not _identificador(numero_medicao) or not 1 <= numero_medicao <= num_medicoes:
+            erros.append(f"{prefixo}: numero_medicao deve estar entre 1 e {num_medicoes}")
+            continue
+        data_medicao = medicao.get('data_medicao')
+        if data_medicao is not None:
+            try:
+                data_medicao = date.fromisoformat(data_medicao)
+            except (TypeError, ValueError):
+                erros.append(f"{prefixo}: data_medicao deve estar no formato AAAA-MM-DD")
+                continue
+        if not isinstance(itens, list) or not itens:
+            erros.append(f"{prefixo}: informe a lista 'itens'")
+            continue
+
+        item_ids, valores = [], []
+        for j, item in enumerate(itens):
+            item_id = item.get('item_id') if isinstance(item, dict) else None
+            valor = item.get('valor_realizado') if isinstance(item, dict) else None
+            if not _identificador(item_id):
+                erros.append(f"{prefixo}.itens[{j}]: item_id deve ser um número inteiro")
+            elif item_id not in itens_por_obra.get(obra_id, ()):
+                erros.append(f"{prefixo}.itens[{j}]: item {item_id} não pertence à obra {obra_id}")
+            elif item_id in item_ids:
+                erros.append(f"{prefixo}.itens[{j}]: item {item_id} repetido")
+            elif valor is not None and (not _numero(valor) or valor < 0):
+                erros.append(f"{prefixo}.itens[{j}]: valor_realizado deve ser um número não negativo ou null")
+            else:
+                item_ids.append(item_id)
+                # null = medição não realizada para o item (gravado como NULL)
+                valores.append(float('nan') if valor is None else float(valor))
+        lote.append((obra_id, item_ids, numero_medicao, valores, valor_total, data_medicao))
+
+    if erros:
+        raise ErroAPI(400, f"{len(erros)} problema(s) no lote; nada foi gravado", erros)
+    return lote
+
+
+def _gravar_lote(lote, conn=None):
+    for obra_id, item_ids, numero_medicao, valores, valor_total, data_medicao in lote:
+        update_realizados(obra_id, item_ids, numero_medicao, valores, valor_total, data_medicao, conn=conn)
+
+
+def gravar_medicoes(user_id, medicoes):
+    """
+    Grava os valores realizados de várias medições (de uma ou mais obras) em uma única
+    transação do escritor único: ou todo o lote é gravado, ou nada
+    """
+    from database.cache import invalidar_obra
+
+    lote = _validar_medicoes(user_id, medicoes)
+    submit_write(_gravar_lote, lote).result()
+    # Só tem efeito no processo atual (API atendida dentro do Streamlit, OBRAS_API_STREAMLIT=1)
+    for obra_id in {obra_id for obra_id, *_ in lote}:
+        invalidar_obra(obra_id, user_id)
+    return {'medicoes': len(lote), 'itens': sum(len(item_ids) for _, item_ids, *_ in lote)}
+
+
+def _registros(df):
+    """Linhas do DataFrame como dicionários, com NaN como None"""
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+def indicadores_obras(obras):
+    """Curva S (previsto e realizado acumulados), IDP e glosa de cada medição das obras"""
+    from utils.indicadores import calcular_indicadores
+
+    indicadores = calcular_indicadores(obra_ids=[obra['id'] for obra in obras])
+    por_obra = {obra_id: grupo for obra_id, grupo in indicadores.groupby('obra_id', sort=False)}
+    colunas = [c for c in indicadores.columns if c not in ('obra_id', 'valor_total')]
+    resultado = []
+    for obra in obras:
+        grupo = por_obra.get(obra['id'])
+        medicoes = _registros(grupo[colunas]) if grupo is not None else []
+        resultado.append({
+            'obra_id': obra['id'],
+            'nome': obra['nome'],
+            'valor_total': obra['valor_total'],
+            'valor_glosa_total': float(grupo['valor_glosa'].sum()) if grupo is not None else 0.0,
+            'medicoes': medicoes,
+        })
+    return resultado
+
+
+def solicitar_relatorio(user_id, obra_id, numero_medicao):
+    """Agenda o relatório PDF de uma medição já realizada; retorna o id da tarefa"""
+    from modules.pdf_generator import enviar_relatorio_pdf
+    from modules.relatorios_lote import carregar_tarefas
+
+    buscar_obra(user_id, obra_id)
+    # Indicadores dos gráficos lidos do banco junto com a medição, sem o cache de consultas
+    tarefas = carregar_tarefas(obra_ids=[obra_id], medicoes=[numero_medicao], graficos=True)
+    if not tarefas:
+        raise ErroAPI(409, f"A medição {numero_medicao} da obra {obra_id} ainda não tem valores realizados")
+    _, _, dados_obra, dados_medicao, indicadores = tarefas[0]
+    return enviar_relatorio_pdf(obra_id, numero_medicao, dados_obra, dados_medicao, user_id=user_id,
+                                indicadores=indicadores)
+
+
+def buscar_tarefa(user_id, job_id):
+    """Tarefa em segundo plano do usuário; ErroAPI 404 se não existir ou for de outro usuário"""
+    from utils import jobs
+
+    job = jobs.buscar_job(job_id)
+    if job is None or job['user_id'] != user_id:
+        raise ErroAPI(404, f"Tarefa {job_id} não encontrada")
+    return job
+
+
+def _inteiro(consulta, nome, padrao, minimo=0, maximo=None):
+    """Parâmetro inteiro da query string, dentro dos limites"""
+    valor = consulta.get(nome, [None])[-1]
+    if valor is None:
+        return padrao
+    try:
+        valor = int(valor)
+    except ValueError:
+        raise ErroAPI(400, f"O parâmetro '{nome}' deve ser um número inteiro")
+    if valor < minimo or (maximo is not None and valor > maximo):
+        raise ErroAPI(400, f"O parâmetro '{nome}' deve estar entre {minimo} e {maximo}")
+    return valor
+
+
+def _serializar(resposta):
+    """Corpo, Content-Type e cabeçalhos extras: JSON, ou (bytes, nome) de um arquivo para download"""
+    if isinstance(resposta, tuple):
+        dados, nome = resposta
+        tipo = mimetypes.guess_type(nome)[0] or 'application/octet-stream'
+        return dados, tipo, {'Content-Disposition': f'attachment; filename="{nome}"'}
+    dados = json.dumps(resposta, ensure_ascii=False, allow_nan=False, default=str).encode('utf-8')
+    return dados, 'application/json; charset=utf-8', {}
+
+
+# (método, caminho, nome do método do ManipuladorAPI)
+ROTAS = [
+    ('GET', r'/api/obras', 'obras'),
+    ('GET', r'/api/obras/(\d+)', 'obra'),
+    ('GET', r'/api/obras/(\d+)/indicadores', 'indicadores_obra'),
+    ('GET', r'/api/indicadores', 'indicadores'),
+    ('GET', r'/api/obras/(\d+)/medicoes/(\d+)', 'medicao'),
+    ('PUT', r'/api/obras/(\d+)/medicoes/(\d+)', 'gravar_medicao'),
+    ('POST', r'/api/medicoes', 'gravar_medicoes'),
+    ('POST', r'/api/obras/(\d+)/medicoes/(\d+)/relatorio', 'relatorio'),
+    ('GET', r'/api/tarefas/(\d+)', 'tarefa'),
+    ('GET', r'/api/tarefas/(\d+)/arquivo', 'arquivo_tarefa'),
+]
+_ROTAS = [(metodo, re.compile(caminho + '/?'), nome) for metodo, caminho, nome in ROTAS]
+
+
+class ManipuladorAPI(BaseHTTPRequestHandler):
+    """
+    Requisições da API JSON: autenticação Basic com os usuários do sistema, roteamento
+    e respostas com ETag (If-None-Match devolve 304 sem corpo)
+    """
+    protocol_version = 'HTTP/1.1'
+    server_version = 'ObrasAPI/1.0'
+    # Cabeçalho e corpo saem em escritas separadas; com Nagle, o corpo espera o ACK atrasado
+    # do cliente (~40 ms por resposta nas conexões keep-alive)
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._atender('GET')
+
+    def do_HEAD(self):
+        self._atender('HEAD')
+
+    def do_POST(self):
+        self._atender('POST')
+
+    def do_PUT(self):
+        self._atender('PUT')
+
+    def do_DELETE(self):
+        self._atender('DELETE')
+
+    def do_PATCH(self):
+        self._atender('PATCH')
+
+    def log_message(self, formato, *args):
+        logger.info("%s %s", self.address_string(), formato % args)
+
+    # Rotas
+
+    def obras(self):
+        consulta = self.consulta
+        contrato = consulta.get('contrato', [None])[-1]
+        return 200, listar_obras(self.user_id, _inteiro(consulta, 'apos', 0),
+                                 _inteiro(consulta, 'limite', POR_PAGINA, 1, POR_PAGINA_MAX), contrato)
+
+    def obra(self, obra_id):
+        return 200, detalhar_obra(self.user_id, obra_id)
+
+    def indicadores_obra(self, obra_id):
+        return 200, indicadores_obras([buscar_obra(self.user_id, obra_id)])[0]
+
+    def indicadores(self):
+        """Indicadores de uma página de obras do usuário (mesma paginação de /api/obras)"""
+        pagina = self.obras()[1]
+        return 200, {'obras': indicadores_obras(pagina['obras']), 'proximo': pagina['proximo']}
+
+    def medicao(self, obra_id, numero_medicao):
+        return 200, buscar_medicao(self.user_id, obra_id, numero_medicao)
+
+    def gravar_medicao(self, obra_id, numero_medicao):
+        corpo = self._corpo_json()
+        medicao = dict(corpo, obra_id=obra_id, numero_medicao=numero_medicao) if isinstance(corpo, dict) else corpo
+        return 200, gravar_medicoes(self.user_id, [medicao])
+
+    def gravar_medicoes(self):
+        corpo = self._corpo_json()
+        return 200, gravar_medicoes(self.user_id, corpo.get('medicoes') if isinstance(corpo, dict) else None)
+
+    def relatorio(self, obra_id, numero_medicao):
+        job_id = solicitar_relatorio(self.user_id, obra_id, numero_medicao)
+        return 202, {'tarefa': job_id, 'url': f'/api/tarefas/{job_id}'}
+
+    def tarefa(self, job_id):
+        from utils import jobs
+
+        job = buscar_tarefa(self.user_id, job_id)
+        resposta = {campo: job[campo] for campo in CAMPOS_TAREFA}
+        if job['status'] == jobs.CONCLUIDO and job['artefato']:
+            resposta['arquivo'] = f'/api/tarefas/{job_id}/arquivo'
+        return 200, resposta
+
+    def arquivo_tarefa(self, job_id):
+        from utils import jobs
+
+        job = buscar_tarefa(self.user_id, job_id)
+        dados = jobs.ler_artefato(job)
+        if dados is None:
+            raise ErroAPI(409, f"A tarefa {job_id} não tem arquivo disponível (situação: {job['status']})")
+        return 200, (dados, job['nome_artefato'])
+
+    # Infraestrutura
+
+    def _atender(self, metodo):
+        url = urlsplit(self.path)
+        self._corpo_lido = False
+        try:
+            rota, argumentos = self._rotear(metodo, url.path)
+            self.user_id = self._autenticar()
+            self.consulta = parse_qs(url.query)
+            status, resposta = getattr(self, rota)(*argumentos)
+            # Serializa aqui: um valor não representável em JSON (inf, NaN) vira erro 500
+            dados, tipo, extras = _serializar(resposta)
+        except ErroAPI as e:
+            # Um corpo não lido deixaria a conexão dessincronizada para a próxima requisição
+            if metodo in ('POST', 'PUT', 'PATCH', 'DELETE') and not self._corpo_lido:
+                self.close_connection = True
+            status, resposta = e.status, {'erro': e.mensagem}
+            if e.detalhes:
+                resposta['detalhes'] = e.detalhes
+            dados, tipo, extras = _serializar(resposta)
+        except Exception:
+            logger.exception("Erro ao atender %s %s", metodo, self.path)
+            self.close_connection = True
+            status = 500
+            dados, tipo, extras = _serializar({'erro': "Erro interno do servidor"})
+
+        if status == 401:
+            extras['WWW-Authenticate'] = 'Basic realm="obras", charset="UTF-8"'
+        self._responder(status, dados, tipo, extras, condicional=metodo in ('GET', 'HEAD') and status == 200,
+                        corpo=metodo != 'HEAD')
+
+    def _rotear(self, metodo, caminho):
+        permitidos = []
+        for metodo_rota, padrao, nome in _ROTAS:
+            encontrado = padrao.fullmatch(caminho)
+            if encontrado:
+                if metodo_rota == metodo or (metodo == 'HEAD' and metodo_rota == 'GET'):
+                    return nome, [int(g) for g in encontrado.groups()]
+                permitidos.append(metodo_rota)
+        if permitidos:
+            raise ErroAPI(405, f"Método {metodo} não permitido; use {', '.join(permitidos)}")
+        raise ErroAPI(404, f"Recurso não encontrado: {caminho}")
+
+    def _autenticar(self):
+        """user_id das credenciais Basic (os mesmos usuário e senha do login do sistema)"""
+        cabecalho = self.headers.get('Authorization', '')
+        if not cabecalho.startswith('Basic '):
+            raise ErroAPI(401, "Autenticação necessária")
+        try:
+            usuario, _, senha = base64.b64decode(cabecalho[6:]).decode('utf-8').partition(':')
+        except ValueError:
+            raise ErroAPI(401, "Credenciais inválidas")
+        user_id = verify_user(usuario, senha)
+        if user_id is None:
+            raise ErroAPI(401, "Credenciais inválidas")
+        return user_id
+
+    def _corpo_json(self):
+        tamanho = self.headers.get('Content-Length')
+        if tamanho is None:
+            raise ErroAPI(411, "Informe o Content-Length")
+        if not tamanho.isdigit():
+            raise ErroAPI(400, "Content-Length inválido")
+        tamanho = int(tamanho)
+        if tamanho > MAX_CORPO:
+            raise ErroAPI(413, f"Corpo maior que o limite de {MAX_CORPO // 1024 // 1024} MB")
+        dados = self.rfile.read(tamanho)
+        self._corpo_lido = True
+        try:
+            return json.loads(dados)
+        except ValueError as e:
+            raise ErroAPI(400, f"JSON inválido: {e}")
+
+    def _responder(self, status, dados, tipo, extras, condicional, corpo=True):
+        cabecalhos = dict(extras)
+        if condicional:
+            # ETag pelo conteúdo: vale entre processos e dispensa o reenvio do que o cliente já tem
+            etag = '"' + hashlib.blake2b(dados, digest_size=16).hexdigest() + '"'
+            cabecalhos.update({'ETag': etag, 'Cache-Control': 'private, no-cache'})
+            pedidas = self.headers.get('If-None-Match', '')
+            if pedidas.strip() == '*' or etag in (e.strip().removeprefix('W/') for e in pedidas.split(',')):
+                status, dados, corpo = 304, b'', False
+
+        self.send_response(status)
+        if status != 304:
+            self.send_header('Content-Type', tipo)
+            self.send_header('Content-Length', str(len(dados)))
+        for nome, valor in cabecalhos.items():
+            self.send_header(nome, valor)
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        if corpo:
+            self.wfile.write(dados)
+
+
+class ServidorAPI(ThreadingHTTPServer):
+    """Uma thread por conexão; as conexões ficam abertas entre requisições (keep-alive)"""
+    daemon_threads = True
+    request_queue_size = 64
+
+
+def criar_servidor(host=API_HOST, porta=API_PORTA):
+    return ServidorAPI((host, porta), ManipuladorAPI)
+
+
+_servidor = None
+_servidor_lock = threading.Lock()
+
+
+def iniciar_em_segundo_plano(host=API_HOST, porta=API_PORTA):
+    """
+    Atende a API em uma thread do processo atual (ex.: o do Streamlit, que passa a
+    compartilhar com a API o cache de consultas e o escritor único); retorna o servidor
+    """
+    global _servidor
+    with _servidor_lock:
+        if _servidor is None:
+            _servidor = criar_servidor(host, porta)
+            threading.Thread(target=_servidor.serve_forever, name='obras-api', daemon=True).start()
+            logger.info("API atendendo em http://%s:%s/api", host, porta)
+    return _servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API JSON das obras, medições, indicadores e relatórios")
+    parser.add_argument('--host', default=API_HOST)
+    parser.add_argument('--porta', type=int, default=API_PORTA)
+    parser.add_argument('--silencioso', action='store_true', help="Não registra cada requisição no log")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING if args.silencioso else logging.INFO,
+                        format='%(asctime)s %(levelname)s %(message)s')
+
+    from database.db_utils import DB_PATH
+    from database.migrate import apply_migrations
+
+    if not os.path.exists(DB_PATH):
+        print(f"Banco não encontrado: {DB_PATH} (inicie o sistema uma vez para criá-lo)")
+        return 2
+    # As tarefas interrompidas são recuperadas pelo Streamlit; aqui poderiam ser de outro processo
+    apply_migrations()
+
+    servidor = criar_servidor(args.host, args.porta)
+    print(f"API atendendo em http://{args.host}:{args.porta}/api (Ctrl+C encerra)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,117 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from database.db_utils import get_db_connection
-from utils.formatters import format_currency_br
+from database.db_utils import add_obra
+from database.cache import invalidar_obra
+from utils.formatters import format_currency_br, format_currency_br_series, parse_currency_br, parse_currency_br_series
 from utils.validators import validar_valor_monetario, validar_data
 
 
+def _montar_plano(descricoes, valores, versao):
+    """
+    Planejamento em edição: descrições e matriz itens x medições (NumPy)
+    O DataFrame base do editor só é recriado quando o plano muda de forma ou recebe uma colagem
+    """
+    colunas = {f'Medição {j + 1}': j for j in range(valores.shape[1])}
+    df = pd.DataFrame(valores, columns=list(colunas))
+    df.insert(0, 'Descrição', descricoes)
+    return {
+        'descricoes': list(descricoes),
+        'valores': valores,
+        'colunas': colunas,
+        'df': df,
+        'chave': f'plano_editor_{versao}',
+        'versao': versao
+    }
+
+
+def _valor_celula(valor):
+    """Valor de uma célula editada (vazia vira 0; texto colado no padrão brasileiro é convertido)"""
+    if valor is None:
+        return 0.0
+    if isinstance(valor, str):
+        return parse_currency_br(valor)
+    valor = float(valor)
+    return 0.0 if np.isnan(valor) else valor
+
+
+def _aplicar_edicoes(plano):
+    """
+    Aplica ao plano somente as células alteradas no editor (edited_rows, relativo ao DataFrame base)
+    O custo depende da quantidade de células editadas, não do tamanho do plano
+    """
+    edicoes = st.session_state.get(plano['chave'], {}).get('edited_rows', {})
+    if not edicoes:
+        return plano['descricoes'], plano['valores']
+
+    descricoes = list(plano['descricoes'])
+    valores = plano['valores'].copy()
+    for linha, celulas in edicoes.items():
+        for coluna, valor in celulas.items():
+            if coluna == 'Descrição':
+                descricoes[int(linha)] = (valor or '').strip()
+            elif coluna in plano['colunas']:
+                valores[int(linha), plano['colunas'][coluna]] = _valor_celula(valor)
+    return descricoes, valores
+
+
+def _substituir_plano(plano, descricoes, valores):
+    """Troca o plano da sessão por uma nova versão (novo editor, sem as edições da versão anterior)"""
+    st.session_state.pop(plano['chave'], None)
+    st.session_state.plano = _montar_plano(descricoes, valores, plano['versao'] + 1)
+    return st.session_state.plano
+
+
+def _plano_atual(num_itens, num_medicoes):
+    """Plano da sessão; ao mudar a quantidade de itens/medições preserva os valores já digitados"""
+    plano = st.session_state.get('plano')
+    if plano is None:
+        plano = _montar_plano([''] * num_itens, np.zeros((num_itens, num_medicoes)), 0)
+        st.session_state.plano = plano
+    elif plano['valores'].shape != (num_itens, num_medicoes):
+        descricoes, valores = _aplicar_edicoes(plano)
+        novos = np.zeros((num_itens, num_medicoes))
+        linhas, colunas = min(num_itens, valores.shape[0]), min(num_medicoes, valores.shape[1])
+        novos[:linhas, :colunas] = valores[:linhas, :colunas]
+        descricoes = (descricoes + [''] * num_itens)[:num_itens]
+        plano = _substituir_plano(plano, descricoes, novos)
+    return plano
+
+
+def _colar_planilha(plano, texto, item_inicial):
+    """
+    Cola um bloco copiado do Excel (colunas separadas por tabulação, números no padrão brasileiro)
+    a partir do item informado; se a primeira coluna não for numérica, ela traz as descrições
+    Retorna a quantidade de células ignoradas por exceder o plano
+    """
+    linhas_coladas = [linha.split('\t') for linha in texto.splitlines() if linha.strip()]
+    largura = max(len(linha) for linha in linhas_coladas)
+    bloco = pd.DataFrame([linha + [''] * (largura - len(linha)) for linha in linhas_coladas])
+    bloco_descricoes = None
+    primeira = bloco.iloc[:, 0].str.strip()
+    numerica = primeira.str.replace('R$', '', regex=False).str.strip().str.replace('.', '', regex=False)
+    if not numerica.str.fullmatch(r'-?\d*(,\d*)?').all():
+        bloco_descricoes = primeira.tolist()
+        bloco = bloco.iloc[:, 1:]
+
+    descricoes, valores = _aplicar_edicoes(plano)
+    valores = valores.copy()
+    inicio = item_inicial - 1
+    linhas = min(len(bloco), valores.shape[0] - inicio)
+    colunas = min(bloco.shape[1], valores.shape[1])
+    aplicadas = 0
+    if linhas > 0 and colunas > 0:
+        recorte = bloco.iloc[:linhas, :colunas].to_numpy().ravel()
+        valores[inicio:inicio + linhas, :colunas] = parse_currency_br_series(recorte).reshape(linhas, colunas)
+        aplicadas = int((recorte != '').sum())
+        if bloco_descricoes is not None:
+            descricoes[inicio:inicio + linhas] = bloco_descricoes[:linhas]
+
+    _substituir_plano(plano, descricoes, valores)
+    return int((bloco.to_numpy() != '').sum()) - aplicadas
+
+
 def cadastrar_obra():
     st.header("Cadastro de Nova Obra")
     st.write("""
@@ -47,124 +153,55 @@ def cadastrar_obra():
 
     # 3. CADASTRO DE ITENS E VALORES
     st.subheader("3. Itens e Valores Previstos")
-
-    # Inicializar DataFrame
-    if 'df_valores' not in st.session_state:
-        st.session_state.df_valores = pd.DataFrame(
-            data={
-                'Descrição': ['Insira o nome do item'] * num_itens,
-                **{f'Medição {i + 1}': [0.0] * num_itens for i in range(num_medicoes)},
-                'Total': [0.0] * num_itens
-            },
-            index=range(num_itens)
-        )
-
-    # Verificar mudanças no número de itens/medições
-    current_rows = len(st.session_state.df_valores.index)
-    current_cols = len(st.session_state.df_valores.columns)
-    expected_cols = num_medicoes + 2
-
-    if current_rows != num_itens or current_cols != expected_cols:
-        st.session_state.df_valores = pd.DataFrame(
-            data={
-                'Descrição': ['Insira o nome do item'] * num_itens,
-                **{f'Medição {i + 1}': [0.0] * num_itens for i in range(num_medicoes)},
-                'Total': [0.0] * num_itens
-            },
-            index=range(num_itens)
+    plano = _plano_atual(num_itens, num_medicoes)
+
+    # Colagem de um bloco do Excel no padrão brasileiro (1.234,56), antes de desenhar o editor
+    with st.expander("Colar do Excel"):
+        texto_colado = st.text_area(
+            "Células copiadas da planilha",
+            key="plano_colagem",
+            help="Uma linha por item e uma coluna por medição; a primeira coluna pode trazer a descrição"
         )
-
-    # Interface de seleção de item
-    col1, col2 = st.columns([3, 1])
-    with col1:
-        if 'item_atual' not in st.session_state:
-            st.session_state.item_atual = 1
-
-        item_selecionado = st.selectbox(
-            "Selecione o Item para Editar",
-            options=range(1, num_itens + 1),
-            format_func=lambda x: f"Item {x}: {st.session_state.df_valores.at[x - 1, 'Descrição']}",
-            key="item_selector",
-            index=st.session_state.item_atual - 1
-        )
-        if item_selecionado != st.session_state.item_atual:
-            st.session_state.item_atual = item_selecionado
-
-    with col2:
-        if st.button("Limpar Item Atual", key="btn_limpar_item"):
-            i = item_selecionado - 1
-            st.session_state.df_valores.iloc[i, 1:-1] = 0.0
-            st.session_state.df_valores.at[i, 'Descrição'] = 'Insira o nome do item'
-            st.rerun()
-
-    # Ajustar índice e mostrar status
-    i = item_selecionado - 1
-    desc_atual = st.session_state.df_valores.at[i, 'Descrição']
-    tem_valores = st.session_state.df_valores.iloc[i, 1:-1].sum() > 0
-    status_item = "✅ Item Salvo" if desc_atual != 'Insira o nome do item' and tem_valores else "📝 Item não salvo"
-    st.info(f"Status: {status_item}")
-
-
-    # Input da descrição
-    desc = st.text_input(
-        "Descrição do Item",
-        value=st.session_state.df_valores.at[i, 'Descrição'],
-        key=f"desc_{i}",
-        help="Descreva o item/serviço a ser medido"
+        item_inicial = st.number_input("Colar a partir do item", min_value=1, max_value=num_itens, value=1,
+                                       key="plano_colagem_item")
+        if st.button("Aplicar colagem", key="btn_colar_plano"):
+            if not texto_colado.strip():
+                st.error("❌ Cole as células copiadas da planilha")
+            else:
+                ignoradas = _colar_planilha(plano, texto_colado, item_inicial)
+                plano = st.session_state.plano
+                if ignoradas:
+                    st.warning(f"⚠️ {ignoradas} célula(s) fora do plano foram ignoradas")
+                else:
+                    st.success("✅ Valores colados no plano")
+
+    # Um único editor para a matriz inteira; o DataFrame base só muda junto com a chave do editor
+    st.write("Digite as descrições e os valores previstos de cada medição "
+             "(também é possível colar células copiadas do Excel direto na grade):")
+    st.data_editor(
+        plano['df'],
+        key=plano['chave'],
+        column_config={
+            'Descrição': st.column_config.TextColumn("Descrição", help="Descreva o item/serviço a ser medido"),
+            **{
+                coluna: st.column_config.NumberColumn(coluna, min_value=0.0, step=0.01, format="%.2f")
+                for coluna in plano['colunas']
+            }
+        },
+        use_container_width=True
+    )
+    descricoes, valores = _aplicar_edicoes(plano)
+
+    # Totais calculados de forma vetorizada sobre a matriz
+    totais_itens = valores.sum(axis=1)
+    valor_total_calculado = float(totais_itens.sum())
+    st.dataframe(
+        pd.DataFrame({
+            'Descrição': descricoes,
+            'Total': format_currency_br_series(totais_itens)
+        }, index=range(1, num_itens + 1)),
+        use_container_width=True
     )
-    st.session_state.df_valores.at[i, 'Descrição'] = desc
-
-    # Interface de valores
-    st.write(f"### Valores Previstos para: {desc}")
-    st.write("Digite os valores previstos para cada medição:")
-
-    # Organizar medições em 3 colunas
-    cols_per_row = 3
-    for j in range(0, num_medicoes, cols_per_row):
-        cols = st.columns(cols_per_row)
-        for k, col in enumerate(cols):
-            medicao_num = j + k + 1
-            if medicao_num <= num_medicoes:
-                with col:
-                    valor_anterior = st.session_state.df_valores.iloc[i, medicao_num]
-                    valor_str = st.text_input(
-                        f"Medição {medicao_num} (R$)",
-                        value=format_currency_br(valor_anterior).replace('R$ ', ''),
-                        key=f"med_{i}_{medicao_num}",
-                        help=f"Valor previsto para a medição {medicao_num}"
-                    )
-                    try:
-                        valor = float(valor_str.replace('.', '').replace(',', '.'))
-                    except ValueError:
-                        valor = 0.0
-                    st.session_state.df_valores.iloc[i, medicao_num] = valor
-
-    # Atualizar total no DataFrame silenciosamente
-    valores_medicoes = [st.session_state.df_valores.iloc[i, j] for j in range(1, num_medicoes + 1)]
-    total_item = sum(valores_medicoes)
-    st.session_state.df_valores.iloc[i, -1] = total_item
-
-
-    # Botão salvar item
-    if st.button("Salvar Item", key=f"btn_salvar_item_{i}"):
-        if not desc or desc == 'Insira o nome do item':
-            st.error("❌ Insira uma descrição para o item")
-            return
-        if total_item <= 0:
-            st.error("❌ O item deve ter valor maior que zero")
-            return
-        st.session_state.df_valores.at[i, 'Descrição'] = desc
-        st.success(f"✅ Item '{desc}' salvo com sucesso!")
-
-    # Mostrar tabela resumo
-    df_display = st.session_state.df_valores.copy()
-    for col in df_display.columns:
-        if col != 'Descrição':
-            df_display[col] = df_display[col].apply(format_currency_br)
-    st.dataframe(df_display)
-
-    # Calcular e mostrar total geral
-    valor_total_calculado = st.session_state.df_valores['Total'].sum()
     st.write(f"### Valor Total Calculado: {format_currency_br(valor_total_calculado)}")
 
     # Botão salvar obra
@@ -179,6 +216,14 @@ def cadastrar_obra():
         if valor_total <= 0:
             st.error("❌ O valor total deve ser maior que zero")
             return
+        sem_descricao = [str(i + 1) for i, desc in enumerate(descricoes) if not desc]
+        if sem_descricao:
+            st.error(f"❌ Insira uma descrição para o(s) item(ns): {', '.join(sem_descricao)}")
+            return
+        sem_valor = np.flatnonzero(totais_itens <= 0) + 1
+        if sem_valor.size:
+            st.error(f"❌ O(s) item(ns) {', '.join(map(str, sem_valor))} deve(m) ter valor maior que zero")
+            return
         if abs(valor_total_calculado - valor_total) > 0.01 and valor_total > 0:
             st.warning(
                 f"⚠️ Atenção: O valor total calculado ({format_currency_br(valor_total_calculado)}) "
@@ -189,55 +234,31 @@ def cadastrar_obra():
 
 
         # Salvar no banco
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        dados_obra = {
+            'nome': nome,
+            'contrato': contrato,
+            'ordem_servico': ordem_servico,
+            'contratante': contratante,
+            'contratada': contratada,
+            'valor_total': valor_total,
+            'data_inicio': data_inicio,
+            'data_fim': data_fim,
+            'duracao_prevista': duracao_prevista,
+            'num_medicoes': num_medicoes
+        }
 
         try:
-            # Inserir obra
-            cursor.execute('''
-            INSERT INTO obras (
-                user_id, nome, contrato, ordem_servico, contratante, contratada,
-                valor_total, data_inicio, data_fim, duracao_prevista, num_medicoes
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                st.session_state.user_id, nome, contrato, ordem_servico,
-                contratante, contratada, valor_total, data_inicio, data_fim,
-                duracao_prevista, num_medicoes
-            ))
-
-            obra_id = cursor.lastrowid
-
-            # Inserir itens e medições
-            for i in range(num_itens):
-                desc = st.session_state.df_valores.iloc[i]['Descrição']
-                if pd.isna(desc):
-                    continue
-
-                valor_total_item = st.session_state.df_valores.iloc[i, -1]
-                cursor.execute('''
-                INSERT INTO itens_obra (obra_id, descricao, valor_previsto)
-                VALUES (?, ?, ?)
-                ''', (obra_id, desc, valor_total_item))
-
-                item_id = cursor.lastrowid
-
-                for j in range(num_medicoes):
-                    valor_previsto = st.session_state.df_valores.iloc[i, j + 1]
-                    percentual = (valor_previsto / valor_total * 100) if valor_total > 0 else 0
-                    cursor.execute('''
-                    INSERT INTO medicoes (
-                        obra_id, item_id, numero_medicao, valor_previsto, 
-                        percentual_previsto, valor_realizado, percentual_realizado
-                    ) VALUES (?, ?, ?, ?, ?, NULL, NULL)
-                    ''', (obra_id, item_id, j + 1, valor_previsto, percentual))
-
-            conn.commit()
+            obra_id = add_obra(
+                st.session_state.user_id,
+                dados_obra,
+                descricoes,
+                valores
+            )
+            invalidar_obra(obra_id, st.session_state.user_id)
             st.success("✅ Obra cadastrada com sucesso!")
-            # Primeiro fazer o rerun, depois limpar o DataFrame
+            # Novo plano em branco para o próximo cadastro
+            _substituir_plano(plano, [''] * num_itens, np.zeros((num_itens, num_medicoes)))
             st.rerun()
 
         except Exception as e:
             st.error(f"❌ Erro ao cadastrar obra: {str(e)}")
-            conn.rollback()
-        finally:
-            conn.close()
@@ -0,0 +1,41 @@
+import mimetypes
+
+import streamlit as st
+
+from utils import jobs
+
+
+def _preparar(chave, valor):
+    st.session_state[f"{chave}_preparado"] = valor
+
+
+def botao_download_tarefa(job, rotulo, chave, mime=None):
+    """
+    Botão de download do artefato de uma tarefa concluída, compartilhado pelas páginas
+    Artefatos pequenos vêm da memória; os grandes (ex.: .zip do lote) só são lidos depois
+    que o usuário pede o download, e não a cada execução da página
+    Retorna False se a tarefa não tiver arquivo disponível
+    """
+    tamanho = jobs.tamanho_artefato(job)
+    if tamanho is None:
+        return False
+
+    if tamanho > jobs.DOWNLOAD_DIRETO_MAX and not st.session_state.get(f"{chave}_preparado"):
+        st.button(f"{rotulo} ({tamanho / 1024 / 1024:.1f} MB): preparar download", key=f"{chave}_preparar",
+                  on_click=_preparar, args=(chave, True))
+        return True
+
+    dados = jobs.ler_artefato_em_cache(job)
+    if dados is None:
+        return False
+    st.download_button(
+        rotulo,
+        dados,
+        file_name=job['nome_artefato'],
+        mime=mime or mimetypes.guess_type(job['nome_artefato'])[0] or 'application/octet-stream',
+        key=chave,
+        # Depois do download, o arquivo grande volta a ser lido só sob demanda
+        on_click=_preparar,
+        args=(chave, False)
+    )
+    return True
@@ -1,7 +1,11 @@
 import streamlit as st
 import pandas as pd
-from database.db_utils import get_db_connection
-from utils.formatters import format_currency_br
+from database.db_utils import get_db_connection, update_obra
+from database.cache import invalidar_obra
+from database.consultas import buscar_obra
+from modules.seletor_obras import selecionar_obra
+from utils.formatters import format_number_br, parse_currency_br
+from utils.validators import validar_valor_monetario
 
 
 def editar_obra():
@@ -14,38 +18,18 @@ def editar_obra():
     4. Salvar as alterações
     """)
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Buscar obras do usuário logado
-    cursor.execute('''
-    SELECT id, nome, contrato 
-    FROM obras 
-    WHERE user_id = ?
-    ORDER BY nome
-    ''', (st.session_state.user_id,))
-
-    obras = cursor.fetchall()
-
-    if not obras:
-        st.warning("Nenhuma obra cadastrada")
-        conn.close()
+    # Seleção da obra (busca paginada nas obras do usuário logado)
+    obra_id = selecionar_obra(st.session_state.user_id)
+    if obra_id is None:
         return
 
-    # Seleção da obra
-    obras_dict = {obra[0]: f"{obra[1]} (Contrato: {obra[2]})" for obra in obras}
-    obra_selecionada = st.selectbox("Selecione a Obra", list(obras_dict.values()))
-    obra_id = [k for k, v in obras_dict.items() if v == obra_selecionada][0]
-
     # Buscar dados da obra
-    cursor.execute('''
-    SELECT nome, contrato, ordem_servico, contratante, contratada, 
-           valor_total, num_medicoes, data_inicio, data_fim
-    FROM obras 
-    WHERE id = ?
-    ''', (obra_id,))
+    dados = buscar_obra(obra_id)
+    obra = [dados[campo] for campo in ['nome', 'contrato', 'ordem_servico', 'contratante', 'contratada',
+                                       'valor_total', 'num_medicoes', 'data_inicio', 'data_fim']]
 
-    obra = cursor.fetchone()
+    conn = get_db_connection()
+    cursor = conn.cursor()
 
     with st.form("editar_obra_form"):
         st.subheader("Dados da Obra")
@@ -55,7 +39,7 @@ def editar_obra():
         ordem_servico = st.text_input("Ordem de Serviço", value=obra[2])
         contratante = st.text_input("Contratante", value=obra[3])
         contratada = st.text_input("Contratada", value=obra[4])
-        valor_total = st.text_input("Valor Total", value=format_currency_br(obra[5]).replace('R$ ', ''))
+        valor_total = st.text_input("Valor Total", value=format_number_br(obra[5]))
         num_medicoes = st.number_input("Número de Medições", min_value=1, value=obra[6])
         data_inicio = st.date_input("Data de Início", value=obra[7])
         data_fim = st.date_input("Data de Término", value=obra[8])
@@ -71,39 +55,42 @@ def editar_obra():
             item_id, descricao, valor_previsto = item
             valor_str = st.text_input(
                 f"Valor do item: {descricao}",
-                value=format_currency_br(valor_previsto).replace('R$ ', ''),
+                value=format_number_br(valor_previsto),
                 key=f"item_{item_id}"
             )
-            try:
-                valores_itens[item_id] = float(valor_str.replace('.', '').replace(',', '.'))
-            except ValueError:
-                valores_itens[item_id] = 0.0
+            valores_itens[item_id] = parse_currency_br(valor_str)
 
         if st.form_submit_button("Salvar Alterações"):
+            # Valor total obrigatório: texto inválido não pode ser gravado como R$ 0,00
             try:
-                valor_total = float(valor_total.replace('.', '').replace(',', '.'))
-
-                cursor.execute('''
-                UPDATE obras 
-                SET nome = ?, contrato = ?, ordem_servico = ?, contratante = ?,
-                    contratada = ?, valor_total = ?, num_medicoes = ?,
-                    data_inicio = ?, data_fim = ?
-                WHERE id = ?
-                ''', (nome, contrato, ordem_servico, contratante, contratada,
-                      valor_total, num_medicoes, data_inicio, data_fim, obra_id))
-
-                for item_id, valor in valores_itens.items():
-                    cursor.execute('''
-                    UPDATE itens_obra 
-                    SET valor_previsto = ?
-                    WHERE id = ?
-                    ''', (valor, item_id))
+                valor_total = float(valor_total.replace('R$', '').strip().replace('.', '').replace(',', '.'))
+            except ValueError:
+                st.error(f"❌ Valor total inválido: {valor_total}")
+                conn.close()
+                return
+            valido, mensagem = validar_valor_monetario(valor_total)
+            if not valido:
+                st.error(f"❌ {mensagem}")
+                conn.close()
+                return
 
-                conn.commit()
+            try:
+                # Gravação pelo escritor único do banco, em uma única transação
+                update_obra(obra_id, {
+                    'nome': nome,
+                    'contrato': contrato,
+                    'ordem_servico': ordem_servico,
+                    'contratante': contratante,
+                    'contratada': contratada,
+                    'valor_total': valor_total,
+                    'num_medicoes': num_medicoes,
+                    'data_inicio': data_inicio,
+                    'data_fim': data_fim,
+                }, valores_itens)
+                invalidar_obra(obra_id, st.session_state.user_id)
                 st.success("✅ Obra atualizada com sucesso!")
                 st.rerun()
             except Exception as e:
                 st.error(f"Erro ao atualizar obra: {str(e)}")
-                conn.rollback()
 
     conn.close()
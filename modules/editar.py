@@ -1,8 +1,10 @@
 # modules/editar.py
 import streamlit as st
 import pandas as pd
-from database.db_utils import get_db_connection
-from utils.formatters import format_currency_br
+from database.db_utils import get_db_connection, update_previstos
+from database.cache import invalidar_obra
+from utils.formatters import format_currency_br, format_number_br, parse_currency_br
+from modules.seletor_obras import selecionar_obra
 
 
 def editar_previsoes():
@@ -14,25 +16,13 @@ def editar_previsoes():
     3. Salve as alterações
     """)
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Seleção da obra
-    cursor.execute('SELECT id, nome FROM obras')
-    obras = cursor.fetchall()
-
-    if not obras:
-        st.warning("Nenhuma obra cadastrada")
-        conn.close()
+    # Seleção da obra, somente entre as obras do usuário logado
+    obra_id = selecionar_obra(st.session_state.user_id)
+    if obra_id is None:
         return
 
-    obras_dict = {obra[0]: obra[1] for obra in obras}
-    obra_selecionada = st.selectbox(
-        "Selecione a Obra",
-        list(obras_dict.values()),
-        help="Escolha a obra que deseja editar"
-    )
-    obra_id = [k for k, v in obras_dict.items() if v == obra_selecionada][0]
+    conn = get_db_connection()
+    cursor = conn.cursor()
 
     # Buscar dados da obra
     cursor.execute('''
@@ -85,13 +75,10 @@ def editar_previsoes():
                     valor_atual = item_data['Medições'].get(i + 1, 0)
                     valor_str = st.text_input(
                         f"Medição {i + 1}",
-                        value=format_currency_br(valor_atual).replace('R$ ', ''),
+                        value=format_number_br(valor_atual),
                         key=f"edit_{item_id}_{i}"
                     )
-                    try:
-                        valor = float(valor_str.replace('.', '').replace(',', '.'))
-                    except ValueError:
-                        valor = 0.0
+                    valor = parse_currency_br(valor_str)
                     valores_novos.append(valor)
 
             novo_total = sum(valores_novos)
@@ -100,23 +87,9 @@ def editar_previsoes():
             # Botão para salvar alterações deste item
             if st.button(f"Salvar Alterações - {item_data['Descrição']}", key=f"save_{item_id}"):
                 try:
-                    # Atualizar valor total do item
-                    cursor.execute('''
-                    UPDATE itens_obra 
-                    SET valor_previsto = ?
-                    WHERE id = ?
-                    ''', (novo_total, item_id))
-
-                    # Atualizar valores previstos das medições
-                    for i, valor in enumerate(valores_novos, 1):
-                        cursor.execute('''
-                        UPDATE medicoes 
-                        SET valor_previsto = ?,
-                            percentual_previsto = ?
-                        WHERE item_id = ? AND numero_medicao = ?
-                        ''', (valor, (valor / novo_total * 100), item_id, i))
-
-                    conn.commit()
+                    # Atualizar valor total do item e valores previstos das medições
+                    update_previstos(obra_id, [item_id], [valores_novos])
+                    invalidar_obra(obra_id, st.session_state.user_id)
                     st.success(f"Alterações salvas com sucesso para {item_data['Descrição']}")
 
                 except Exception as e:
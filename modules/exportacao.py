@@ -0,0 +1,324 @@
+import argparse
+import csv
+import importlib.util
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from database.db_utils import get_db_connection
+
+# Linhas lidas do banco (cursor.fetchmany) e gravadas por vez
+TAMANHO_BLOCO = 5000
+
+FORMATOS = ('csv', 'xlsx', 'parquet')
+
+# Colunas exportadas, uma linha por (obra, medição, item), com o tipo de cada uma
+COLUNAS = [
+    ('obra_id', 'int'),
+    ('obra', 'str'),
+    ('contrato', 'str'),
+    ('numero_medicao', 'int'),
+    ('data_medicao', 'str'),
+    ('item_id', 'int'),
+    ('item', 'str'),
+    ('valor_item', 'float'),
+    ('valor_previsto', 'float'),
+    ('valor_realizado', 'float'),
+    ('percentual_previsto', 'float'),
+    ('percentual_realizado', 'float'),
+]
+
+# Indicadores da medição (calculados como em utils.indicadores), repetidos em cada item;
+# valor_glosa é a parcela da glosa da medição que cabe ao item
+COLUNAS_INDICADORES = [
+    ('idp', 'float'),
+    ('fator_imr', 'float'),
+    ('glosa', 'float'),
+    ('valor_glosa', 'float'),
+]
+
+
+def formatos_disponiveis():
+    """Formatos que podem ser gerados nesta instalação (Parquet só com o pyarrow instalado)"""
+    return [f for f in FORMATOS if f != 'parquet' or importlib.util.find_spec('pyarrow') is not None]
+
+
+def _filtros(user_id=None, obra_ids=None):
+    """Cláusula WHERE e parâmetros do escopo: uma obra, um usuário ou o banco inteiro"""
+    filtros, params = [], []
+    if user_id is not None:
+        # Subconsulta em vez de o.user_id = ?: mantém a leitura pelo índice de medicoes,
+        # já na ordem de exportação, sem ordenar o resultado inteiro antes do primeiro bloco
+        filtros.append('m.obra_id IN (SELECT id FROM obras WHERE user_id = ?)')
+        params.append(user_id)
+    if obra_ids is not None:
+        obra_ids = [int(o) for o in obra_ids]
+        filtros.append(f"m.obra_id IN ({', '.join('?' * len(obra_ids)) or 'NULL'})")
+        params.extend(obra_ids)
+    return (f"WHERE {' AND '.join(filtros)}" if filtros else ''), params
+
+
+def consulta_exportacao(user_id=None, obra_ids=None, indicadores=False):
+    """SQL e parâmetros da junção medicoes / itens_obra / obras, na ordem do índice de medicoes"""
+    where, params = _filtros(user_id, obra_ids)
+    extras, juncoes = '', ''
+    if indicadores:
+        # Totais da medição (tabela medicoes_resumo) para o IDP e o fator IMR para a glosa
+        extras = ''',
+            r.total_previsto,
+            CASE WHEN r.itens_realizados > 0 THEN r.total_realizado END,
+            f.fator_ponderacao'''
+        juncoes = '''
+        LEFT JOIN medicoes_resumo r ON r.obra_id = m.obra_id AND r.numero_medicao = m.numero_medicao
+        LEFT JOIN imr_fatores f ON f.obra_id = m.obra_id AND f.numero_medicao = m.numero_medicao'''
+    sql = f'''
+        SELECT
+            m.obra_id,
+            o.nome,
+            o.contrato,
+            m.numero_medicao,
+            m.data_medicao,
+            m.item_id,
+            i.descricao,
+            i.valor_previsto,
+            m.valor_previsto,
+            m.valor_realizado,
+            m.percentual_previsto,
+            m.percentual_realizado{extras}
+        FROM medicoes m
+        JOIN obras o ON o.id = m.obra_id
+        JOIN itens_obra i ON i.id = m.item_id{juncoes}
+        {where}
+        ORDER BY m.obra_id, m.numero_medicao, m.item_id
+        '''
+    return sql, params
+
+
+def contar_linhas(user_id=None, obra_ids=None):
+    """Quantidade de linhas da exportação, pelos totais de medicoes_resumo (sem percorrer medicoes)"""
+    where, params = _filtros(user_id, obra_ids)
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+        SELECT TOTAL(m.itens_total)
+        FROM medicoes_resumo m
+        {where}
+        ''', params)
+        return int(cursor.fetchone()[0])
+    finally:
+        conn.close()
+
+
+def _bloco_dataframe(linhas, indicadores):
+    """Converte um bloco de linhas do cursor em DataFrame tipado, calculando os indicadores"""
+    from utils.calculadora import aplicar_faixas_glosa
+    from utils.indicadores import idp_medicoes
+
+    nomes = [nome for nome, _ in COLUNAS]
+    if indicadores:
+        nomes += ['total_previsto', 'total_realizado', 'fator_imr']
+    df = pd.DataFrame.from_records(linhas, columns=nomes)
+    for nome, tipo in COLUNAS:
+        if tipo == 'float':
+            df[nome] = df[nome].astype(float)
+        elif tipo == 'int':
+            df[nome] = df[nome].astype('int64')
+        else:
+            df[nome] = df[nome].map(lambda v: None if v is None else str(v))
+
+    if indicadores:
+        df['fator_imr'] = df['fator_imr'].astype(float)
+        fator = df['fator_imr'].to_numpy()
+        df['idp'] = idp_medicoes(df['total_previsto'].to_numpy(dtype=float),
+                                 df['total_realizado'].to_numpy(dtype=float))
+        df['glosa'] = aplicar_faixas_glosa(df['idp'].to_numpy(), np.where(np.isnan(fator), 1.0, fator))
+        df['valor_glosa'] = np.nan_to_num(df['valor_realizado'].to_numpy()) * df['glosa'].to_numpy()
+        df = df.drop(columns=['total_previsto', 'total_realizado'])
+    return df[[nome for nome, _ in colunas_exportacao(indicadores)]]
+
+
+def colunas_exportacao(indicadores=False):
+    """Lista (nome, tipo) das colunas exportadas"""
+    return COLUNAS + (COLUNAS_INDICADORES if indicadores else [])
+
+
+class EscritorCSV:
+    """CSV em UTF-8, gravado bloco a bloco"""
+
+    def __init__(self, destino, colunas):
+        self.arquivo = open(destino, 'w', newline='', encoding='utf-8')
+        csv.writer(self.arquivo).writerow([nome for nome, _ in colunas])
+
+    def escrever(self, df):
+        df.to_csv(self.arquivo, header=False, index=False)
+
+    def fechar(self):
+        self.arquivo.close()
+
+
+class EscritorXLSX:
+    """Planilha .xlsx no modo write-only do openpyxl: as linhas vão direto para o arquivo"""
+
+    def __init__(self, destino, colunas):
+        from openpyxl import Workbook
+
+        self.destino = destino
+        self.livro = Workbook(write_only=True)
+        self.aba = self.livro.create_sheet('Medições')
+        self.aba.append([nome for nome, _ in colunas])
+
+    def escrever(self, df):
+        # Vazios (NaN) viram células em branco
+        for linha in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+            self.aba.append(linha)
+
+    def fechar(self):
+        self.livro.save(self.destino)
+
+
+class EscritorParquet:
+    """Arquivo Parquet (requer pyarrow), um row group por bloco"""
+
+    TIPOS = {'int': 'int64', 'float': 'float64', 'str': 'string'}
+
+    def __init__(self, destino, colunas):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Exportação em Parquet requer o pacote pyarrow (pip install pyarrow)")
+
+        self._pa = pa
+        self.schema = pa.schema([(nome, getattr(pa, self.TIPOS[tipo])()) for nome, tipo in colunas])
+        self.escritor = pq.ParquetWriter(destino, self.schema)
+
+    def escrever(self, df):
+        self.escritor.write_table(self._pa.Table.from_pandas(df, schema=self.schema, preserve_index=False))
+
+    def fechar(self):
+        self.escritor.close()
+
+
+ESCRITORES = {'csv': EscritorCSV, 'xlsx': EscritorXLSX, 'parquet': EscritorParquet}
+
+
+def formato_destino(destino):
+    """Formato pela extensão do arquivo (.csv, .xlsx ou .parquet)"""
+    formato = os.path.splitext(destino)[1].lower().lstrip('.')
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato não suportado: '{formato}' (use {', '.join(FORMATOS)})")
+    return formato
+
+
+def exportar(destino, formato=None, user_id=None, obra_ids=None, indicadores=False,
+             tamanho_bloco=TAMANHO_BLOCO, progresso=None):
+    """
+    Exporta as medições do escopo (obras informadas, obras do usuário ou o banco inteiro)
+    lendo o cursor em blocos de `tamanho_bloco` linhas; a memória não cresce com o banco
+    progresso(linhas, total) é chamado a cada bloco gravado
+    Retorna estatísticas (destino, formato, linhas, segundos, linhas_por_segundo, megabytes)
+    """
+    formato = formato or formato_destino(destino)
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato não suportado: '{formato}' (use {', '.join(FORMATOS)})")
+
+    inicio = time.perf_counter()
+    total = contar_linhas(user_id, obra_ids) if progresso else None
+    sql, params = consulta_exportacao(user_id, obra_ids, indicadores)
+    diretorio = os.path.dirname(os.path.abspath(destino))
+    os.makedirs(diretorio, exist_ok=True)
+
+    escritor = ESCRITORES[formato](destino, colunas_exportacao(indicadores))
+    linhas = 0
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        while True:
+            bloco = cursor.fetchmany(tamanho_bloco)
+            if not bloco:
+                break
+            escritor.escrever(_bloco_dataframe(bloco, indicadores))
+            linhas += len(bloco)
+            if progresso:
+                progresso(linhas, total)
+    finally:
+        conn.close()
+        escritor.fechar()
+
+    segundos = time.perf_counter() - inicio
+    return {
+        'destino': os.path.abspath(destino),
+        'formato': formato,
+        'linhas': linhas,
+        'segundos': segundos,
+        'linhas_por_segundo': linhas / segundos if segundos else 0.0,
+        'megabytes': os.path.getsize(destino) / 1024 / 1024,
+    }
+
+
+def _job_exportacao(job, nome, formato, user_id, obra_ids, indicadores):
+    """Tarefa em segundo plano: grava o arquivo em jobs.JOBS_DIR e o registra como artefato"""
+    from utils import jobs
+
+    destino = os.path.join(jobs.JOBS_DIR, f'job_{job.job_id}_{nome}')
+
+    def progresso(linhas, total):
+        job.progresso(linhas / total if total else 0.0, f"{linhas}/{total} linhas exportadas")
+
+    stats = exportar(destino, formato, user_id, obra_ids, indicadores, progresso=progresso)
+    job.registrar_artefato(destino, nome)
+    return stats
+
+
+def enviar_exportacao(formato, user_id=None, obra_ids=None, indicadores=False, solicitante=None,
+                      descricao="Exportação de medições"):
+    """Envia a exportação para a fila de tarefas em segundo plano; retorna o id da tarefa"""
+    from utils import jobs
+
+    nome = f"medicoes_{time.strftime('%Y%m%d_%H%M%S')}.{formato}"
+    return jobs.enviar(
+        'exportacao', descricao, _job_exportacao, nome, formato, user_id, obra_ids, indicadores,
+        user_id=solicitante if solicitante is not None else user_id
+    )
+
+
+def main():
+    from modules.importar_lote import resolver_usuario
+
+    parser = argparse.ArgumentParser(description="Exporta as medições para CSV, XLSX ou Parquet")
+    parser.add_argument('destino', help="Arquivo de saída; o formato vem da extensão (.csv, .xlsx, .parquet)")
+    parser.add_argument('--usuario', help="Somente as obras deste usuário (id ou nome)")
+    parser.add_argument('--obras', type=int, nargs='*', help="Somente estas obras")
+    parser.add_argument('--indicadores', action='store_true', help="Inclui as colunas de IDP e glosa")
+    parser.add_argument('--bloco', type=int, default=TAMANHO_BLOCO, help="Linhas lidas e gravadas por vez")
+    args = parser.parse_args()
+
+    try:
+        formato = formato_destino(args.destino)
+    except ValueError as e:
+        print(e)
+        return 2
+
+    user_id = None
+    if args.usuario is not None:
+        user_id = resolver_usuario(args.usuario)
+        if user_id is None:
+            print(f"Usuário não encontrado: {args.usuario}")
+            return 2
+
+    def progresso(linhas, total):
+        print(f"\r{linhas}/{total} ({linhas / total if total else 1:.0%})", end='', flush=True)
+
+    stats = exportar(args.destino, formato, user_id, args.obras, args.indicadores, args.bloco, progresso)
+    print(f"\n{stats['linhas']} linha(s) exportada(s) em {stats['segundos']:.2f} s "
+          f"({stats['linhas_por_segundo']:.0f} linhas/s, {stats['megabytes']:.1f} MB) -> {stats['destino']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
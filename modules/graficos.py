@@ -0,0 +1,159 @@
+import numpy as np
+import plotly.graph_objects as go
+from database.cache import query_cache, versao_obra
+
+# Gráficos da obra montados a partir de calcular_indicadores; usados pela página
+# de Relatórios e reaproveitáveis na exportação (PDF, API)
+
+GRAFICOS_OBRA = ('curva_s', 'idp', 'glosas')
+
+
+def rotulos(valores, formato='%.2f'):
+    """Formata um array inteiro de valores de uma vez (equivale a f'{x:.2f}' por ponto)"""
+    return np.char.mod(formato, np.asarray(valores, dtype=float))
+
+
+def figura_curva_s(indicadores):
+    """Curva S: previsto e realizado acumulados (%) por medição"""
+    medicoes = indicadores['numero_medicao'].to_numpy()
+    previsto = indicadores['previsto_acumulado'].to_numpy()
+    realizado = indicadores['realizado_acumulado'].to_numpy()
+
+    fig = go.Figure()
+
+    # Linha do previsto
+    fig.add_trace(go.Scatter(
+        x=medicoes,
+        y=previsto,
+        name='Previsto acumulado',
+        mode='lines+markers+text',
+        text=rotulos(previsto, '%.2f%%'),
+        textposition='top center',
+        line=dict(color='blue')
+    ))
+
+    # Linha do realizado
+    fig.add_trace(go.Scatter(
+        x=medicoes,
+        y=realizado,
+        name='Realizado acumulado',
+        mode='lines+markers+text',
+        text=rotulos(realizado, '%.2f%%'),
+        textposition='bottom center',
+        line=dict(color='red')
+    ))
+
+    fig.update_layout(
+        title='Curva de Desempenho Físico da Obra',
+        xaxis_title='Medição',
+        yaxis_title='Percentual (%)',
+        yaxis=dict(
+            range=[0, 100],
+            tickformat='.2f',
+            ticksuffix='%'
+        ),
+        showlegend=True,
+        height=500
+    )
+    return fig
+
+
+def figura_idp(indicadores, meta=1.0):
+    """Variação do IDP por medição, com a linha da meta"""
+    medicoes = indicadores['numero_medicao'].to_numpy()
+    idp = indicadores['idp'].to_numpy()
+
+    fig = go.Figure()
+
+    # Linha do IDP
+    fig.add_trace(go.Scatter(
+        x=medicoes,
+        y=idp,
+        name='IDP',
+        mode='lines+markers+text',
+        text=rotulos(idp),
+        textposition='top center',
+        line=dict(color='blue')
+    ))
+
+    # Linha da META
+    fig.add_trace(go.Scatter(
+        x=medicoes,
+        y=np.full(len(medicoes), meta),
+        name='Meta',
+        mode='lines',
+        line=dict(color='red', dash='dash')
+    ))
+
+    fig.update_layout(
+        title='Variação do IDP ao longo das medições',
+        xaxis_title='Medição',
+        yaxis_title='IDP',
+        yaxis=dict(
+            range=[0, 2],
+            tickformat='.2f'
+        ),
+        showlegend=True,
+        height=500
+    )
+    return fig
+
+
+def figura_glosas(indicadores):
+    """Glosa (%) aplicada nas medições com fator IMR configurado"""
+    com_fator = indicadores['fator_imr'].notna().to_numpy()
+    medicoes = indicadores['numero_medicao'].to_numpy()[com_fator]
+    glosa = indicadores['glosa'].to_numpy()[com_fator] * 100
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=medicoes,
+        y=glosa,
+        name='Glosa (%)',
+        text=rotulos(glosa, '%.2f%%'),
+        textposition='auto',
+    ))
+
+    fig.update_layout(
+        title='Glosas Aplicadas por Medição',
+        xaxis_title='Medição',
+        yaxis_title='Glosa (%)',
+        yaxis=dict(
+            tickformat='.2f',
+            ticksuffix='%'
+        ),
+        showlegend=True,
+        height=400
+    )
+    return fig
+
+
+def montar_figuras(indicadores):
+    """Monta todos os gráficos de uma obra a partir das linhas de calcular_indicadores"""
+    return {
+        'curva_s': figura_curva_s(indicadores),
+        'idp': figura_idp(indicadores),
+        'glosas': figura_glosas(indicadores),
+    }
+
+
+def figuras_obra(obra_id):
+    """
+    Gráficos da obra, memorizados pela versão dos dados: enquanto a obra não muda,
+    as execuções seguintes da página reaproveitam as mesmas figuras.
+    As figuras são compartilhadas entre sessões e não devem ser alteradas
+    """
+    from database.consultas import indicadores_obra
+
+    return query_cache.get_or_compute(
+        ('figuras_obra', obra_id, versao_obra(obra_id)),
+        lambda: montar_figuras(indicadores_obra(obra_id))
+    )
+
+
+def figuras_obra_json(obra_id):
+    """Gráficos da obra serializados em JSON do Plotly (exportação e API)"""
+    return query_cache.get_or_compute(
+        ('figuras_obra_json', obra_id, versao_obra(obra_id)),
+        lambda: {nome: fig.to_json() for nome, fig in figuras_obra(obra_id).items()}
+    )
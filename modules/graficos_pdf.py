@@ -0,0 +1,177 @@
+import numpy as np
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.graphics.charts.lineplots import LinePlot
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.legends import Legend
+from reportlab.graphics.widgets.markers import makeMarker
+from reportlab.lib import colors
+from reportlab.lib.attrmap import AttrMap, AttrMapValue
+
+# Versões vetoriais (reportlab.graphics) dos gráficos de modules.graficos, montadas
+# a partir das mesmas colunas de calcular_indicadores; entram no PDF sem exportar imagens
+
+LARGURA = 450
+ALTURA = 260
+
+# Acima desta quantidade de medições os rótulos dos pontos se sobrepõem e são omitidos
+MAX_ROTULOS = 24
+
+
+class DesenhoRelatorio(Drawing):
+    """Drawing com a descrição dos dados plotados, usada no hash do relatório"""
+    _attrMap = AttrMap(BASE=Drawing, identificacao=AttrMapValue(None, desc="Dados do gráfico"))
+
+
+def _desenho(titulo, identificacao):
+    """Área do gráfico com título"""
+    desenho = DesenhoRelatorio(LARGURA, ALTURA)
+    desenho.add(String(LARGURA / 2, ALTURA - 14, titulo, fontName='Helvetica-Bold', fontSize=11, textAnchor='middle'))
+    desenho.identificacao = identificacao
+    return desenho
+
+
+def _legenda(desenho, itens):
+    legenda = Legend()
+    legenda.x = 50
+    legenda.y = 12
+    legenda.dx = 8
+    legenda.dy = 8
+    legenda.fontName = 'Helvetica'
+    legenda.fontSize = 8
+    legenda.alignment = 'right'
+    legenda.columnMaximum = 1
+    legenda.deltax = 110
+    legenda.colorNamePairs = itens
+    desenho.add(legenda)
+
+
+def _grafico_linhas(series, y_min, y_max, y_formato):
+    grafico = LinePlot()
+    grafico.x = 50
+    grafico.y = 45
+    grafico.width = LARGURA - 70
+    grafico.height = ALTURA - 80
+    grafico.data = series
+    # Marcas do eixo x em passos inteiros, no máximo ~20 por gráfico
+    grafico.xValueAxis.valueStep = max(1, -(-max(len(s) for s in series) // 20))
+    grafico.xValueAxis.labelTextFormat = '%d'
+    grafico.xValueAxis.labels.fontSize = 8
+    grafico.yValueAxis.valueMin = y_min
+    grafico.yValueAxis.valueMax = y_max
+    grafico.yValueAxis.labelTextFormat = y_formato
+    grafico.yValueAxis.labels.fontSize = 8
+    return grafico
+
+
+def _pontos(x, y):
+    """Pares (x, y) sem os valores ausentes, no formato de LinePlot.data"""
+    validos = ~np.isnan(y)
+    return list(zip(x[validos].tolist(), y[validos].tolist()))
+
+
+def desenho_curva_s(indicadores):
+    """Curva S: previsto e realizado acumulados (%) por medição"""
+    medicoes = indicadores['numero_medicao'].to_numpy(dtype=float)
+    previsto = indicadores['previsto_acumulado'].to_numpy(dtype=float)
+    # Realizado só até a última medição com valores lançados
+    realizado = np.where(indicadores['realizado'].isna().to_numpy(), np.nan,
+                         indicadores['realizado_acumulado'].to_numpy(dtype=float))
+
+    desenho = _desenho('Curva de Desempenho Físico da Obra',
+                       ['curva_s', medicoes.tolist(), previsto.tolist(), realizado.tolist()])
+    series = [_pontos(medicoes, previsto), _pontos(medicoes, realizado)]
+    series = [s or [(medicoes[0], 0.0)] for s in series]
+
+    grafico = _grafico_linhas(series, 0, 100, '%d%%')
+    for i, cor in enumerate((colors.blue, colors.red)):
+        grafico.lines[i].strokeColor = cor
+        grafico.lines[i].strokeWidth = 1.5
+        grafico.lines[i].symbol = makeMarker('FilledCircle', size=3, fillColor=cor, strokeColor=cor)
+    if len(medicoes) <= MAX_ROTULOS:
+        grafico.lineLabelFormat = '%.2f%%'
+    grafico.lineLabels.fontSize = 6
+    grafico.lineLabels.dy = 6
+    desenho.add(grafico)
+
+    _legenda(desenho, [(colors.blue, 'Previsto acumulado'), (colors.red, 'Realizado acumulado')])
+    return desenho
+
+
+def desenho_idp(indicadores, meta=1.0):
+    """Variação do IDP por medição, com a linha da meta"""
+    medicoes = indicadores['numero_medicao'].to_numpy(dtype=float)
+    idp = indicadores['idp'].to_numpy(dtype=float)
+
+    desenho = _desenho('Variação do IDP ao longo das medições', ['idp', medicoes.tolist(), idp.tolist(), meta])
+    pontos_idp = _pontos(medicoes, idp)
+    series = [pontos_idp or [(medicoes[0], meta)], [(medicoes[0], meta), (medicoes[-1], meta)]]
+
+    grafico = _grafico_linhas(series, 0, max(2.0, float(np.nanmax(idp, initial=0.0))), '%.2f')
+    grafico.lines[0].strokeColor = colors.blue
+    grafico.lines[0].strokeWidth = 1.5
+    grafico.lines[0].symbol = makeMarker('FilledCircle', size=3, fillColor=colors.blue, strokeColor=colors.blue)
+    grafico.lines[1].strokeColor = colors.red
+    grafico.lines[1].strokeDashArray = [4, 3]
+    # Rótulos só nos pontos do IDP (a linha da meta não leva valores)
+    if len(medicoes) <= MAX_ROTULOS:
+        grafico.lineLabelFormat = 'values'
+        grafico.lineLabelArray = [[f'{y:.2f}' for _, y in series[0]], ['', '']]
+    grafico.lineLabels.fontSize = 6
+    grafico.lineLabels.dy = 6
+    desenho.add(grafico)
+
+    _legenda(desenho, [(colors.blue, 'IDP'), (colors.red, 'Meta')])
+    return desenho
+
+
+def desenho_glosas(indicadores):
+    """Glosa (%) aplicada nas medições com fator IMR configurado; None quando não há"""
+    com_fator = indicadores['fator_imr'].notna().to_numpy() & indicadores['realizado'].notna().to_numpy()
+    medicoes = indicadores['numero_medicao'].to_numpy()[com_fator]
+    if not len(medicoes):
+        return None
+    glosa = indicadores['glosa'].to_numpy(dtype=float)[com_fator] * 100
+
+    desenho = _desenho('Glosas Aplicadas por Medição', ['glosas', medicoes.tolist(), glosa.tolist()])
+
+    grafico = VerticalBarChart()
+    grafico.x = 50
+    grafico.y = 45
+    grafico.width = LARGURA - 70
+    grafico.height = ALTURA - 80
+    grafico.data = [glosa.tolist()]
+    passo = max(1, -(-len(medicoes) // 20))
+    grafico.categoryAxis.categoryNames = [str(m) if i % passo == 0 else '' for i, m in enumerate(medicoes.tolist())]
+    grafico.categoryAxis.labels.fontSize = 8
+    grafico.valueAxis.valueMin = 0
+    grafico.valueAxis.labelTextFormat = '%.2f%%'
+    grafico.valueAxis.labels.fontSize = 8
+    grafico.bars[0].fillColor = colors.HexColor('#636efa')
+    if len(medicoes) <= MAX_ROTULOS:
+        grafico.barLabelFormat = '%.2f%%'
+    grafico.barLabels.fontSize = 6
+    grafico.barLabels.nudge = 6
+    desenho.add(grafico)
+
+    _legenda(desenho, [(colors.HexColor('#636efa'), 'Glosa (%)')])
+    return desenho
+
+
+def montar_desenhos(indicadores, ate_medicao=None):
+    """
+    Gráficos do relatório de uma obra a partir das linhas de calcular_indicadores
+    ate_medicao: limita as séries às medições até a do relatório
+    """
+    if ate_medicao is not None:
+        indicadores = indicadores[indicadores['numero_medicao'] <= ate_medicao]
+    if indicadores.empty:
+        return []
+    desenhos = [desenho_curva_s(indicadores), desenho_idp(indicadores), desenho_glosas(indicadores)]
+    return [d for d in desenhos if d is not None]
+
+
+def desenhos_obra(obra_id, ate_medicao=None):
+    """Gráficos do relatório da obra, com os indicadores já memorizados da consulta"""
+    from database.consultas import indicadores_obra
+
+    return montar_desenhos(indicadores_obra(obra_id), ate_medicao)
@@ -2,8 +2,52 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from database.db_utils import get_db_connection
-from datetime import datetime
+from database.db_utils import add_obras
+from utils.formatters import format_currency_br_series
+from utils.planilhas import extrair_blocos, extrair_obras, registros_obras
+from utils.profiling import secao
+
+
+def extrair_dados_planilha(df):
+    """
+    Extrai de um DataFrame (planilha já carregada) os percentuais acumulados
+    (previsto e realizado) e os valores financeiros de todas as medições da primeira obra
+    """
+    obras, avisos = extrair_blocos(df.to_numpy(dtype=object))
+    if not obras:
+        raise ValueError('; '.join(avisos) or "Nenhuma obra encontrada na planilha")
+    return obras[0]
+
+
+def gravar_importacao(obras, user_id):
+    """
+    Grava as obras importadas do usuário, com previstos e realizados de todas as
+    medições, em uma única transação; retorna os ids das obras
+    """
+    return add_obras(user_id, registros_obras(obras))
+
+
+def _job_importacao(job, obras, user_id):
+    """Tarefa em segundo plano da importação"""
+    from database.cache import invalidar_usuario
+
+    job.progresso(0.5, f"Gravando {len(obras)} obra(s)")
+    obra_ids = gravar_importacao(obras, user_id)
+    invalidar_usuario(user_id)
+    return {'obra_ids': obra_ids}
+
+
+def _ler_arquivo(uploaded_file):
+    """
+    Extrai as obras do arquivo enviado, uma única vez por envio na sessão
+    (file_id muda a cada envio, mesmo de um arquivo corrigido com o mesmo nome e tamanho)
+    """
+    chave = uploaded_file.file_id
+    leitura = st.session_state.get('importacao_leitura')
+    if not leitura or leitura[0] != chave:
+        leitura = (chave, *extrair_obras(uploaded_file))
+        st.session_state.importacao_leitura = leitura
+    return leitura[1], leitura[2]
 
 
 def importar_dados():
@@ -13,115 +57,63 @@ def importar_dados():
 
     if uploaded_file is not None:
         try:
-            # Ler a planilha
-            df = pd.read_excel(uploaded_file)
-
-            # Buscar dados diretamente das linhas específicas
-            try:
-                # Converter todas as colunas para string primeiro
-                df_str = df.astype(str)
-
-                # Encontrar as linhas corretas
-                previsto_idx = \
-                df_str.index[df_str.iloc[:, 0].str.contains('Previsto acumulado', case=False, na=False)].tolist()[0]
-                realizado_idx = \
-                df_str.index[df_str.iloc[:, 0].str.contains('Realizado acumulado', case=False, na=False)].tolist()[0]
-
-                # Extrair os valores
-                previsto_acumulado = df.iloc[previsto_idx, 1:13].values
-                realizado_acumulado = df.iloc[realizado_idx, 1:13].values
-
-                # Converter para float, tratando valores vazios
-                previsto_acumulado = pd.to_numeric(previsto_acumulado, errors='coerce').fillna(0)
-                realizado_acumulado = pd.to_numeric(realizado_acumulado, errors='coerce').fillna(0)
-
-                # Buscar valores financeiros (últimas linhas)
-                valores_previsto = []
-                valores_realizado = []
-
-                # Procurar a última ocorrência dos valores financeiros
-                for i in range(len(df)):
-                    row = df.iloc[i]
-                    if isinstance(row[0], str) and 'R$' in str(row[1]):
-                        valores_previsto = row[1:13].values
-                        if i + 1 < len(df):
-                            valores_realizado = df.iloc[i + 1, 1:13].values
-
-                # Converter valores financeiros para float
-                def convert_currency(val):
-                    if pd.isna(val):
-                        return 0.0
-                    if isinstance(val, str):
-                        return float(val.replace('R$', '').replace('.', '').replace(',', '.').strip())
-                    return float(val)
-
-                valores_previsto = [convert_currency(x) for x in valores_previsto]
-                valores_realizado = [convert_currency(x) for x in valores_realizado]
-
-                # Mostrar preview dos dados extraídos
-                st.write("### Dados Extraídos")
-
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.write("Percentuais Acumulados:")
-                    df_percentuais = pd.DataFrame({
-                        'Medição': range(1, 13),
-                        'Previsto (%)': previsto_acumulado,
-                        'Realizado (%)': realizado_acumulado
-                    })
-                    st.dataframe(df_percentuais)
-
-                with col2:
-                    st.write("Valores Financeiros:")
-                    df_valores = pd.DataFrame({
-                        'Medição': range(1, 13),
-                        'Previsto (R$)': valores_previsto,
-                        'Realizado (R$)': valores_realizado
-                    })
-                    st.dataframe(df_valores)
-
-                if st.button("Confirmar Importação"):
-                    conn = get_db_connection()
-                    cursor = conn.cursor()
-
-                    try:
-                        # Inserir obra
-                        cursor.execute('''
-                        INSERT INTO obras (
-                            nome, valor_total, data_inicio, duracao_prevista, num_medicoes
-                        ) VALUES (?, ?, ?, ?, ?)
-                        ''', ('Obra Importada', valores_previsto[-1], datetime.now().date(), 12, 12))
-
-                        obra_id = cursor.lastrowid
-
-                        # Inserir medições
-                        for i in range(12):
-                            cursor.execute('''
-                            INSERT INTO medicoes (
-                                obra_id, numero_medicao, valor_previsto, valor_realizado,
-                                percentual_previsto, percentual_realizado, data_medicao
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                            ''', (
-                                obra_id,
-                                i + 1,
-                                valores_previsto[i],
-                                valores_realizado[i] if valores_realizado[i] != 0 else None,
-                                previsto_acumulado[i],
-                                realizado_acumulado[i] if realizado_acumulado[i] != 0 else None,
-                                datetime.now().date()
-                            ))
-
-                        conn.commit()
-                        st.success("Dados importados com sucesso!")
-
-                    except Exception as e:
-                        st.error(f"Erro ao importar dados: {str(e)}")
-                        conn.rollback()
-                    finally:
-                        conn.close()
-
-            except Exception as e:
-                st.error(f"Erro ao processar dados: {str(e)}")
-
+            # Leitura em modo streaming, aba por aba; cada bloco da planilha é uma obra
+            with secao("planilha"):
+                obras, avisos = _ler_arquivo(uploaded_file)
         except Exception as e:
-            st.error(f"Erro ao ler planilha: {str(e)}")
\ No newline at end of file
+            st.error(f"Erro ao ler arquivo: {str(e)}")
+            return
+
+        for aviso in avisos:
+            st.warning(aviso)
+        if not obras:
+            st.error("Nenhuma obra encontrada na planilha.")
+            return
+
+        # Mostrar preview dos dados extraídos
+        st.write(f"### Obras Encontradas ({len(obras)})")
+        with secao("dataframes"):
+            st.dataframe(pd.DataFrame({
+                'Aba': [obra['aba'] for obra in obras],
+                'Obra': [obra['nome'] for obra in obras],
+                'Medições': [obra['num_medicoes'] for obra in obras],
+                'Valor Total': format_currency_br_series([obra['valor_total'] for obra in obras]),
+                'Previsto acumulado (%)': [obra['previsto_acumulado'][-1] for obra in obras],
+                'Realizado acumulado (%)': [obra['realizado_acumulado'].max(initial=0.0) for obra in obras],
+            }), use_container_width=True)
+
+        indice = st.selectbox(
+            "Detalhar obra",
+            range(len(obras)),
+            format_func=lambda i: f"{obras[i]['nome']} ({obras[i]['aba']})"
+        )
+        obra = obras[indice]
+        medicoes = np.arange(1, obra['num_medicoes'] + 1)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.write("Percentuais Acumulados:")
+            st.dataframe(pd.DataFrame({
+                'Medição': medicoes,
+                'Previsto (%)': obra['previsto_acumulado'],
+                'Realizado (%)': obra['realizado_acumulado']
+            }))
+
+        with col2:
+            st.write("Valores Financeiros:")
+            st.dataframe(pd.DataFrame({
+                'Medição': medicoes,
+                'Previsto (R$)': format_currency_br_series(obra['valores_previsto']),
+                'Realizado (R$)': format_currency_br_series(np.nan_to_num(obra['valores_realizado']))
+            }))
+
+        if st.button("Confirmar Importação"):
+            # Gravação em segundo plano; o resultado aparece na barra lateral
+            from utils import jobs
+
+            jobs.enviar(
+                'importacao', f"Importação - {uploaded_file.name} ({len(obras)} obra(s))",
+                _job_importacao, obras, st.session_state.user_id,
+                user_id=st.session_state.user_id
+            )
+            st.info("Importação iniciada; acompanhe o andamento na barra lateral.")
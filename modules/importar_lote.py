@@ -0,0 +1,209 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from database.db_utils import add_obras, get_db_connection
+
+# Processos que leem as planilhas (padrão: um por CPU)
+IMPORT_WORKERS = int(os.environ.get('OBRAS_IMPORT_WORKERS', '0')) or os.cpu_count() or 1
+
+# Obras gravadas por transação pelo processo escritor
+OBRAS_POR_TRANSACAO = 200
+
+
+def listar_arquivos(caminhos):
+    """Expande diretórios (recursivamente) e padrões glob em uma lista ordenada de arquivos .xlsx"""
+    arquivos = set()
+    for caminho in caminhos:
+        if os.path.isdir(caminho):
+            arquivos.update(glob.glob(os.path.join(caminho, '**', '*.xlsx'), recursive=True))
+        else:
+            arquivos.update(c for c in glob.glob(caminho, recursive=True) if c.lower().endswith('.xlsx'))
+    # Arquivos temporários do Excel (~$arquivo.xlsx) não são planilhas
+    return sorted(a for a in arquivos if not os.path.basename(a).startswith('~$'))
+
+
+def _ler_arquivo(caminho):
+    """
+    Executado nos processos do pool: extrai as obras de um arquivo, sem Streamlit
+    Retorna (caminho, obras, avisos, erro, segundos)
+    """
+    from utils.planilhas import extrair_obras
+
+    inicio = time.perf_counter()
+    try:
+        obras, avisos = extrair_obras(caminho)
+        return caminho, obras, avisos, None, time.perf_counter() - inicio
+    except Exception as e:
+        return caminho, [], [], f"{type(e).__name__}: {e}", time.perf_counter() - inicio
+
+
+def resolver_usuario(usuario):
+    """Aceita o id ou o nome do usuário; retorna o id (ou None se não existir)"""
+    conn = get_db_connection()
+    try:
+        linha = conn.execute('SELECT id FROM users WHERE id = ? OR username = ?',
+                             (int(usuario) if str(usuario).isdigit() else None, str(usuario))).fetchone()
+    finally:
+        conn.close()
+    return linha[0] if linha else None
+
+
+class EscritorLote:
+    """
+    Único escritor do banco: acumula as obras lidas pelos processos e grava em
+    transações de até `tamanho` obras; se uma transação falha, grava arquivo por
+    arquivo para isolar o que foi rejeitado
+    """
+
+    def __init__(self, user_id, relatorio, tamanho=OBRAS_POR_TRANSACAO, simular=False):
+        from utils.planilhas import registros_obras
+
+        self._registros_obras = registros_obras
+        self.user_id = user_id
+        self.relatorio = relatorio
+        self.tamanho = tamanho
+        self.simular = simular
+        self.pendentes = []
+        self.transacoes = 0
+
+    def adicionar(self, caminho, obras):
+        self.pendentes.extend((caminho, obra) for obra in obras)
+        if len(self.pendentes) >= self.tamanho:
+            self.gravar()
+
+    def _gravar(self, pendentes):
+        if not self.simular:
+            add_obras(self.user_id, self._registros_obras([obra for _, obra in pendentes]))
+        self.transacoes += 1
+        for caminho, obra in pendentes:
+            self.relatorio[caminho]['obras'] += 1
+            self.relatorio[caminho]['medicoes'] += obra['num_medicoes']
+
+    def gravar(self):
+        pendentes, self.pendentes = self.pendentes, []
+        if not pendentes:
+            return
+        try:
+            self._gravar(pendentes)
+        except Exception:
+            # Regrava cada arquivo em sua própria transação para identificar o rejeitado
+            por_arquivo = {}
+            for caminho, obra in pendentes:
+                por_arquivo.setdefault(caminho, []).append((caminho, obra))
+            for caminho, itens in por_arquivo.items():
+                try:
+                    self._gravar(itens)
+                except Exception as e:
+                    self.relatorio[caminho]['rejeitadas'] += len(itens)
+                    self.relatorio[caminho]['erro'] = f"{type(e).__name__}: {e}"
+
+
+def importar_arquivos(arquivos, user_id, workers=None, tamanho_transacao=OBRAS_POR_TRANSACAO,
+                      simular=False, progresso=None):
+    """
+    Lê os arquivos em paralelo (ProcessPoolExecutor) e grava as obras por um único escritor
+    progresso(concluidos, total) é chamado a cada arquivo lido
+    Retorna (relatório por arquivo, totais)
+    """
+    workers = workers or IMPORT_WORKERS
+    relatorio = {
+        caminho: {'obras': 0, 'medicoes': 0, 'rejeitadas': 0, 'avisos': [], 'erro': None,
+                  'leitura_s': 0.0, 'megabytes': os.path.getsize(caminho) / 1024 / 1024}
+        for caminho in arquivos
+    }
+    escritor = EscritorLote(user_id, relatorio, tamanho_transacao, simular)
+
+    inicio = time.perf_counter()
+    # spawn: mesmo contexto da geração de relatórios em lote (processo pai com threads)
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=contexto) as executor:
+        futuros = [executor.submit(_ler_arquivo, caminho) for caminho in arquivos]
+        for concluidos, futuro in enumerate(as_completed(futuros), start=1):
+            caminho, obras, avisos, erro, segundos = futuro.result()
+            relatorio[caminho].update(avisos=avisos, erro=erro, leitura_s=segundos)
+            # Blocos incompletos da planilha contam como rejeitados
+            relatorio[caminho]['rejeitadas'] += len(avisos)
+            escritor.adicionar(caminho, obras)
+            if progresso:
+                progresso(concluidos, len(arquivos))
+    escritor.gravar()
+    segundos = time.perf_counter() - inicio
+
+    obras = sum(r['obras'] for r in relatorio.values())
+    medicoes = sum(r['medicoes'] for r in relatorio.values())
+    megabytes = sum(r['megabytes'] for r in relatorio.values())
+    totais = {
+        'arquivos': len(arquivos),
+        'arquivos_com_erro': sum(1 for r in relatorio.values() if r['erro']),
+        'obras': obras,
+        'medicoes': medicoes,
+        'rejeitadas': sum(r['rejeitadas'] for r in relatorio.values()),
+        'transacoes': escritor.transacoes,
+        'workers': workers,
+        'segundos': segundos,
+        'arquivos_por_segundo': len(arquivos) / segundos if segundos else 0.0,
+        'obras_por_segundo': obras / segundos if segundos else 0.0,
+        'medicoes_por_segundo': medicoes / segundos if segundos else 0.0,
+        'megabytes_por_segundo': megabytes / segundos if segundos else 0.0,
+    }
+    return relatorio, totais
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa em lote planilhas .xlsx de diretórios ou padrões glob")
+    parser.add_argument('caminhos', nargs='+', help="Diretórios, arquivos ou padrões glob (ex.: 'contratos/**/*.xlsx')")
+    parser.add_argument('--usuario', required=True, help="Id ou nome do usuário dono das obras importadas")
+    parser.add_argument('--workers', type=int, default=IMPORT_WORKERS)
+    parser.add_argument('--transacao', type=int, default=OBRAS_POR_TRANSACAO, help="Obras por transação")
+    parser.add_argument('--simular', action='store_true', help="Somente lê as planilhas, sem gravar no banco")
+    parser.add_argument('--relatorio', help="Grava o relatório por arquivo em JSON")
+    args = parser.parse_args()
+
+    user_id = resolver_usuario(args.usuario)
+    if user_id is None:
+        print(f"Usuário não encontrado: {args.usuario}")
+        return 2
+
+    arquivos = listar_arquivos(args.caminhos)
+    print(f"{len(arquivos)} arquivo(s) a importar")
+    if not arquivos:
+        return 0
+
+    def progresso(concluidos, total):
+        print(f"\r{concluidos}/{total} ({concluidos / total:.0%})", end='', flush=True)
+
+    relatorio, totais = importar_arquivos(arquivos, user_id, args.workers, args.transacao, args.simular, progresso)
+    print()
+
+    largura = max(len(os.path.relpath(a)) for a in arquivos)
+    print(f"{'Arquivo':<{largura}}  {'Obras':>6}  {'Medições':>8}  {'Rejeitadas':>10}  {'Leitura':>8}")
+    for caminho in arquivos:
+        r = relatorio[caminho]
+        print(f"{os.path.relpath(caminho):<{largura}}  {r['obras']:>6}  {r['medicoes']:>8}  "
+              f"{r['rejeitadas']:>10}  {r['leitura_s'] * 1000:>6.0f}ms"
+              + (f"  ERRO: {r['erro']}" if r['erro'] else ''))
+        for aviso in r['avisos']:
+            print(f"    {aviso}")
+
+    print(f"\n{totais['obras']} obra(s) e {totais['medicoes']} medição(ões) importadas de {totais['arquivos']} "
+          f"arquivo(s) em {totais['segundos']:.2f} s ({totais['arquivos_por_segundo']:.1f} arquivos/s, "
+          f"{totais['obras_por_segundo']:.1f} obras/s, {totais['megabytes_por_segundo']:.2f} MB/s, "
+          f"{totais['workers']} processo(s), {totais['transacoes']} transação(ões))"
+          + (" [simulação]" if args.simular else ''))
+    if totais['rejeitadas'] or totais['arquivos_com_erro']:
+        print(f"{totais['rejeitadas']} bloco(s)/obra(s) rejeitado(s), {totais['arquivos_com_erro']} arquivo(s) com erro")
+
+    if args.relatorio:
+        with open(args.relatorio, 'w', encoding='utf-8') as f:
+            json.dump({'arquivos': relatorio, 'totais': totais}, f, ensure_ascii=False, indent=2)
+    return 1 if totais['arquivos_com_erro'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,13 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime
-from database.db_utils import get_db_connection
-from utils.formatters import format_currency_br, format_percentage
+from database.db_utils import update_realizados
+from database.cache import invalidar_obra
+from database.consultas import buscar_obra, status_medicoes, itens_medicao, fatores_imr
+from utils.formatters import format_currency_br, format_number_br, parse_currency_br, format_dataframe_currency_br
 from utils.calculadora import calcular_idp
-from utils.calculadora import calcular_glosa, calcular_valor_glosa
+from utils.calculadora import calcular_glosa_lote, calcular_valor_glosa
+from utils.profiling import secao
+from modules.seletor_obras import selecionar_obra
 
 
 def registrar_medicao():
@@ -17,107 +20,69 @@ def registrar_medicao():
     4. Conferir o resumo e salvar
     """)
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Buscar obras do usuário logado
-    cursor.execute('''
-    SELECT id, nome, contrato 
-    FROM obras 
-    WHERE user_id = ?
-    ORDER BY nome
-    ''', (st.session_state.user_id,))
-
-    obras = cursor.fetchall()
-
-    if not obras:
-        st.warning("Nenhuma obra cadastrada")
-        conn.close()
+    # Seleção da obra (busca paginada nas obras do usuário logado)
+    with secao("consultas"):
+        obra_id = selecionar_obra(st.session_state.user_id)
+    if obra_id is None:
         return
 
-    # Seleção da obra
-    obras_dict = {obra[0]: f"{obra[1]} (Contrato: {obra[2]})" for obra in obras}
-    obra_selecionada = st.selectbox("Selecione a Obra", list(obras_dict.values()))
-    obra_id = [k for k, v in obras_dict.items() if v == obra_selecionada][0]
-
     # Buscar dados da obra
-    cursor.execute('SELECT num_medicoes, valor_total FROM obras WHERE id = ?', (obra_id,))
-    num_medicoes, valor_total = cursor.fetchone()
-
-    # Seletor de medição com status
-    cursor.execute('''
-    SELECT DISTINCT numero_medicao, 
-           CASE WHEN valor_realizado IS NOT NULL THEN 1 ELSE 0 END as realizada
-    FROM medicoes 
-    WHERE obra_id = ?
-    GROUP BY numero_medicao
-    ''', (obra_id,))
-    status_medicoes = {m[0]: m[1] for m in cursor.fetchall()}
+    with secao("consultas"):
+        obra = buscar_obra(obra_id)
+        num_medicoes, valor_total = obra['num_medicoes'], obra['valor_total']
+
+        # Seletor de medição com status
+        status = status_medicoes(obra_id)
 
     numero_medicao = st.selectbox(
         "Selecione a Medição",
         options=range(1, num_medicoes + 1),
-        format_func=lambda x: f"Medição {x} {'✅ Salva' if status_medicoes.get(x, 0) else '📝 Não salva'}",
+        format_func=lambda x: f"Medição {x} {'✅ Salva' if status.get(x, 0) else '📝 Não salva'}",
         key="medicao_selector"
     )
 
     # Buscar itens da obra
-    cursor.execute('''
-    SELECT 
-        i.id,
-        i.descricao,
-        i.valor_previsto as valor_total_item,
-        m.valor_previsto,
-        m.valor_realizado
-    FROM itens_obra i
-    LEFT JOIN medicoes m ON i.id = m.item_id AND m.numero_medicao = ?
-    WHERE i.obra_id = ?
-    ORDER BY i.id
-    ''', (numero_medicao, obra_id))
-
-    itens = cursor.fetchall()
+    with secao("consultas"):
+        itens = itens_medicao(obra_id, numero_medicao)
 
     if itens:
         st.subheader(f"Medição #{numero_medicao}")
 
         valores_realizados = {}
-        for idx, item in enumerate(itens):
-            item_id, descricao, valor_total_item, valor_previsto, valor_realizado = item
-            with st.expander(f"Item {idx + 1}: {descricao}", expanded=True):
-                st.write(f"### {descricao}")
-                st.write(f"Valor total do item: {format_currency_br(valor_total_item)}")
-                st.write(f"Valor previsto para esta medição: {format_currency_br(valor_previsto)}")
-
-                # Input do valor realizado
-                valor_str = st.text_input(
-                    "Valor realizado",
-                    value=format_currency_br(valor_realizado or 0).replace('R$ ', ''),
-                    key=f"med_{numero_medicao}_{item_id}"
-                )
+        with secao("widgets"):
+            for idx, item in enumerate(itens):
+                item_id, descricao, valor_total_item, valor_previsto, valor_realizado = item
+                with st.expander(f"Item {idx + 1}: {descricao}", expanded=True):
+                    st.write(f"### {descricao}")
+                    st.write(f"Valor total do item: {format_currency_br(valor_total_item)}")
+                    st.write(f"Valor previsto para esta medição: {format_currency_br(valor_previsto)}")
 
-                try:
-                    valor = float(valor_str.replace('.', '').replace(',', '.'))
-                except ValueError:
-                    valor = 0.0
+                    # Input do valor realizado
+                    valor_str = st.text_input(
+                        "Valor realizado",
+                        value=format_number_br(valor_realizado or 0),
+                        key=f"med_{numero_medicao}_{item_id}"
+                    )
+
+                    valor = parse_currency_br(valor_str)
 
-                valores_realizados[item_id] = valor
+                    valores_realizados[item_id] = valor
 
         # Mostrar resumo
         st.subheader("Resumo da Medição")
 
-        df_resumo = pd.DataFrame({
-            'Item': [item[1] for item in itens],
-            'Valor Previsto': [item[3] for item in itens],
-            'Valor Realizado': [valores_realizados[item[0]] for item in itens]
-        })
+        with secao("dataframes"):
+            df_resumo = pd.DataFrame({
+                'Item': [item[1] for item in itens],
+                'Valor Previsto': [item[3] for item in itens],
+                'Valor Realizado': [valores_realizados[item[0]] for item in itens]
+            })
 
-        # Calcular totais e desvios
-        df_resumo['Desvio'] = df_resumo['Valor Realizado'] - df_resumo['Valor Previsto']
+            # Calcular totais e desvios
+            df_resumo['Desvio'] = df_resumo['Valor Realizado'] - df_resumo['Valor Previsto']
 
-        # Formatar valores para exibição
-        df_display = df_resumo.copy()
-        for col in ['Valor Previsto', 'Valor Realizado', 'Desvio']:
-            df_display[col] = df_display[col].apply(format_currency_br)
+            # Formatar valores para exibição
+            df_display = format_dataframe_currency_br(df_resumo, ['Valor Previsto', 'Valor Realizado', 'Desvio'])
 
         st.dataframe(df_display)
 
@@ -129,13 +94,13 @@ def registrar_medicao():
         # Calcular IDP
         idp = calcular_idp(total_realizado, total_previsto)
 
-        cursor.execute('''SELECT fator_ponderacao FROM imr_fatores WHERE obra_id = ? AND numero_medicao = ?''',
-                       (obra_id, numero_medicao))
-        resultado = cursor.fetchone()
-        fator_imr = resultado[0] if resultado else 1.0
+        with secao("consultas"):
+            fatores = fatores_imr(obra_id)
+        fator_imr = fatores.get(numero_medicao, 1.0)
 
         # Calcular glosa
-        glosa = calcular_glosa(obra_id, idp, numero_medicao)
+        glosa = float(calcular_glosa_lote(obra_id, [idp], [numero_medicao],
+                                          fatores={(obra_id, n): fp for n, fp in fatores.items()})[0])
 
         # Mostrar informações do IMR
         st.subheader("Instrumento de Medição de Resultado (IMR)")
@@ -179,47 +144,27 @@ def registrar_medicao():
         with col1:
             if st.button("Salvar Medição", key="btn_salvar_medicao"):
                 try:
-                    for item_id, valor_realizado in valores_realizados.items():
-                        percentual = (valor_realizado / valor_total * 100) if valor_total > 0 else 0
-                        cursor.execute('''
-                        UPDATE medicoes 
-                        SET valor_realizado = ?,
-                            percentual_realizado = ?,
-                            data_medicao = ?
-                        WHERE obra_id = ? AND item_id = ? AND numero_medicao = ?
-                        ''', (
-                            valor_realizado,
-                            percentual,
-                            datetime.now().date(),
-                            obra_id,
-                            item_id,
-                            numero_medicao
-                        ))
-                    conn.commit()
+                    update_realizados(
+                        obra_id,
+                        list(valores_realizados.keys()),
+                        numero_medicao,
+                        list(valores_realizados.values()),
+                        valor_total
+                    )
+                    invalidar_obra(obra_id, st.session_state.user_id)
                     st.success(f"Medição #{numero_medicao} salva com sucesso!")
                 except Exception as e:
                     st.error(f"Erro ao salvar medição: {str(e)}")
-                    conn.rollback()
 
         with col2:
+            chave_pdf = (obra_id, numero_medicao)
             if st.button("Gerar Relatório PDF", key="btn_gerar_pdf"):
                 try:
-                    from modules.pdf_generator import generate_pdf_report
-
-                    # Buscar dados completos da obra
-                    cursor.execute('''
-                    SELECT nome, contrato, ordem_servico, contratante, contratada, valor_total
-                    FROM obras WHERE id = ?
-                    ''', (obra_id,))
-                    obra_dados = cursor.fetchone()
+                    from modules.pdf_generator import enviar_relatorio_pdf
 
                     dados_obra = {
-                        'nome': obra_dados[0],
-                        'contrato': obra_dados[1],
-                        'ordem_servico': obra_dados[2],
-                        'contratante': obra_dados[3],
-                        'contratada': obra_dados[4],
-                        'valor_total': obra_dados[5]
+                        campo: obra[campo]
+                        for campo in ['nome', 'contrato', 'ordem_servico', 'contratante', 'contratada', 'valor_total']
                     }
 
                     dados_medicao = {
@@ -231,13 +176,26 @@ def registrar_medicao():
                         'desvio': total_desvio
                     }
 
-                    graficos = None
-                    pdf_file = generate_pdf_report(obra_id, numero_medicao, dados_obra, dados_medicao, graficos)
-
-                    import os
-                    current_dir = os.getcwd()
-                    st.success(f"Relatório PDF gerado com sucesso em: {os.path.join(current_dir, pdf_file)}")
+                    # O PDF (com Curva S, IDP e glosas até esta medição) é gerado em segundo
+                    # plano; a página pode ser usada normalmente enquanto isso
+                    st.session_state.pdf_medicao = (
+                        chave_pdf,
+                        enviar_relatorio_pdf(obra_id, numero_medicao, dados_obra, dados_medicao,
+                                             user_id=st.session_state.user_id)
+                    )
                 except Exception as e:
                     st.error(f"Erro ao gerar PDF: {str(e)}")
 
-    conn.close()
+            pdf_medicao = st.session_state.get('pdf_medicao')
+            if pdf_medicao and pdf_medicao[0] == chave_pdf:
+                from utils import jobs
+                from modules.download_tarefas import botao_download_tarefa
+
+                job = jobs.buscar_job(pdf_medicao[1])
+                if jobs.tamanho_artefato(job) is not None:
+                    st.success("Relatório PDF gerado com sucesso!")
+                    botao_download_tarefa(job, "Baixar Relatório PDF", "btn_baixar_pdf", mime="application/pdf")
+                elif job and job['status'] == jobs.ERRO:
+                    st.error(f"Erro ao gerar PDF: {job['erro']}")
+                else:
+                    st.info("Gerando o relatório em segundo plano; o download aparece aqui e na barra lateral.")
@@ -1,19 +1,30 @@
 from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, Flowable
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch, cm
 from datetime import datetime
+from io import BytesIO
+import hashlib
+import json
 import os
+from database.cache import QueryCache
+
+# Cache dos PDFs já gerados, indexado pelo hash do conteúdo do relatório
+PDF_CACHE_MAX_ENTRIES = int(os.environ.get('OBRAS_PDF_CACHE_MAX_ENTRIES', '64'))
+PDF_CACHE_TTL = float(os.environ.get('OBRAS_PDF_CACHE_TTL', '3600'))
+
+pdf_cache = QueryCache(max_entries=PDF_CACHE_MAX_ENTRIES, ttl=PDF_CACHE_TTL)
 
 
 class RelatorioPDF:
-    def __init__(self, obra_id, numero_medicao):
+    def __init__(self, obra_id, numero_medicao, destino=None):
+        """destino: arquivo (ou buffer, como BytesIO) onde o PDF será gravado"""
         self.obra_id = obra_id
         self.numero_medicao = numero_medicao
-        self.filename = f"relatorio_medicao_{obra_id}_{numero_medicao}.pdf"
+        self.filename = nome_arquivo_relatorio(obra_id, numero_medicao)
         self.doc = SimpleDocTemplate(
-            self.filename,
+            self.filename if destino is None else destino,
             pagesize=A4,
             rightMargin=72,
             leftMargin=72,
@@ -90,10 +101,14 @@ class RelatorioPDF:
         self.elements.append(Spacer(1, 20))
 
     def add_graficos(self, graficos):
-        """Adiciona os gráficos ao relatório"""
+        """Adiciona os gráficos ao relatório (desenhos de modules.graficos_pdf ou caminhos de imagem)"""
         if graficos:  # Verifica se graficos não é None
             for grafico in graficos:
-                if grafico:  # Verifica se o caminho do gráfico não é None
+                if isinstance(grafico, Flowable):
+                    # Gráficos vetoriais do reportlab.graphics entram direto no documento
+                    self.elements.append(grafico)
+                    self.elements.append(Spacer(1, 20))
+                elif grafico:  # Verifica se o caminho do gráfico não é None
                     img = Image(grafico)
                     img.drawHeight = 300
                     img.drawWidth = 450
@@ -132,27 +147,98 @@ class RelatorioPDF:
 
         self.elements.append(table)
 
-def gerar(self, dados_obra, dados_medicao, graficos=None):
-    """Gera o relatório PDF completo"""
-    self.add_cabecalho(dados_obra)
-    self.add_medicao(dados_medicao)
-    if graficos:  # Só adiciona gráficos se existirem
-        self.add_graficos(graficos)
-    self.add_conclusao(dados_medicao)
-    self.add_assinaturas()
+    def gerar(self, dados_obra, dados_medicao, graficos=None):
+        """Gera o relatório PDF completo"""
+        self.add_cabecalho(dados_obra)
+        self.add_medicao(dados_medicao)
+        if graficos:  # Só adiciona gráficos se existirem
+            self.add_graficos(graficos)
+        self.add_conclusao(dados_medicao)
+        self.add_assinaturas()
 
-    self.doc.build(self.elements)
-    return self.filename
+        self.doc.build(self.elements)
+        return self.filename
 
 
 def generate_pdf_report(obra_id, numero_medicao, dados_obra, dados_medicao, graficos):
-    """Função principal para gerar o relatório"""
-    relatorio = RelatorioPDF(obra_id, numero_medicao)
-    relatorio.add_cabecalho(dados_obra)
-    relatorio.add_medicao(dados_medicao)
-    if graficos:
-        relatorio.add_graficos(graficos)
-    relatorio.add_conclusao(dados_medicao)
-    relatorio.add_assinaturas()
-    relatorio.doc.build(relatorio.elements)
-    return relatorio.filename
+    """Função principal para gerar o relatório em arquivo no diretório atual"""
+    return RelatorioPDF(obra_id, numero_medicao).gerar(dados_obra, dados_medicao, graficos)
+
+
+def _identificar_grafico(grafico):
+    """Representação estável de um gráfico para o hash do relatório"""
+    if getattr(grafico, 'identificacao', None) is not None:
+        return grafico.identificacao
+    if isinstance(grafico, str) and os.path.exists(grafico):
+        return [grafico, os.path.getmtime(grafico), os.path.getsize(grafico)]
+    return repr(grafico)
+
+
+def hash_relatorio(obra_id, numero_medicao, dados_obra, dados_medicao, graficos=None):
+    """Hash do conteúdo do relatório: dados iguais geram o mesmo hash"""
+    conteudo = json.dumps({
+        'obra_id': obra_id,
+        'numero_medicao': numero_medicao,
+        'dados_obra': dados_obra,
+        'dados_medicao': dados_medicao,
+        'graficos': [_identificar_grafico(g) for g in graficos or [] if g],
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+def gerar_pdf_bytes(obra_id, numero_medicao, dados_obra, dados_medicao, graficos=None):
+    """
+    Gera o relatório em memória e retorna os bytes do PDF, sem gravar arquivos;
+    o mesmo conteúdo pedido de novo é devolvido do cache
+    """
+    def gerar():
+        buffer = BytesIO()
+        RelatorioPDF(obra_id, numero_medicao, destino=buffer).gerar(dados_obra, dados_medicao, graficos)
+        return buffer.getvalue()
+
+    chave = hash_relatorio(obra_id, numero_medicao, dados_obra, dados_medicao, graficos)
+    return pdf_cache.get_or_compute(('pdf', chave), gerar)
+
+
+def nome_arquivo_relatorio(obra_id, numero_medicao):
+    """Nome sugerido para o download do relatório"""
+    return f"relatorio_medicao_{obra_id}_{numero_medicao}.pdf"
+
+
+def _job_relatorio_pdf(job, obra_id, numero_medicao, dados_obra, dados_medicao, com_graficos, indicadores=None):
+    """
+    Tarefa em segundo plano: gera o PDF (com os gráficos da obra) e grava como artefato
+    indicadores: já lidos do banco pelo chamador; sem eles, vêm do cache de consultas
+    """
+    graficos = None
+    if com_graficos:
+        from modules.graficos_pdf import desenhos_obra, montar_desenhos
+
+        job.progresso(0.2, "Montando gráficos")
+        if indicadores is not None:
+            graficos = montar_desenhos(indicadores, numero_medicao)
+        else:
+            graficos = desenhos_obra(obra_id, numero_medicao)
+    # Relatórios de mesmo conteúdo compartilham um único arquivo em jobs/
+    nome = nome_arquivo_relatorio(obra_id, numero_medicao)
+    chave = hash_relatorio(obra_id, numero_medicao, dados_obra, dados_medicao, graficos)
+    caminho = job.reutilizar_artefato(chave, nome)
+    if caminho is not None:
+        return {'bytes': os.path.getsize(caminho), 'reaproveitado': True}
+    job.progresso(0.5, "Gerando PDF")
+    dados = gerar_pdf_bytes(obra_id, numero_medicao, dados_obra, dados_medicao, graficos)
+    job.salvar_artefato(dados, nome, chave=chave)
+    return {'bytes': len(dados)}
+
+
+def enviar_relatorio_pdf(obra_id, numero_medicao, dados_obra, dados_medicao, com_graficos=True, user_id=None,
+                         indicadores=None):
+    """Agenda a geração do relatório em segundo plano; retorna o id da tarefa"""
+    from utils import jobs
+
+    return jobs.enviar(
+        'relatorio_pdf',
+        f"Relatório PDF - {dados_obra['nome']}, medição {numero_medicao}",
+        _job_relatorio_pdf, obra_id, numero_medicao, dados_obra, dados_medicao, com_graficos, indicadores,
+        user_id=user_id
+    )
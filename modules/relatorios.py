@@ -1,280 +1,163 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-from database.db_utils import get_db_connection
-from utils.formatters import format_currency_br, format_percentage
-from datetime import datetime
-from utils.calculadora import calcular_glosa, calcular_valor_glosa
+from database.consultas import pesquisar_obras, nomes_obras, buscar_obra, indicadores_obra, indicadores_usuario
+from utils.formatters import format_currency_br, format_currency_br_series
+from utils.indicadores import resumo_portfolio
+from utils.profiling import secao
+from modules.graficos import figuras_obra, rotulos
+from modules.seletor_obras import OBRAS_POR_PAGINA, selecionar_obra
 
 
 def gerar_relatorios():
     st.header("Relatórios")
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    # Só a contagem das obras do usuário logado (mesma consulta da primeira página do seletor)
+    with secao("consultas"):
+        total_obras, _ = pesquisar_obras(st.session_state.user_id, limite=OBRAS_POR_PAGINA)
 
-    # Buscar obras do usuário logado
-    cursor.execute('''
-    SELECT id, nome, contrato 
-    FROM obras 
-    WHERE user_id = ?
-    ORDER BY nome
-    ''', (st.session_state.user_id,))
-
-    obras = cursor.fetchall()
-
-    if not obras:
+    if not total_obras:
         st.warning("Nenhuma obra cadastrada")
-        conn.close()
         return
 
-    # Seleção da obra
-    obras_dict = {obra[0]: f"{obra[1]} (Contrato: {obra[2]})" for obra in obras}
-    obra_selecionada = st.selectbox("Selecione a Obra", list(obras_dict.values()))
-    obra_id = [k for k, v in obras_dict.items() if v == obra_selecionada][0]
+    # Visão geral de todas as obras do usuário (nomes buscados só para as obras do resumo)
+    with st.expander("Visão Geral da Carteira"):
+        with secao("indicadores"):
+            resumo = resumo_portfolio(indicadores_usuario(st.session_state.user_id))
+        if resumo.empty:
+            st.info("Nenhuma medição cadastrada.")
+        else:
+            with secao("consultas"):
+                nomes = nomes_obras(st.session_state.user_id, resumo['obra_id'])
+            st.dataframe(pd.DataFrame({
+                'Obra': resumo['obra_id'].map(nomes),
+                'Última Medição': resumo['numero_medicao'],
+                'Previsto acumulado': rotulos(resumo['previsto_acumulado'], '%.2f%%'),
+                'Realizado acumulado': rotulos(resumo['realizado_acumulado'], '%.2f%%'),
+                'Desvio': rotulos(resumo['desvio'], '%.2f%%'),
+                'IDP': rotulos(resumo['idp']),
+                'Glosa Acumulada': format_currency_br_series(resumo['valor_glosa_total'])
+            }))
+
+    # Seleção da obra (busca paginada nas obras do usuário logado)
+    with secao("consultas"):
+        obra_id = selecionar_obra(st.session_state.user_id)
+    if obra_id is None:
+        return
 
     # Buscar dados da obra
-    cursor.execute('''
-    SELECT nome, contrato, ordem_servico, contratante, contratada, 
-           valor_total, data_inicio, data_fim, duracao_prevista
-    FROM obras WHERE id = ?
-    ''', (obra_id,))
-    obra_data = cursor.fetchone()
+    with secao("consultas"):
+        obra = buscar_obra(obra_id)
+
+    # Exportação das medições (item a item) em segundo plano
+    with st.expander("Exportar Dados"):
+        col1, col2 = st.columns(2)
+        with col1:
+            escopo = st.radio("Escopo", ["Obra selecionada", "Todas as minhas obras"], key="exportacao_escopo")
+        with col2:
+            from modules.exportacao import formatos_disponiveis
+
+            formato = st.selectbox("Formato", formatos_disponiveis(), key="exportacao_formato")
+            com_indicadores = st.checkbox("Incluir IDP e glosa", value=True, key="exportacao_indicadores")
+        if st.button("Exportar", key="btn_exportar"):
+            from modules.exportacao import enviar_exportacao
+
+            obra_ids = [obra_id] if escopo == "Obra selecionada" else None
+            enviar_exportacao(
+                formato,
+                user_id=st.session_state.user_id,
+                obra_ids=obra_ids,
+                indicadores=com_indicadores,
+                descricao=f"Exportação {formato.upper()} - "
+                          + (f"{obra['nome']} (Contrato: {obra['contrato']})" if obra_ids else "todas as obras")
+            )
+            st.info("Exportação iniciada; baixe o arquivo na barra lateral.")
 
     # 1. IDENTIFICAÇÃO
     st.subheader("1. Identificação")
     col1, col2 = st.columns(2)
     with col1:
-        st.write(f"**Contrato nº:** {obra_data[1]}")
-        st.write(f"**Nº da OS:** {obra_data[2]}")
-        st.write(f"**Objeto:** {obra_data[0]}")
+        st.write(f"**Contrato nº:** {obra['contrato']}")
+        st.write(f"**Nº da OS:** {obra['ordem_servico']}")
+        st.write(f"**Objeto:** {obra['nome']}")
     with col2:
-        st.write(f"**Contratante:** {obra_data[3]}")
-        st.write(f"**Contratada:** {obra_data[4]}")
-        st.write(f"**Valor Total:** {format_currency_br(obra_data[5])}")
+        st.write(f"**Contratante:** {obra['contratante']}")
+        st.write(f"**Contratada:** {obra['contratada']}")
+        st.write(f"**Valor Total:** {format_currency_br(obra['valor_total'])}")
 
     # 2. DESEMPENHO FÍSICO
     st.subheader("2. Desempenho Físico")
 
-    # Buscar dados das medições
-    cursor.execute('''
-    SELECT 
-        m.numero_medicao,
-        SUM(m.valor_previsto) as valor_previsto,
-        SUM(m.valor_realizado) as valor_realizado,
-        o.valor_total
-    FROM medicoes m
-    JOIN obras o ON m.obra_id = o.id
-    WHERE m.obra_id = ?
-    GROUP BY m.numero_medicao
-    ORDER BY m.numero_medicao
-    ''', (obra_id,))
-
-    dados = cursor.fetchall()
-    if not dados:
+    # Buscar dados das medições e calcular indicadores
+    with secao("indicadores"):
+        indicadores = indicadores_obra(obra_id)
+    if indicadores.empty:
         st.warning("Não há medições registradas para esta obra.")
         return
 
-    df = pd.DataFrame(dados, columns=['Medição', 'Previsto', 'Realizado', 'Valor Total'])
-    valor_total = df['Valor Total'].iloc[0] if not df.empty else 1
-
-    # Calcular percentuais acumulados
-    if not df.empty:
-        df['Previsto Acumulado'] = (df['Previsto'].cumsum() / valor_total * 100).round(2)
-        df['Realizado Acumulado'] = (df['Realizado'].fillna(0).cumsum() / valor_total * 100).round(2)
-        df['Desvio'] = (df['Realizado Acumulado'] - df['Previsto Acumulado']).round(2)
+    with secao("graficos"):
+        figuras = figuras_obra(obra_id)
 
     # Gráfico de Desempenho Físico (Curva S)
-    fig = go.Figure()
-
-    # Linha do previsto
-    fig.add_trace(go.Scatter(
-        x=df['Medição'],
-        y=df['Previsto Acumulado'],
-        name='Previsto acumulado',
-        mode='lines+markers+text',
-        text=df['Previsto Acumulado'].apply(lambda x: f'{x:.2f}%'),
-        textposition='top center',
-        line=dict(color='blue')
-    ))
-
-    # Linha do realizado
-    fig.add_trace(go.Scatter(
-        x=df['Medição'],
-        y=df['Realizado Acumulado'],
-        name='Realizado acumulado',
-        mode='lines+markers+text',
-        text=df['Realizado Acumulado'].apply(lambda x: f'{x:.2f}%'),
-        textposition='bottom center',
-        line=dict(color='red')
-    ))
-
-    fig.update_layout(
-        title='Curva de Desempenho Físico da Obra',
-        xaxis_title='Medição',
-        yaxis_title='Percentual (%)',
-        yaxis=dict(
-            range=[0, 100],
-            tickformat='.2f',
-            ticksuffix='%'
-        ),
-        showlegend=True,
-        height=500
-    )
-
-    st.plotly_chart(fig, use_container_width=True, key="plot_curva_s")
+    with secao("widgets"):
+        st.plotly_chart(figuras['curva_s'], use_container_width=True, key="plot_curva_s")
 
     # Tabela de Percentuais
     st.write("### Valores Percentuais")
-    df_display = pd.DataFrame({
-        'Medição': df['Medição'],
-        'Previsto acumulado': df['Previsto Acumulado'].apply(lambda x: f"{x:.2f}%"),
-        'Realizado acumulado': df['Realizado Acumulado'].apply(lambda x: f"{x:.2f}%"),
-        'Desvio': df['Desvio'].apply(lambda x: f"{x:.2f}%")
-    })
+    with secao("dataframes"):
+        df_display = pd.DataFrame({
+            'Medição': indicadores['numero_medicao'],
+            'Previsto acumulado': rotulos(indicadores['previsto_acumulado'], '%.2f%%'),
+            'Realizado acumulado': rotulos(indicadores['realizado_acumulado'], '%.2f%%'),
+            'Desvio': rotulos(indicadores['desvio'], '%.2f%%')
+        })
     st.dataframe(df_display)
 
     # 3. INDICADORES
     st.subheader("3. Indicadores")
 
-    # Calcular IDP
-    df['IDP'] = (df['Realizado'] / df['Previsto']).round(2)
-    df['META'] = 1.0
-
     # Tabela IDP
     st.write("### Índice de Desempenho de Prazo (IDP)")
-    df_idp = pd.DataFrame({
-        'Medição': df['Medição'],
-        'IDP': df['IDP'].apply(lambda x: f"{x:.2f}"),
-        'META': df['META'].apply(lambda x: f"{x:.2f}")
-    })
+    with secao("dataframes"):
+        df_idp = pd.DataFrame({
+            'Medição': indicadores['numero_medicao'],
+            'IDP': rotulos(indicadores['idp']),
+            'META': '1.00'
+        })
     st.dataframe(df_idp)
 
     # Gráfico IDP
-    fig_idp = go.Figure()
-
-    # Linha do IDP
-    fig_idp.add_trace(go.Scatter(
-        x=df['Medição'],
-        y=df['IDP'],
-        name='IDP',
-        mode='lines+markers+text',
-        text=df['IDP'].apply(lambda x: f'{x:.2f}'),
-        textposition='top center',
-        line=dict(color='blue')
-    ))
-
-    # Linha da META
-    fig_idp.add_trace(go.Scatter(
-        x=df['Medição'],
-        y=df['META'],
-        name='Meta',
-        mode='lines',
-        line=dict(color='red', dash='dash')
-    ))
-
-    fig_idp.update_layout(
-        title='Variação do IDP ao longo das medições',
-        xaxis_title='Medição',
-        yaxis_title='IDP',
-        yaxis=dict(
-            range=[0, 2],
-            tickformat='.2f'
-        ),
-        showlegend=True,
-        height=500
-    )
-
-    st.plotly_chart(fig_idp, use_container_width=True, key="plot_idp_1")
+    with secao("widgets"):
+        st.plotly_chart(figuras['idp'], use_container_width=True, key="plot_idp_1")
 
 
     # Adicionar seção de IMR no relatório
     st.subheader("5. Instrumento de Medição de Resultado")
 
-    # Buscar fatores IMR da obra
-    cursor.execute('''
-    SELECT numero_medicao, fator_ponderacao 
-    FROM imr_fatores 
-    WHERE obra_id = ?
-    ORDER BY numero_medicao
-    ''', (obra_id,))
-
-    fatores_imr = cursor.fetchall()
-
-    # Criar DataFrame com fatores IMR
-    df_imr = pd.DataFrame(fatores_imr, columns=['Medição', 'Fator IMR'])
-
-    # Adicionar colunas de IDP e Glosa
-    df_imr['IDP'] = df['IDP']
-    df_imr['Glosa'] = df_imr.apply(
-        lambda row: calcular_glosa(obra_id, row['IDP'], row['Medição']),
-        axis=1
-    )
-
-    # Mostrar tabela IMR
+    # Mostrar tabela IMR (medições com fator IMR configurado)
     st.write("### Fatores e Glosas por Medição")
-    df_display_imr = df_imr.copy()
-    df_display_imr['Fator IMR'] = df_display_imr['Fator IMR'].apply(lambda x: f"{x:.2f}")
-    df_display_imr['IDP'] = df_display_imr['IDP'].apply(lambda x: f"{x:.2f}")
-    df_display_imr['Glosa'] = df_display_imr['Glosa'].apply(lambda x: f"{x:.2%}")
+    with secao("dataframes"):
+        df_imr = indicadores[indicadores['fator_imr'].notna()]
+        df_display_imr = pd.DataFrame({
+            'Medição': df_imr['numero_medicao'],
+            'Fator IMR': rotulos(df_imr['fator_imr']),
+            'IDP': rotulos(df_imr['idp']),
+            'Glosa': rotulos(df_imr['glosa'] * 100, '%.2f%%')
+        }).reset_index(drop=True)
     st.dataframe(df_display_imr)
 
     # Gráfico de Glosas
-    fig_glosas = go.Figure()
-    fig_glosas.add_trace(go.Bar(
-        x=df_imr['Medição'],
-        y=df_imr['Glosa'] * 100,
-        name='Glosa (%)',
-        text=df_imr['Glosa'].apply(lambda x: f'{x:.2%}'),
-        textposition='auto',
-    ))
-
-    fig_glosas.update_layout(
-        title='Glosas Aplicadas por Medição',
-        xaxis_title='Medição',
-        yaxis_title='Glosa (%)',
-        yaxis=dict(
-            tickformat='.2f',
-            ticksuffix='%'
-        ),
-        showlegend=True,
-        height=400
-    )
-
-    st.plotly_chart(fig_glosas, use_container_width=True, key="plot_glosas")
-
-    # Gráfico IDP
-    fig_idp = go.Figure()
-
-    # Linha do IDP
-    fig_idp.add_trace(go.Scatter(
-        x=df['Medição'],
-        y=df['IDP'],
-        name='IDP',
-        mode='lines+markers+text',
-        text=df['IDP'].apply(lambda x: f'{x:.2f}'),
-        textposition='top center',
-        line=dict(color='blue')
-    ))
-
-    # Linha da META
-    fig_idp.add_trace(go.Scatter(
-        x=df['Medição'],
-        y=df['META'],
-        name='Meta',
-        mode='lines',
-        line=dict(color='red', dash='dash')
-    ))
-
-    fig_idp.update_layout(
-        title='Variação do IDP ao longo das medições',
-        xaxis_title='Medição',
-        yaxis_title='IDP',
-        yaxis=dict(
-            range=[0, 2],
-            tickformat='.2f'
-        ),
-        showlegend=True,
-        height=500
-    )
-
+    with secao("widgets"):
+        st.plotly_chart(figuras['glosas'], use_container_width=True, key="plot_glosas")
+
+    # Relatórios PDF de todas as medições da obra, gerados em segundo plano
+    st.subheader("6. Relatórios PDF")
+    if st.button("Gerar PDFs de todas as medições", key="btn_pdfs_obra"):
+        from modules.relatorios_lote import enviar_relatorios_lote
+
+        enviar_relatorios_lote(
+            obra_ids=[obra_id],
+            workers=1,
+            solicitante=st.session_state.user_id,
+            descricao=f"Relatórios PDF - {obra['nome']}"
+        )
+        st.info("Geração iniciada; acompanhe o progresso e baixe o .zip na barra lateral.")
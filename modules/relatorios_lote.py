@@ -0,0 +1,255 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from database.db_utils import get_db_connection
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Diretório padrão dos relatórios gerados em lote
+RELATORIOS_DIR = os.path.abspath(os.environ.get('OBRAS_RELATORIOS_DIR', os.path.join(RAIZ, 'relatorios')))
+
+# Processos usados na geração em lote (padrão: um por CPU)
+PDF_WORKERS = int(os.environ.get('OBRAS_PDF_WORKERS', '0')) or os.cpu_count() or 1
+
+CAMPOS_PDF = ['nome', 'contrato', 'ordem_servico', 'contratante', 'contratada', 'valor_total']
+
+
+def carregar_tarefas(user_id=None, obra_ids=None, medicoes=None, graficos=True):
+    """
+    Lista, em uma única consulta, as medições já realizadas (com valor realizado)
+    e monta os dados_obra/dados_medicao de cada relatório
+    graficos: inclui os indicadores de cada obra, de onde os processos desenham os gráficos
+    Retorna [(obra_id, numero_medicao, dados_obra, dados_medicao, indicadores)]
+    """
+    import numpy as np
+
+    filtros = ['r.itens_realizados > 0']
+    params = []
+    if user_id is not None:
+        filtros.append('o.user_id = ?')
+        params.append(user_id)
+    if obra_ids:
+        filtros.append(f"o.id IN ({', '.join('?' * len(obra_ids))})")
+        params.extend(int(o) for o in obra_ids)
+    if medicoes:
+        filtros.append(f"r.numero_medicao IN ({', '.join('?' * len(medicoes))})")
+        params.extend(int(n) for n in medicoes)
+
+    conn = get_db_connection()
+    try:
+        linhas = conn.execute(f'''
+        SELECT {', '.join('o.' + c for c in CAMPOS_PDF)}, r.obra_id, r.numero_medicao,
+               r.total_previsto, r.total_realizado
+        FROM medicoes_resumo r
+        JOIN obras o ON o.id = r.obra_id
+        WHERE {' AND '.join(filtros)}
+        ORDER BY r.obra_id, r.numero_medicao
+        ''', params).fetchall()
+    finally:
+        conn.close()
+
+    if not linhas:
+        return []
+
+    # Indicadores de todas as medições de uma vez, como em registrar_medicao
+    n = len(CAMPOS_PDF)
+    valor_total = np.array([l[CAMPOS_PDF.index('valor_total')] or 0 for l in linhas], dtype=float)
+    previsto = np.array([l[n + 2] for l in linhas], dtype=float)
+    realizado = np.array([l[n + 3] for l in linhas], dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        idp = np.where(previsto == 0, 1.0, realizado / previsto)
+        percentual_previsto = previsto / valor_total * 100
+        percentual_realizado = realizado / valor_total * 100
+    desvio = realizado - previsto
+
+    # Indicadores de todas as obras do lote em uma consulta, separados por obra
+    por_obra = {}
+    if graficos:
+        from utils.indicadores import calcular_indicadores
+
+        indicadores = calcular_indicadores(obra_ids=sorted({l[n] for l in linhas}))
+        por_obra = {obra_id: grupo for obra_id, grupo in indicadores.groupby('obra_id', sort=False)}
+
+    tarefas = []
+    for i, linha in enumerate(linhas):
+        dados_obra = dict(zip(CAMPOS_PDF, linha[:n]))
+        dados_obra['valor_total'] = dados_obra['valor_total'] or 0.0
+        dados_medicao = {
+            'valor_previsto': float(previsto[i]),
+            'valor_realizado': float(realizado[i]),
+            'percentual_previsto': float(percentual_previsto[i]),
+            'percentual_realizado': float(percentual_realizado[i]),
+            'idp': float(idp[i]),
+            'desvio': float(desvio[i]),
+        }
+        tarefas.append((linha[n], linha[n + 1], dados_obra, dados_medicao, por_obra.get(linha[n])))
+    return tarefas
+
+
+def _renderizar_lote(tarefas, diretorio=None):
+    """
+    Executado nos processos do pool: gera os PDFs de um bloco de tarefas
+    Grava em diretorio (retorna os tamanhos) ou devolve os bytes para o processo principal
+    """
+    from io import BytesIO
+    from reportlab import rl_config
+
+    # Processo dedicado à renderização: dispensa a validação de atributos dos
+    # desenhos (só vale se ajustada antes do primeiro import de reportlab.graphics)
+    rl_config.shapeChecking = 0
+
+    from modules.pdf_generator import RelatorioPDF, nome_arquivo_relatorio
+    from modules.graficos_pdf import montar_desenhos
+
+    resultados = []
+    for obra_id, numero_medicao, dados_obra, dados_medicao, indicadores in tarefas:
+        try:
+            graficos = montar_desenhos(indicadores, numero_medicao) if indicadores is not None else None
+            if diretorio:
+                caminho = os.path.join(diretorio, nome_arquivo_relatorio(obra_id, numero_medicao))
+                RelatorioPDF(obra_id, numero_medicao, destino=caminho).gerar(dados_obra, dados_medicao, graficos)
+                resultados.append((obra_id, numero_medicao, os.path.getsize(caminho), None))
+            else:
+                buffer = BytesIO()
+                RelatorioPDF(obra_id, numero_medicao, destino=buffer).gerar(dados_obra, dados_medicao, graficos)
+                resultados.append((obra_id, numero_medicao, buffer.getvalue(), None))
+        except Exception as e:
+            resultados.append((obra_id, numero_medicao, None, str(e)))
+    return resultados
+
+
+def gerar_relatorios_lote(tarefas, destino, workers=None, bloco=8, progresso=None):
+    """
+    Gera os PDFs das tarefas em paralelo (ProcessPoolExecutor)
+    destino: diretório de saída ou arquivo .zip; progresso(concluidos, total) é chamado a cada bloco
+    Retorna as estatísticas da execução (quantidade, erros, tempo e vazão)
+    """
+    from modules.pdf_generator import nome_arquivo_relatorio
+
+    workers = workers or PDF_WORKERS
+    compactar = destino.lower().endswith('.zip')
+    diretorio = None if compactar else destino
+    os.makedirs(os.path.dirname(os.path.abspath(destino)) if compactar else destino, exist_ok=True)
+
+    blocos = [tarefas[i:i + bloco] for i in range(0, len(tarefas), bloco)]
+    inicio = time.perf_counter()
+    gerados, erros, bytes_total, concluidos = 0, [], 0, 0
+
+    arquivo_zip = zipfile.ZipFile(destino, 'w', zipfile.ZIP_STORED) if compactar else None
+    try:
+        # spawn: o processo principal pode ser o servidor do Streamlit, com várias threads
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=contexto) as executor:
+            futuros = [executor.submit(_renderizar_lote, b, diretorio) for b in blocos]
+            for futuro in as_completed(futuros):
+                resultados = futuro.result()
+                for obra_id, numero_medicao, resultado, erro in resultados:
+                    if erro:
+                        erros.append((obra_id, numero_medicao, erro))
+                        continue
+                    if arquivo_zip is not None:
+                        # PDFs já são comprimidos: armazenar sem recompressão
+                        arquivo_zip.writestr(nome_arquivo_relatorio(obra_id, numero_medicao), resultado)
+                        bytes_total += len(resultado)
+                    else:
+                        bytes_total += resultado
+                    gerados += 1
+                concluidos += len(resultados)
+                if progresso:
+                    progresso(concluidos, len(tarefas))
+    finally:
+        if arquivo_zip is not None:
+            arquivo_zip.close()
+
+    segundos = time.perf_counter() - inicio
+    return {
+        'destino': os.path.abspath(destino),
+        'relatorios': len(tarefas),
+        'gerados': gerados,
+        'erros': erros,
+        'workers': workers,
+        'segundos': segundos,
+        'relatorios_por_segundo': gerados / segundos if segundos else 0.0,
+        'megabytes': bytes_total / 1024 / 1024,
+    }
+
+
+def destino_padrao(compactar=True):
+    """Caminho padrão de saída: relatorios/lote_AAAAMMDD_HHMMSS(.zip)"""
+    nome = f"lote_{datetime.now():%Y%m%d_%H%M%S}"
+    return os.path.join(RELATORIOS_DIR, nome + ('.zip' if compactar else ''))
+
+
+def _job_relatorios_lote(job, user_id, obra_ids, medicoes, graficos, workers, compactar):
+    """Tarefa em segundo plano: gera o lote e registra o .zip como artefato"""
+    from utils import jobs
+
+    job.progresso(0.0, "Carregando medições")
+    tarefas = carregar_tarefas(user_id, obra_ids, medicoes, graficos)
+    if not tarefas:
+        return {'relatorios': 0, 'gerados': 0, 'erros': []}
+
+    # O .zip fica junto dos artefatos das tarefas; diretórios vão para RELATORIOS_DIR
+    destino = (os.path.join(jobs.JOBS_DIR, f"job_{job.job_id}_relatorios.zip") if compactar
+               else destino_padrao(compactar=False))
+    stats = gerar_relatorios_lote(
+        tarefas, destino, workers,
+        progresso=lambda feitos, total: job.progresso(feitos / total, f"{feitos}/{total} relatórios")
+    )
+    if compactar:
+        job.registrar_artefato(destino, 'relatorios.zip')
+    return stats
+
+
+def enviar_relatorios_lote(user_id=None, obra_ids=None, medicoes=None, graficos=True, workers=None,
+                           compactar=True, solicitante=None, descricao="Relatórios PDF em lote"):
+    """
+    Agenda a geração do lote em segundo plano; retorna o id da tarefa
+    user_id/obra_ids/medicoes filtram os relatórios; solicitante é o dono da tarefa
+    """
+    from utils import jobs
+
+    return jobs.enviar(
+        'relatorios_lote', descricao, _job_relatorios_lote,
+        user_id, obra_ids, medicoes, graficos, workers, compactar,
+        user_id=solicitante
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera em lote os relatórios PDF das medições realizadas")
+    parser.add_argument('--usuario', type=int, help="Somente as obras deste user_id")
+    parser.add_argument('--obras', type=int, nargs='*', help="Somente estas obras")
+    parser.add_argument('--medicoes', type=int, nargs='*', help="Somente estes números de medição")
+    parser.add_argument('--destino', help="Diretório ou arquivo .zip de saída (padrão: relatorios/lote_<data>.zip)")
+    parser.add_argument('--workers', type=int, default=PDF_WORKERS)
+    parser.add_argument('--bloco', type=int, default=8, help="Relatórios por tarefa enviada a cada processo")
+    parser.add_argument('--sem-graficos', action='store_true', help="Não inclui os gráficos nos relatórios")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    tarefas = carregar_tarefas(args.usuario, args.obras, args.medicoes, graficos=not args.sem_graficos)
+    print(f"{len(tarefas)} relatório(s) a gerar (dados carregados em {time.perf_counter() - inicio:.2f} s)")
+    if not tarefas:
+        return 0
+
+    def progresso(concluidos, total):
+        print(f"\r{concluidos}/{total} ({concluidos / total:.0%})", end='', flush=True)
+
+    stats = gerar_relatorios_lote(tarefas, args.destino or destino_padrao(), args.workers, args.bloco, progresso)
+    print(f"\n{stats['gerados']} relatório(s) gerado(s) em {stats['segundos']:.2f} s "
+          f"({stats['relatorios_por_segundo']:.1f}/s, {stats['workers']} processo(s), "
+          f"{stats['megabytes']:.1f} MB) -> {stats['destino']}")
+    for obra_id, numero_medicao, erro in stats['erros']:
+        print(f"ERRO: obra {obra_id}, medição {numero_medicao}: {erro}")
+    return 1 if stats['erros'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import math
+
+import streamlit as st
+
+from database.consultas import pesquisar_obras
+
+# Obras exibidas por página no seletor
+OBRAS_POR_PAGINA = 50
+
+
+def _voltar_primeira_pagina(chave):
+    st.session_state[f"{chave}_pagina"] = 1
+
+
+def selecionar_obra(user_id, chave="obra", rotulo="Selecione a Obra"):
+    """
+    Seletor de obras compartilhado pelas páginas: busca por prefixo (nome, contrato, OS,
+    contratante ou contratada), resultados paginados e opções pelo id da obra
+    Retorna o id da obra escolhida, ou None se não houver obra para escolher
+    """
+    texto = st.text_input(
+        "Buscar obra",
+        key=f"{chave}_busca",
+        placeholder="Nome, contrato, ordem de serviço, contratante ou contratada",
+        on_change=_voltar_primeira_pagina,
+        args=(chave,)
+    )
+
+    chave_pagina = f"{chave}_pagina"
+    total, _ = pesquisar_obras(user_id, texto, OBRAS_POR_PAGINA, 0)
+    if total == 0:
+        st.warning("Nenhuma obra encontrada" if texto.strip() else "Nenhuma obra cadastrada")
+        return None
+
+    paginas = math.ceil(total / OBRAS_POR_PAGINA)
+    if st.session_state.get(chave_pagina, 1) > paginas:
+        st.session_state[chave_pagina] = 1
+    pagina = 1
+    if paginas > 1:
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            pagina = st.number_input("Página", min_value=1, max_value=paginas, step=1, key=chave_pagina)
+        with col2:
+            st.caption(f"{total} obra(s) encontrada(s), página {pagina} de {paginas}")
+
+    _, obras = pesquisar_obras(user_id, texto, OBRAS_POR_PAGINA, (pagina - 1) * OBRAS_POR_PAGINA)
+    rotulos = {obra_id: f"{nome} (Contrato: {contrato})" for obra_id, nome, contrato in obras}
+    return st.selectbox(rotulo, options=list(rotulos), format_func=rotulos.get, key=f"{chave}_id")
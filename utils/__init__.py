@@ -1,3 +1,27 @@
-from .formatters import format_currency_br, format_percentage, format_date_br
-from .calculadora import calcular_idp, calcular_desvio, calcular_glosa
-from .validators import validar_valor_monetario, validar_data, validar_percentual
+import importlib
+
+# Importação sob demanda: os submódulos dependem de pandas/numpy
+_EXPORTS = {
+    'format_currency_br': 'formatters',
+    'format_percentage': 'formatters',
+    'format_date_br': 'formatters',
+    'format_number_br': 'formatters',
+    'format_currency_br_series': 'formatters',
+    'parse_currency_br': 'formatters',
+    'parse_currency_br_series': 'formatters',
+    'calcular_idp': 'calculadora',
+    'calcular_desvio': 'calculadora',
+    'calcular_glosa': 'calculadora',
+    'calcular_glosa_lote': 'calculadora',
+    'validar_valor_monetario': 'validators',
+    'validar_data': 'validators',
+    'validar_percentual': 'validators',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
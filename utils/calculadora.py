@@ -1,3 +1,11 @@
+import numpy as np
+
+# Faixas de IDP (limite inferior, em ordem crescente) e o percentual de glosa de cada faixa;
+# a faixa 0 corresponde a IDP < 0.42 e a última a IDP >= 0.95 (sem glosa)
+LIMITES_IDP = np.array([0.42, 0.56, 0.71, 0.85, 0.95])
+PERCENTUAIS_GLOSA = np.array([0.0560, 0.0553, 0.0546, 0.0445, 0.0295, 0.0])
+
+
 def calcular_idp(valor_realizado, valor_previsto):
     """
     Calcula o Índice de Desempenho de Prazo (IDP)
@@ -50,6 +58,67 @@ def calcular_glosa(obra_id, idp, numero_medicao):
         return 0.0560 * fp
 
 
+def carregar_fatores_imr(obra_ids):
+    """
+    Carrega, em uma única consulta, os fatores IMR das obras informadas
+    Retorna {(obra_id, numero_medicao): fator_ponderacao}
+    """
+    from database.db_utils import get_db_connection
+
+    obra_ids = [int(o) for o in np.unique(np.atleast_1d(obra_ids))]
+    if not obra_ids:
+        return {}
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        placeholders = ', '.join('?' * len(obra_ids))
+        cursor.execute(f'''
+        SELECT obra_id, numero_medicao, fator_ponderacao
+        FROM imr_fatores
+        WHERE obra_id IN ({placeholders})
+        ''', obra_ids)
+        return {(o, n): fp for o, n, fp in cursor.fetchall()}
+    finally:
+        conn.close()
+
+
+def calcular_glosa_lote(obra_ids, idps, numeros_medicao, fatores=None):
+    """
+    Versão vetorizada de calcular_glosa para séries inteiras de medições
+    obra_ids pode ser um único id ou um array alinhado com idps/numeros_medicao;
+    fatores ({(obra_id, numero_medicao): fator}) evita nova consulta ao banco
+    """
+    idps = np.asarray(idps, dtype=float)
+    numeros_medicao = np.asarray(numeros_medicao)
+    obra_ids = np.broadcast_to(np.asarray(obra_ids), idps.shape)
+
+    if fatores is None:
+        fatores = carregar_fatores_imr(obra_ids)
+
+    fp = np.fromiter(
+        (fatores.get((int(o), int(n)), 1.0) for o, n in zip(obra_ids.ravel(), numeros_medicao.ravel())),
+        dtype=float,
+        count=idps.size
+    ).reshape(idps.shape)
+
+    return aplicar_faixas_glosa(idps, fp)
+
+
+def aplicar_faixas_glosa(idps, fatores_ponderacao):
+    """
+    Aplica as faixas de glosa a arrays de IDP e fatores de ponderação já alinhados
+    """
+    idps = np.asarray(idps, dtype=float)
+    fp = np.asarray(fatores_ponderacao, dtype=float)
+
+    # IDP NaN não atende nenhuma faixa no cálculo escalar e cai na glosa máxima
+    faixa = np.searchsorted(LIMITES_IDP, idps, side='right')
+    faixa = np.where(np.isnan(idps), 0, faixa)
+
+    return np.where(faixa == len(LIMITES_IDP), 0.0, PERCENTUAIS_GLOSA[faixa] * fp)
+
+
 def calcular_valor_glosa(valor_medicao, percentual_glosa):
     """
     Calcula o valor da glosa
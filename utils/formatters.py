@@ -1,21 +1,80 @@
 import pandas as pd
-import locale
+import numpy as np
 from datetime import datetime
+from functools import lru_cache
+
+# Troca simultânea de separadores: 1,234.56 -> 1.234,56
+_SEPARADORES_BR = str.maketrans(',.', '.,')
+
+
+@lru_cache(maxsize=4096)
+def _format_number_br(value):
+    return f"{value:,.2f}".translate(_SEPARADORES_BR)
 
-# Configurar locale para formatação em português brasileiro
-try:
-    locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
-except:
-    try:
-        locale.setlocale(locale.LC_ALL, 'Portuguese_Brazil.1252')
-    except:
-        locale.setlocale(locale.LC_ALL, '')
 
 def format_currency_br(value):
     """Formata valor para o padrão brasileiro de moeda"""
     if pd.isna(value) or value == 0:
         return "R$ 0,00"
-    return f"R$ {value:,.2f}".replace(',', '_').replace('.', ',').replace('_', '.')
+    return "R$ " + _format_number_br(float(value))
+
+
+def format_number_br(value):
+    """Formata valor no padrão brasileiro, sem o prefixo R$ (usado nos campos de digitação)"""
+    if pd.isna(value) or value == 0:
+        return "0,00"
+    return _format_number_br(float(value))
+
+
+# Acima deste valor (ou perto de meio centavo) o arredondamento binário exige o formatador do Python
+_LIMITE_VETORIZADO = 1e13
+
+
+def _montar_numeros_br(centavos, negativo, prefixo):
+    """Strings 'prefixo[-]1.234,56' a partir dos valores absolutos em centavos (inteiros, sem arredondamento)"""
+    return [
+        f"{prefixo}{'-' if sinal else ''}{format(inteiro, '_').replace('_', '.')},{resto:02d}"
+        for inteiro, resto, sinal in zip((centavos // 100).tolist(), (centavos % 100).tolist(), negativo.tolist())
+    ]
+
+
+def format_currency_br_series(values, prefixo="R$ "):
+    """
+    Formata em lote (Series, ndarray ou lista) no padrão brasileiro de moeda
+    Equivale a aplicar format_currency_br a cada valor; retorna o mesmo tipo para Series
+    """
+    index = values.index if isinstance(values, pd.Series) else None
+    shape = np.shape(values)
+    arr = np.asarray(values, dtype=float).ravel()
+
+    resultado = np.empty(arr.size, dtype=object)
+    zero = np.isnan(arr) | (arr == 0)
+    resultado[zero] = prefixo + "0,00"
+
+    absolutos = np.abs(arr)
+    with np.errstate(invalid='ignore'):
+        escalado = absolutos * 100
+        fracao = escalado - np.floor(escalado)
+        especial = ~zero & ((absolutos >= _LIMITE_VETORIZADO) | (np.abs(fracao - 0.5) < 1e-6))
+    vetorizado = ~zero & ~especial
+
+    if vetorizado.any():
+        centavos = np.rint(escalado[vetorizado]).astype(np.int64)
+        resultado[vetorizado] = _montar_numeros_br(centavos, arr[vetorizado] < 0, prefixo)
+    for i in np.flatnonzero(especial):
+        resultado[i] = prefixo + _format_number_br(float(arr[i]))
+
+    if index is not None:
+        return pd.Series(resultado, index=index, name=values.name)
+    return resultado.reshape(shape)
+
+
+def format_dataframe_currency_br(df, colunas):
+    """Retorna uma cópia do DataFrame com as colunas informadas formatadas como moeda"""
+    df = df.copy()
+    for col in colunas:
+        df[col] = format_currency_br_series(df[col])
+    return df
 
 def format_percentage(value):
     """Formata percentual com 2 casas decimais"""
@@ -36,9 +95,34 @@ def format_millions_br(value):
     value_millions = value / 1000000
     return f"R$ {value_millions:,.2f}M".replace(',', '_').replace('.', ',').replace('_', '.')
 
-def deformat_currency_br(value_str):
-    """Converte string de moeda BR para float"""
+@lru_cache(maxsize=4096)
+def parse_currency_br(value_str):
+    """Converte string no padrão brasileiro (com ou sem R$) para float; inválido vira 0.0"""
     try:
-        return float(value_str.replace('R$ ', '').replace('.', '').replace(',', '.'))
-    except:
+        return float(value_str.replace('R$', '').strip().replace('.', '').replace(',', '.'))
+    except (ValueError, AttributeError):
         return 0.0
+
+
+def parse_currency_br_series(values):
+    """
+    Converte em lote para um array de floats: strings no padrão brasileiro (com ou sem R$)
+    passam pela limpeza dos separadores; números são mantidos; inválidos viram 0.0
+    """
+    serie = pd.Series(values, dtype=object)
+    textos = serie.map(lambda valor: isinstance(valor, str)).to_numpy(dtype=bool)
+    resultado = np.array(pd.to_numeric(serie.where(~textos), errors='coerce'), dtype=float)
+    if textos.any():
+        texto = (
+            serie[textos].str.replace('R$', '', regex=False)
+            .str.strip()
+            .str.replace('.', '', regex=False)
+            .str.replace(',', '.', regex=False)
+        )
+        resultado[textos] = pd.to_numeric(texto, errors='coerce').to_numpy(dtype=float)
+    return np.nan_to_num(resultado, nan=0.0)
+
+
+def deformat_currency_br(value_str):
+    """Converte string de moeda BR para float"""
+    return parse_currency_br(value_str)
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+from utils.calculadora import aplicar_faixas_glosa
+
+# Colunas do resultado de calcular_indicadores, uma linha por (obra, medição)
+COLUNAS_INDICADORES = [
+    'obra_id', 'numero_medicao', 'valor_total',
+    'previsto', 'realizado',
+    'previsto_acumulado', 'realizado_acumulado', 'desvio',
+    'idp', 'fator_imr', 'glosa', 'valor_glosa'
+]
+
+
+def carregar_medicoes_agrupadas(user_id=None, obra_ids=None):
+    """
+    Busca, em uma única consulta, os totais por medição (tabela medicoes_resumo)
+    das obras de um usuário (ou das obras informadas), junto com o fator IMR de cada medição
+    """
+    from database.db_utils import get_db_connection
+
+    filtros = []
+    params = []
+    if user_id is not None:
+        filtros.append('o.user_id = ?')
+        params.append(user_id)
+    if obra_ids is not None:
+        obra_ids = [int(o) for o in obra_ids]
+        if not obra_ids:
+            return []
+        filtros.append(f"o.id IN ({', '.join('?' * len(obra_ids))})")
+        params.extend(obra_ids)
+    where = f"WHERE {' AND '.join(filtros)}" if filtros else ''
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+        SELECT
+            r.obra_id,
+            r.numero_medicao,
+            o.valor_total,
+            r.total_previsto as valor_previsto,
+            CASE WHEN r.itens_realizados > 0 THEN r.total_realizado END as valor_realizado,
+            f.fator_ponderacao
+        FROM obras o
+        JOIN medicoes_resumo r ON r.obra_id = o.id
+        LEFT JOIN imr_fatores f ON f.obra_id = r.obra_id AND f.numero_medicao = r.numero_medicao
+        {where}
+        ORDER BY r.obra_id, r.numero_medicao
+        ''', params)
+        return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def idp_medicoes(previsto, realizado):
+    """
+    IDP = Realizado / Previsto de cada medição, arredondado em 2 casas
+    (1.0 quando não há previsto, como em calcular_idp; NaN se não realizada)
+    """
+    previsto = np.asarray(previsto, dtype=float)
+    realizado = np.asarray(realizado, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        idp = np.where(previsto == 0, np.where(np.isnan(realizado), np.nan, 1.0), realizado / previsto)
+    return np.round(idp, 2)
+
+
+def calcular_indicadores(user_id=None, obra_ids=None, linhas=None):
+    """
+    Calcula IDP, curvas acumuladas, desvio e glosa de todas as obras de uma vez
+    Retorna um DataFrame colunar ordenado por (obra_id, numero_medicao)
+    """
+    if linhas is None:
+        linhas = carregar_medicoes_agrupadas(user_id, obra_ids)
+
+    df = pd.DataFrame(linhas, columns=[
+        'obra_id', 'numero_medicao', 'valor_total', 'previsto', 'realizado', 'fator_imr'
+    ])
+    if df.empty:
+        return pd.DataFrame(columns=COLUNAS_INDICADORES)
+
+    df['obra_id'] = df['obra_id'].astype('int64')
+    df['numero_medicao'] = df['numero_medicao'].astype('int32')
+    for col in ['valor_total', 'previsto', 'realizado', 'fator_imr']:
+        df[col] = df[col].astype(float)
+
+    # Percentuais acumulados por obra, relativos ao valor total do contrato
+    grupos = df.groupby('obra_id', sort=False)
+    valor_total = df['valor_total'].to_numpy()
+    previsto_acum = grupos['previsto'].cumsum().to_numpy()
+    realizado_acum = df['realizado'].fillna(0).groupby(df['obra_id'], sort=False).cumsum().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df['previsto_acumulado'] = np.round(previsto_acum / valor_total * 100, 2)
+        df['realizado_acumulado'] = np.round(realizado_acum / valor_total * 100, 2)
+    df['desvio'] = np.round(df['realizado_acumulado'] - df['previsto_acumulado'], 2)
+
+    previsto = df['previsto'].to_numpy()
+    realizado = df['realizado'].to_numpy()
+    df['idp'] = idp_medicoes(previsto, realizado)
+
+    fp = df['fator_imr'].fillna(1.0).to_numpy()
+    df['glosa'] = aplicar_faixas_glosa(df['idp'].to_numpy(), fp)
+    df['valor_glosa'] = np.nan_to_num(realizado) * df['glosa'].to_numpy()
+
+    return df[COLUNAS_INDICADORES].reset_index(drop=True)
+
+
+def serie_obra(indicadores, obra_id):
+    """Retorna as linhas de uma obra do resultado de calcular_indicadores"""
+    return indicadores[indicadores['obra_id'] == obra_id].reset_index(drop=True)
+
+
+def resumo_portfolio(indicadores):
+    """
+    Resume a situação de cada obra pela última medição com valor realizado
+    (ou pela primeira medição, se nenhuma foi realizada)
+    """
+    if indicadores.empty:
+        return indicadores.copy()
+
+    realizadas = indicadores['realizado'].notna()
+    ultima = (
+        indicadores[realizadas]
+        .groupby('obra_id', sort=False)
+        .tail(1)
+    )
+    sem_realizado = ~indicadores['obra_id'].isin(ultima['obra_id'])
+    primeira = indicadores[sem_realizado].groupby('obra_id', sort=False).head(1)
+
+    resumo = pd.concat([ultima, primeira]).sort_values('obra_id')
+    glosa_total = indicadores.groupby('obra_id')['valor_glosa'].sum()
+    resumo['valor_glosa_total'] = resumo['obra_id'].map(glosa_total)
+    return resumo.reset_index(drop=True)
@@ -0,0 +1,251 @@
+import json
+import logging
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from database.cache import QueryCache
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Threads que executam as tarefas em segundo plano
+JOBS_WORKERS = int(os.environ.get('OBRAS_JOBS_WORKERS', '2'))
+
+# Diretório dos artefatos gerados pelas tarefas (PDFs, arquivos .zip)
+JOBS_DIR = os.path.abspath(os.environ.get('OBRAS_JOBS_DIR', os.path.join(RAIZ, 'jobs')))
+
+# Intervalo mínimo, em segundos, entre gravações do progresso no banco
+INTERVALO_PROGRESSO = 0.5
+
+# Artefatos até este tamanho (bytes) ficam em memória para os botões de download das páginas;
+# os maiores só são lidos quando o usuário pede o download
+DOWNLOAD_DIRETO_MAX = int(os.environ.get('OBRAS_JOBS_DOWNLOAD_DIRETO_MAX', str(5 * 1024 * 1024)))
+
+PENDENTE = 'pendente'
+EXECUTANDO = 'executando'
+CONCLUIDO = 'concluido'
+ERRO = 'erro'
+
+CAMPOS_JOB = [
+    'id', 'user_id', 'tipo', 'descricao', 'status', 'progresso', 'mensagem', 'resultado',
+    'artefato', 'nome_artefato', 'erro', 'criado_em', 'iniciado_em', 'concluido_em'
+]
+
+logger = logging.getLogger(__name__)
+
+# Bytes dos artefatos pequenos, por (tarefa, data de modificação do arquivo)
+artefatos_cache = QueryCache(max_entries=32)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=JOBS_WORKERS, thread_name_prefix='obras-job')
+    return _executor
+
+
+def _executar_sql(sql, params=(), conn=None):
+    """Gravação na tabela jobs pelo escritor único do banco; retorna o lastrowid"""
+    from database.db_utils import submit_write
+
+    if conn is None:
+        return submit_write(_executar_sql, sql, params).result()
+    return conn.execute(sql, params).lastrowid
+
+
+def _atualizar(job_id, **campos):
+    atribuicoes = ', '.join(f'{campo} = ?' for campo in campos)
+    _executar_sql(f'UPDATE jobs SET {atribuicoes} WHERE id = ?', (*campos.values(), job_id))
+
+
+class ContextoJob:
+    """Passado à função da tarefa para informar o progresso e registrar o artefato gerado"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._ultima_gravacao = 0.0
+
+    def progresso(self, fracao, mensagem=None):
+        """Atualiza o progresso (0 a 1); gravações muito próximas são descartadas"""
+        agora = time.monotonic()
+        if fracao < 1 and agora - self._ultima_gravacao < INTERVALO_PROGRESSO:
+            return
+        self._ultima_gravacao = agora
+        _atualizar(self.job_id, progresso=min(max(float(fracao), 0.0), 1.0), mensagem=mensagem)
+
+    def salvar_artefato(self, dados, nome, chave=None):
+        """
+        Grava bytes gerados pela tarefa como artefato para download
+        chave: hash do conteúdo; tarefas com a mesma chave compartilham um único arquivo
+        """
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        caminho = _caminho_artefato(self.job_id, nome, chave)
+        temporario = f'{caminho}.{self.job_id}.tmp'
+        with open(temporario, 'wb') as f:
+            f.write(dados)
+        os.replace(temporario, caminho)
+        self.registrar_artefato(caminho, nome)
+        return caminho
+
+    def reutilizar_artefato(self, chave, nome):
+        """Registra o arquivo já gravado com o mesmo conteúdo (chave), se houver; retorna o caminho ou None"""
+        caminho = _caminho_artefato(self.job_id, nome, chave)
+        if not os.path.exists(caminho):
+            return None
+        self.registrar_artefato(caminho, nome)
+        return caminho
+
+    def registrar_artefato(self, caminho, nome=None):
+        """Registra um arquivo já gravado pela tarefa como seu artefato"""
+        _atualizar(self.job_id, artefato=os.path.abspath(caminho), nome_artefato=nome or os.path.basename(caminho))
+
+
+def _caminho_artefato(job_id, nome, chave=None):
+    return os.path.join(JOBS_DIR, f'job_{job_id}_{nome}' if chave is None else f'conteudo_{chave[:32]}_{nome}')
+
+
+def _executar(job_id, funcao, args, kwargs):
+    _atualizar(job_id, status=EXECUTANDO, iniciado_em=datetime.now())
+    try:
+        resultado = funcao(ContextoJob(job_id), *args, **kwargs)
+        _atualizar(
+            job_id,
+            status=CONCLUIDO,
+            progresso=1.0,
+            resultado=json.dumps(resultado, ensure_ascii=False, default=str) if resultado is not None else None,
+            concluido_em=datetime.now()
+        )
+    except Exception as e:
+        logger.error('Tarefa %s falhou:\n%s', job_id, traceback.format_exc())
+        _atualizar(job_id, status=ERRO, erro=str(e) or type(e).__name__, concluido_em=datetime.now())
+
+
+def enviar(tipo, descricao, funcao, *args, user_id=None, **kwargs):
+    """
+    Registra a tarefa na tabela jobs e a executa em segundo plano
+    funcao(contexto, *args, **kwargs) recebe um ContextoJob e pode retornar um resultado
+    serializável em JSON; retorna o id da tarefa
+    """
+    job_id = _executar_sql(
+        'INSERT INTO jobs (user_id, tipo, descricao, status, criado_em) VALUES (?, ?, ?, ?, ?)',
+        (user_id, tipo, descricao, PENDENTE, datetime.now())
+    )
+    _get_executor().submit(_executar, job_id, funcao, args, kwargs)
+    return job_id
+
+
+def _como_dict(linha):
+    job = dict(zip(CAMPOS_JOB, linha))
+    if job['resultado'] is not None:
+        job['resultado'] = json.loads(job['resultado'])
+    return job
+
+
+def buscar_job(job_id):
+    """Situação atual de uma tarefa (ou None)"""
+    from database.db_utils import get_db_connection
+
+    conn = get_db_connection()
+    try:
+        linha = conn.execute(f"SELECT {', '.join(CAMPOS_JOB)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return _como_dict(linha) if linha else None
+
+
+def listar_jobs(user_id, limite=10):
+    """Tarefas mais recentes do usuário que ainda não foram arquivadas"""
+    from database.db_utils import get_db_connection
+
+    conn = get_db_connection()
+    try:
+        linhas = conn.execute(f'''
+        SELECT {', '.join(CAMPOS_JOB)} FROM jobs
+        WHERE user_id = ? AND arquivado = 0
+        ORDER BY id DESC
+        LIMIT ?
+        ''', (user_id, limite)).fetchall()
+    finally:
+        conn.close()
+    return [_como_dict(linha) for linha in linhas]
+
+
+def ler_artefato(job):
+    """Bytes do artefato de uma tarefa concluída (None se não houver ou se o arquivo sumiu)"""
+    if not job or job['status'] != CONCLUIDO or not job['artefato'] or not os.path.exists(job['artefato']):
+        return None
+    with open(job['artefato'], 'rb') as f:
+        return f.read()
+
+
+def tamanho_artefato(job):
+    """Tamanho em bytes do artefato de uma tarefa concluída (None se não houver)"""
+    if not job or job['status'] != CONCLUIDO or not job['artefato'] or not os.path.exists(job['artefato']):
+        return None
+    return os.path.getsize(job['artefato'])
+
+
+def ler_artefato_em_cache(job):
+    """
+    Como ler_artefato, mas os bytes ficam em memória enquanto o arquivo não muda:
+    as páginas que redesenham o botão de download a cada execução não releem o disco
+    Artefatos maiores que DOWNLOAD_DIRETO_MAX são lidos sem guardar em memória
+    """
+    tamanho = tamanho_artefato(job)
+    if tamanho is None or tamanho > DOWNLOAD_DIRETO_MAX:
+        return ler_artefato(job)
+    chave = ('artefato', job['id'], job['artefato'], os.stat(job['artefato']).st_mtime_ns)
+    return artefatos_cache.get_or_compute(chave, lambda: ler_artefato(job))
+
+
+def _arquivar(user_id, conn=None):
+    encerrados = conn.execute('''
+    SELECT id, artefato FROM jobs
+    WHERE user_id = ? AND arquivado = 0 AND status IN (?, ?)
+    ''', (user_id, CONCLUIDO, ERRO)).fetchall()
+    conn.executemany('UPDATE jobs SET arquivado = 1 WHERE id = ?', [(job_id,) for job_id, _ in encerrados])
+    # Arquivos compartilhados (mesmo conteúdo) continuam enquanto outra tarefa visível os usar
+    artefatos = sorted({artefato for _, artefato in encerrados if artefato})
+    em_uso = set()
+    if artefatos:
+        em_uso = {artefato for (artefato,) in conn.execute(f'''
+        SELECT DISTINCT artefato FROM jobs
+        WHERE arquivado = 0 AND artefato IN ({', '.join('?' * len(artefatos))})
+        ''', artefatos)}
+    return [(job_id, None if artefato in em_uso else artefato) for job_id, artefato in encerrados]
+
+
+def arquivar_concluidos(user_id):
+    """Oculta as tarefas encerradas do usuário e apaga os artefatos gravados em JOBS_DIR"""
+    from database.db_utils import submit_write
+
+    encerrados = submit_write(_arquivar, user_id).result()
+
+    for _, artefato in encerrados:
+        if artefato and os.path.dirname(artefato) == JOBS_DIR and os.path.exists(artefato):
+            os.remove(artefato)
+    return len(encerrados)
+
+
+def recuperar_interrompidos():
+    """
+    Marca como erro as tarefas que ficaram pendentes ou em execução quando o
+    processo anterior terminou (chamada uma vez na inicialização do servidor)
+    """
+    from database.db_utils import submit_write
+
+    def marcar(conn=None):
+        return conn.execute('''
+        UPDATE jobs SET status = ?, erro = ?, concluido_em = ?
+        WHERE status IN (?, ?)
+        ''', (ERRO, 'Interrompida pelo reinício do servidor', datetime.now(), PENDENTE, EXECUTANDO)).rowcount
+
+    return submit_write(marcar).result()
@@ -0,0 +1,12 @@
+import locale
+
+
+def configurar_locale():
+    """Configura o locale para formatação em português brasileiro"""
+    try:
+        locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
+    except locale.Error:
+        try:
+            locale.setlocale(locale.LC_ALL, 'Portuguese_Brazil.1252')
+        except locale.Error:
+            locale.setlocale(locale.LC_ALL, '')
@@ -0,0 +1,184 @@
+import numpy as np
+import pandas as pd
+
+from utils.formatters import parse_currency_br_series
+
+# Leitura das planilhas de acompanhamento: cada bloco começa na linha "Previsto acumulado",
+# seguida de "Realizado acumulado" e das linhas de valores em R$ (previsto e realizado).
+# Uma aba pode ter vários blocos e um arquivo, várias abas; cada bloco vira uma obra
+
+ROTULO_PREVISTO = 'previsto acumulado'
+ROTULO_REALIZADO = 'realizado acumulado'
+ROTULO_OBRA = 'obra'
+ROTULO_VALORES = 'valor'
+
+
+def ler_abas(origem):
+    """
+    Lê o arquivo .xlsx em modo somente leitura, uma aba por vez
+    Gera (nome da aba, matriz de objetos com as células); só uma aba fica em memória
+    """
+    from openpyxl import load_workbook
+
+    livro = load_workbook(origem, read_only=True, data_only=True)
+    try:
+        for aba in livro.worksheets:
+            linhas = list(aba.iter_rows(values_only=True))
+            if not linhas:
+                continue
+            largura = max(len(linha) for linha in linhas)
+            celulas = np.empty((len(linhas), largura), dtype=object)
+            for i, linha in enumerate(linhas):
+                celulas[i, :len(linha)] = linha
+            yield aba.title, celulas
+    finally:
+        livro.close()
+
+
+def converter_valores(celulas):
+    """Converte em lote células numéricas ou textos em R$ para float; vazios viram NaN"""
+    celulas = np.asarray(celulas, dtype=object)
+    valores = np.full(celulas.shape, np.nan)
+    numericos = np.fromiter((isinstance(c, (int, float)) and not isinstance(c, bool) for c in celulas),
+                            dtype=bool, count=celulas.size)
+    valores[numericos] = celulas[numericos].astype(float)
+    textos = np.fromiter((isinstance(c, str) and c.strip() != '' for c in celulas), dtype=bool, count=celulas.size)
+    if textos.any():
+        valores[textos] = parse_currency_br_series(celulas[textos])
+    return valores
+
+
+def _acumulados(valores, percentuais):
+    """Indica se os valores em R$ vêm acumulados (proporcionais ao percentual acumulado)"""
+    final = valores[-1] if len(valores) else 0
+    return bool(
+        final > 0
+        and np.all(np.diff(valores) >= 0)
+        and np.allclose(valores / final * 100, percentuais, atol=0.5)
+    )
+
+
+def _por_medicao(valores):
+    """Converte valores acumulados em valores por medição, mantendo os vazios (NaN)"""
+    preenchidos = pd.Series(valores).ffill().fillna(0.0).to_numpy()
+    return np.where(np.isnan(valores), np.nan, np.diff(preenchidos, prepend=0.0))
+
+
+def extrair_blocos(celulas, nome_padrao='Obra Importada'):
+    """
+    Localiza, de forma vetorizada, os blocos de uma aba e extrai os dados de cada obra
+    Retorna (obras, avisos); a quantidade de medições é a do bloco (colunas preenchidas)
+    """
+    celulas = np.atleast_2d(np.asarray(celulas, dtype=object))
+    if celulas.shape[1] < 2:
+        return [], ["Aba sem colunas de medições"]
+
+    rotulos = pd.Series(celulas[:, 0], dtype=object).astype(str).str.strip().str.lower()
+    e_texto = pd.Series(celulas[:, 0], dtype=object).map(lambda c: isinstance(c, str)).to_numpy(dtype=bool)
+    com_reais = pd.Series(celulas[:, 1], dtype=object).astype(str).str.contains('R$', regex=False).to_numpy()
+
+    linhas_previsto = np.flatnonzero(rotulos.str.contains(ROTULO_PREVISTO, regex=False).to_numpy())
+    linhas_realizado = np.flatnonzero(rotulos.str.contains(ROTULO_REALIZADO, regex=False).to_numpy())
+    # Linhas de valores: texto em R$ na primeira medição ou rótulo "Valores ..." (células numéricas)
+    linhas_reais = np.flatnonzero(e_texto & (com_reais | rotulos.str.startswith(ROTULO_VALORES).to_numpy()))
+    linhas_obra = np.flatnonzero(((rotulos == ROTULO_OBRA) | rotulos.str.startswith(ROTULO_OBRA + ':')).to_numpy())
+
+    if not len(linhas_previsto):
+        return [], ["Linha 'Previsto acumulado' não encontrada"]
+
+    obras, avisos = [], []
+    limites = np.append(linhas_previsto[1:], len(celulas))
+    for numero, (inicio, fim) in enumerate(zip(linhas_previsto, limites), start=1):
+        realizado = linhas_realizado[(linhas_realizado > inicio) & (linhas_realizado < fim)]
+        reais = linhas_reais[(linhas_reais > inicio) & (linhas_reais < fim)]
+        if not len(realizado):
+            avisos.append(f"Bloco {numero}: linha 'Realizado acumulado' não encontrada")
+            continue
+        if not len(reais):
+            avisos.append(f"Bloco {numero}: linhas de valores em R$ não encontradas")
+            continue
+
+        # Colunas de medição: as preenchidas na linha do previsto acumulado
+        percentuais = converter_valores(celulas[inicio, 1:])
+        preenchidas = np.flatnonzero(~np.isnan(percentuais))
+        if not len(preenchidas):
+            avisos.append(f"Bloco {numero}: nenhuma medição na linha 'Previsto acumulado'")
+            continue
+        num_medicoes = int(preenchidas[-1]) + 1
+        colunas = slice(1, num_medicoes + 1)
+        previsto_acumulado = np.nan_to_num(percentuais[:num_medicoes])
+        realizado_acumulado = np.nan_to_num(converter_valores(celulas[realizado[0], colunas]))
+
+        # Primeira linha em R$ do bloco: previsto; a linha seguinte: realizado
+        valores_previsto = np.nan_to_num(converter_valores(celulas[reais[0], colunas]))
+        if reais[0] + 1 < fim:
+            valores_realizado = converter_valores(celulas[reais[0] + 1, colunas])
+        else:
+            valores_realizado = np.full(num_medicoes, np.nan)
+        # Zeros e vazios no realizado indicam medição ainda não realizada
+        valores_realizado[valores_realizado == 0] = np.nan
+
+        # As duas linhas seguem a mesma convenção (acumuladas ou por medição)
+        if _acumulados(valores_previsto, previsto_acumulado):
+            valores_previsto = _por_medicao(valores_previsto)
+            valores_realizado = _por_medicao(valores_realizado)
+
+        # Nome: linha "Obra: ..." mais próxima acima do bloco, senão o da aba
+        nome = nome_padrao if len(linhas_previsto) == 1 else f"{nome_padrao} ({numero})"
+        acima = linhas_obra[linhas_obra < inicio]
+        if len(acima):
+            rotulo = str(celulas[acima[-1], 0])
+            nome = (rotulo.split(':', 1)[1] if ':' in rotulo else str(celulas[acima[-1], 1] or '')).strip() or nome
+
+        obras.append({
+            'nome': nome,
+            'num_medicoes': num_medicoes,
+            'valor_total': float(valores_previsto.sum()),
+            'previsto_acumulado': previsto_acumulado,
+            'realizado_acumulado': realizado_acumulado,
+            'valores_previsto': valores_previsto,
+            'valores_realizado': valores_realizado,
+        })
+    return obras, avisos
+
+
+def extrair_obras(origem):
+    """
+    Extrai todas as obras de um arquivo .xlsx (caminho ou arquivo aberto)
+    Retorna (obras, avisos), com a aba de origem em cada obra e em cada aviso
+    """
+    obras, avisos = [], []
+    for nome_aba, celulas in ler_abas(origem):
+        obras_aba, avisos_aba = extrair_blocos(celulas, nome_padrao=nome_aba)
+        for obra in obras_aba:
+            obra['aba'] = nome_aba
+        obras.extend(obras_aba)
+        avisos.extend(f"{nome_aba}: {aviso}" for aviso in avisos_aba)
+    return obras, avisos
+
+
+def registros_obras(obras, data_inicio=None):
+    """
+    Converte as obras extraídas em registros de add_obras
+    (dados_obra, descricoes, valores_previstos, valores_realizados)
+    """
+    from datetime import date
+
+    data_inicio = data_inicio or date.today()
+    registros = []
+    for obra in obras:
+        dados_obra = {
+            'nome': obra['nome'],
+            'valor_total': obra['valor_total'],
+            'data_inicio': data_inicio,
+            'duracao_prevista': obra['num_medicoes'],
+            'num_medicoes': obra['num_medicoes'],
+        }
+        # A planilha não detalha itens: as medições ficam em um item único da obra
+        registros.append((
+            dados_obra,
+            ['Obra Importada'],
+            obra['valores_previsto'][np.newaxis, :],
+            obra['valores_realizado'][np.newaxis, :]
+        ))
+    return registros
@@ -0,0 +1,219 @@
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Perfil das execuções das páginas, desligado por padrão (OBRAS_PROFILING=1 liga)
+PROFILING = os.environ.get('OBRAS_PROFILING', '0').lower() in ('1', 'true', 'sim')
+
+# Grava também um dump do cProfile (.prof, legível com pstats/snakeviz) por execução
+PROFILING_CPROFILE = os.environ.get('OBRAS_PROFILING_CPROFILE', '0').lower() in ('1', 'true', 'sim')
+
+# Quantidade máxima de dumps do cProfile mantidos em disco
+MAX_DUMPS = int(os.environ.get('OBRAS_PROFILING_MAX_DUMPS', '50'))
+
+LOG_DIR = os.path.abspath(os.environ.get('OBRAS_LOG_DIR', os.path.join(RAIZ, 'logs')))
+ARQUIVO_PERFIS = os.path.join(LOG_DIR, 'profiling.log')
+DIR_DUMPS = os.path.join(LOG_DIR, 'perfis')
+
+_logger = logging.getLogger('obras.profiling')
+_logger.propagate = False
+_log_lock = threading.Lock()
+_log_configurado = False
+
+# Pilha de seções abertas na thread atual (cada sessão do Streamlit roda em sua thread)
+_estado = threading.local()
+
+# Últimos perfis, para consulta na página de administração
+_ultimos = deque(maxlen=200)
+
+# O cProfile só admite um perfilador ativo por vez no processo
+_cprofile_lock = threading.Lock()
+
+# O pico do tracemalloc é do processo inteiro: só é zerado quando uma única página está
+# sendo medida; com execuções simultâneas (várias sessões), o pico inclui a memória das
+# outras e o registro sai marcado como aproximado
+_paginas_lock = threading.Lock()
+_paginas_ativas = 0
+_sobreposicoes = 0
+
+
+class _Secao:
+    __slots__ = ('nome', 'inicio', 'memoria_inicial', 'pico', 'sql_inicial', 'filhas', 'sobreposicoes')
+
+    def __init__(self, nome):
+        self.nome = nome
+        # Páginas medidas ao mesmo tempo que esta (-1: já havia outra em andamento)
+        self.sobreposicoes = _sobreposicoes if _paginas_ativas <= 1 else -1
+        self.inicio = time.perf_counter()
+        self.memoria_inicial, self.pico = tracemalloc.get_traced_memory()
+        self.sql_inicial = _contadores_sql()
+        self.filhas = []
+
+
+def _contadores_sql():
+    from database import instrumentacao
+
+    return instrumentacao.contadores_thread()
+
+
+def _configurar_log():
+    global _log_configurado
+    if _log_configurado:
+        return
+    with _log_lock:
+        if not _log_configurado:
+            os.makedirs(LOG_DIR, exist_ok=True)
+            handler = RotatingFileHandler(ARQUIVO_PERFIS, maxBytes=5 * 1024 * 1024, backupCount=3, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            _logger.addHandler(handler)
+            _logger.setLevel(logging.INFO)
+            _log_configurado = True
+
+
+def _pilha():
+    pilha = getattr(_estado, 'pilha', None)
+    if pilha is None:
+        pilha = _estado.pilha = []
+    return pilha
+
+
+def _abrir(nome):
+    pilha = _pilha()
+    # O pico do tracemalloc é global: antes de zerá-lo, repassa o valor às seções abertas
+    pico_atual = tracemalloc.get_traced_memory()[1]
+    for aberta in pilha:
+        aberta.pico = max(aberta.pico, pico_atual)
+    with _paginas_lock:
+        # Com outra página em andamento, zerar o pico apagaria a medição dela
+        if _paginas_ativas <= 1:
+            tracemalloc.reset_peak()
+        secao_atual = _Secao(nome)
+    pilha.append(secao_atual)
+    return secao_atual
+
+
+def _fechar(secao_atual):
+    pilha = _pilha()
+    secao_atual.pico = max(secao_atual.pico, tracemalloc.get_traced_memory()[1])
+    pilha.pop()
+    if pilha:
+        pilha[-1].pico = max(pilha[-1].pico, secao_atual.pico)
+
+    execucoes, sql_ms = _contadores_sql()
+    registro = {
+        'secao': secao_atual.nome,
+        'ms': round((time.perf_counter() - secao_atual.inicio) * 1000, 3),
+        'pico_kb': round((secao_atual.pico - secao_atual.memoria_inicial) / 1024, 1),
+        'sql_execucoes': execucoes - secao_atual.sql_inicial[0],
+        'sql_ms': round(sql_ms - secao_atual.sql_inicial[1], 3),
+    }
+    if secao_atual.sobreposicoes != _sobreposicoes or _paginas_ativas > 1:
+        registro['pico_aproximado'] = True
+    if secao_atual.filhas:
+        registro['secoes'] = secao_atual.filhas
+    if pilha:
+        pilha[-1].filhas.append(registro)
+    return registro
+
+
+def ativo():
+    """Indica se o perfil das páginas está ligado"""
+    return PROFILING
+
+
+def _limpar_dumps():
+    dumps = sorted(
+        (os.path.join(DIR_DUMPS, nome) for nome in os.listdir(DIR_DUMPS) if nome.endswith('.prof')),
+        key=os.path.getmtime
+    )
+    for caminho in dumps[:-MAX_DUMPS] if MAX_DUMPS > 0 else dumps:
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+
+
+@contextmanager
+def perfil_pagina(pagina, cprofile=None):
+    """
+    Mede uma execução completa da página: tempo, pico de memória (tracemalloc),
+    tempo e quantidade de comandos SQL e as seções internas; grava no log de perfis
+    """
+    global _paginas_ativas, _sobreposicoes
+
+    if not PROFILING or _pilha():
+        yield
+        return
+
+    from database import instrumentacao
+
+    # O perfil precisa da medição dos comandos SQL para separar banco de Python
+    if not instrumentacao.ativo():
+        instrumentacao.ativar(True)
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    cprofile = PROFILING_CPROFILE if cprofile is None else cprofile
+    perfilador = None
+    if cprofile and _cprofile_lock.acquire(blocking=False):
+        import cProfile
+        perfilador = cProfile.Profile()
+
+    with _paginas_lock:
+        _paginas_ativas += 1
+        if _paginas_ativas > 1:
+            _sobreposicoes += 1
+
+    secao_pagina = _abrir(pagina)
+    try:
+        if perfilador is not None:
+            perfilador.enable()
+        yield
+    finally:
+        if perfilador is not None:
+            perfilador.disable()
+            _cprofile_lock.release()
+        registro = _fechar(secao_pagina)
+        with _paginas_lock:
+            _paginas_ativas -= 1
+        registro = {'data': datetime.now().isoformat(timespec='milliseconds'), 'pagina': pagina, **registro}
+        del registro['secao']
+
+        if perfilador is not None:
+            os.makedirs(DIR_DUMPS, exist_ok=True)
+            nome = f"{datetime.now():%Y%m%d_%H%M%S_%f}_{pagina.replace(' ', '_')}.prof"
+            registro['cprofile'] = os.path.join(DIR_DUMPS, nome)
+            perfilador.dump_stats(registro['cprofile'])
+            _limpar_dumps()
+
+        _ultimos.append(registro)
+        _configurar_log()
+        _logger.info(json.dumps(registro, ensure_ascii=False))
+
+
+@contextmanager
+def secao(nome):
+    """Mede um trecho dentro de uma página (consultas, montagem de DataFrames, gráficos...)"""
+    if not PROFILING or not _pilha():
+        yield
+        return
+
+    secao_atual = _abrir(nome)
+    try:
+        yield
+    finally:
+        _fechar(secao_atual)
+
+
+def ultimos_perfis(limite=50):
+    """Retorna os perfis mais recentes deste processo, do mais novo para o mais antigo"""
+    return list(_ultimos)[::-1][:limite]